@@ -0,0 +1,70 @@
+"""Latency benchmark of the compiled predictor against the sklearn pipeline.
+
+Run with:
+    poetry run python benchmarks/bench_compiled_predictor.py --rows 24 --repeat 200
+"""
+
+import logging
+import timeit
+from typing import Callable
+
+import click
+import numpy as np
+import pandas as pd
+
+from pv_prediction.model.compiled_predictor import CompiledPredictor
+from pv_prediction.model.pv_pipeline import PVPipeline
+
+WEATHER_PARAMS: list[str] = [
+    "t_2m",
+    "precip_1h",
+    "wind_speed_10m",
+    "msl_pressure",
+    "uv",
+    "weather_symbol_1h",
+]
+
+
+def build_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Builds a frame shaped like the converted weather responses."""
+    return pd.DataFrame(
+        rng.uniform(size=(rows, len(WEATHER_PARAMS))), columns=WEATHER_PARAMS
+    ).assign(
+        lat=47.0, lon=8.0, date=pd.date_range("2025-06-01", periods=rows, freq="h")
+    )
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest call in milliseconds."""
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1e3
+
+
+@click.command()
+@click.option("--rows", default=24, type=click.IntRange(min=1))
+@click.option("--repeat", default=200, type=click.IntRange(min=1))
+@click.option("--n-estimators", default=100, type=click.IntRange(min=1))
+def main(rows: int, repeat: int, n_estimators: int) -> None:
+    """Compares single request latencies of both predictors."""
+    logging.basicConfig(level=logging.WARNING)
+    rng = np.random.default_rng(0)
+    train = build_frame(10_000, rng)
+    pipeline = PVPipeline.get_pipeline(WEATHER_PARAMS)
+    pipeline.set_params(estimator__n_estimators=n_estimators, estimator__verbose=-1)
+    pipeline.fit(train, train[WEATHER_PARAMS].sum(axis=1))
+    predictor = CompiledPredictor.from_pipeline(pipeline)
+
+    request = build_frame(rows, rng)
+    array = request[WEATHER_PARAMS].to_numpy()
+    np.testing.assert_allclose(pipeline.predict(request), predictor.predict(request))
+
+    sklearn_ms = best_of(lambda: pipeline.predict(request), repeat)
+    frame_ms = best_of(lambda: predictor.predict(request), repeat)
+    array_ms = best_of(lambda: predictor.predict(array), repeat)
+    print(f"rows: {rows}, trees: {n_estimators}")
+    print(f"sklearn pipeline:   {sklearn_ms:7.3f} ms")
+    print(f"compiled, frame:    {frame_ms:7.3f} ms ({sklearn_ms / frame_ms:.1f}x)")
+    print(f"compiled, array:    {array_ms:7.3f} ms ({sklearn_ms / array_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,86 @@
+"""Benchmark of a scheduled forecast run over many sites with a simulated weather API.
+
+Every weather request takes --api-latency-ms and at most METEO_MAX_CONCURRENCY
+requests run at a time. The predictions are written to a temporary SQLite database.
+The pipelined run is compared with fetching, predicting and persisting one site
+after the other.
+
+Run with:
+    poetry run python benchmarks/bench_forecast_pipeline.py --sites 300
+"""
+
+import asyncio
+import logging
+import pathlib
+import tempfile
+import time
+
+import click
+import httpx
+import numpy as np
+import orjson
+import sqlalchemy as sa
+from load_test_service import build_runner
+from load_test_service import build_weather
+
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.async_api_client import AsyncAPIClient
+from pv_prediction.forecast_scheduler import ForecastConfig
+from pv_prediction.forecast_scheduler import ForecastPipeline
+from pv_prediction.forecast_scheduler import Site
+
+
+def build_pipeline(
+    engine: sa.Engine, sites: int, api_latency: float, predict_batch_size: int
+) -> ForecastPipeline:
+    """Returns a pipeline for sites around a simulated weather API."""
+    body = orjson.dumps(build_weather(48, np.random.default_rng(0)))
+
+    async def handler(_: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(api_latency)
+        return httpx.Response(200, content=body)
+
+    return ForecastPipeline(
+        build_runner(np.random.default_rng(0)),
+        ForecastConfig(
+            sites=[Site(i, 47.0, 8.0) for i in range(sites)],
+            predict_batch_size=predict_batch_size,
+        ),
+        engine=engine,
+        client_factory=lambda: AsyncAPIClient(
+            MeteomaticsConfig(max_concurrency=8),
+            transport=httpx.MockTransport(handler),
+        ),
+    )
+
+
+@click.command()
+@click.option("--sites", default=300, type=click.IntRange(min=1))
+@click.option("--api-latency-ms", default=200, type=click.IntRange(min=0))
+def main(sites: int, api_latency_ms: int) -> None:
+    """Runs the forecast pipeline for sites and prints the stage durations."""
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = sa.create_engine(f"sqlite:///{pathlib.Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        for name, batch_size in [("sequential", 1), ("pipelined", 64)]:
+            pipeline = build_pipeline(engine, sites, api_latency_ms / 1e3, batch_size)
+            if name == "sequential":
+                started = time.perf_counter()
+                for site in pipeline.config.sites:
+                    pipeline.config.sites = [site]
+                    pipeline.run()
+                print(f"{name:>10}: {time.perf_counter() - started:8.2f} s")
+                continue
+            stats = pipeline.run()
+            print(
+                f"{name:>10}: {stats.total_seconds:8.2f} s (fetch "
+                + f"{stats.fetch_seconds:.2f} s, predict {stats.predict_seconds:.2f} s, "
+                + f"persist {stats.persist_seconds:.2f} s summed over all sites)"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
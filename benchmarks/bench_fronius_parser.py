@@ -0,0 +1,113 @@
+"""Benchmark of the Fronius archive parser against the previous per-series implementation.
+
+Run with:
+    poetry run python benchmarks/bench_fronius_parser.py --days 16 --repeat 20
+"""
+
+import json
+import timeit
+from typing import Any
+from typing import Iterator
+
+import click
+import numpy as np
+import pandas as pd
+import requests
+
+from pv_prediction.data.converter.fronius_connector import FroniusConnector
+
+# pylint: disable=protected-access
+
+PARAMETERS: list[str] = [
+    "EnergyReal_WAC_Sum_Produced",
+    "EnergyReal_WAC_Minus_Absolute",
+    "EnergyReal_WAC_Plus_Absolute",
+]
+
+
+def _legacy_series_of_parameters(
+    json_data: dict[str, Any], parameters: list[str]
+) -> Iterator[pd.Series]:
+    if isinstance(json_data, dict):
+        for k, v in json_data.items():
+            if k in parameters:
+                parameters.remove(k)
+                series = pd.Series(v["Values"])
+                series.name = k
+                yield series
+            if len(parameters) == 0:
+                break
+            yield from (s for s in _legacy_series_of_parameters(v, parameters))
+
+
+def legacy_transform(content: bytes, parameters: list[str]) -> pd.DataFrame:
+    """Previous implementation: one series per channel built from python dicts."""
+    json_data = json.loads(content)["Body"]["Data"]
+    series_list = []
+    for k, v in json_data.items():
+        if isinstance(v, dict):
+            for series in _legacy_series_of_parameters(v, parameters.copy()):
+                series.index = pd.to_datetime(json_data[k]["Start"]) + pd.to_timedelta(
+                    series.index.astype("int"), unit="sec"
+                )
+                series_list += [series]
+    return pd.concat(series_list, axis=1)[parameters]
+
+
+def build_payload(days: int, interval_seconds: int = 300) -> bytes:
+    """Builds an archive response with an inverter and a meter device."""
+    rng = np.random.default_rng(0)
+    offsets = [str(i) for i in range(0, days * 86400, interval_seconds)]
+
+    def channel() -> dict[str, Any]:
+        return {
+            "Unit": "Wh",
+            "Values": dict(zip(offsets, rng.uniform(0, 1000, len(offsets)).tolist())),
+        }
+
+    body = {
+        "inverter/1": {
+            "Data": {PARAMETERS[0]: channel()},
+            "Start": "2024-07-09T00:00:00+02:00",
+        },
+        "meter:16250208": {
+            "Data": {PARAMETERS[1]: channel(), PARAMETERS[2]: channel()},
+            "Start": "2024-07-09T00:00:00+02:00",
+        },
+    }
+    return json.dumps({"Body": {"Data": body}}).encode()
+
+
+@click.command()
+@click.option("--days", default=16, type=click.IntRange(min=1))
+@click.option("--repeat", default=20, type=click.IntRange(min=1))
+def main(days: int, repeat: int) -> None:
+    """Compares the legacy and the columnar parser on a synthetic response."""
+    content = build_payload(days)
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+
+    pd.testing.assert_frame_equal(
+        legacy_transform(content, PARAMETERS),
+        FroniusConnector._transform_response(response, PARAMETERS),
+    )
+    legacy = min(
+        timeit.repeat(
+            lambda: legacy_transform(content, PARAMETERS), number=1, repeat=repeat
+        )
+    )
+    columnar = min(
+        timeit.repeat(
+            lambda: FroniusConnector._transform_response(response, PARAMETERS),
+            number=1,
+            repeat=repeat,
+        )
+    )
+    print(f"payload: {len(content) / 1e6:.1f} MB, {days} days")
+    print(f"legacy:   {legacy * 1e3:8.2f} ms")
+    print(f"columnar: {columnar * 1e3:8.2f} ms ({legacy / columnar:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
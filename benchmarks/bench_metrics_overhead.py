@@ -0,0 +1,43 @@
+"""Benchmark of the per call overhead of the stage timing.
+
+A no-op function is called plain and decorated with `timed`, once with metrics
+disabled, which is the default, and once enabled.
+
+Run with:
+    poetry run python benchmarks/bench_metrics_overhead.py --number 1000000
+"""
+
+import timeit
+from typing import Callable
+
+import click
+
+from pv_prediction.common import metrics
+
+
+def per_call(run: Callable[[], object], number: int) -> float:
+    """Returns the fastest of five runs in nanoseconds per call."""
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e9
+
+
+@click.command()
+@click.option("--number", default=1_000_000, type=click.IntRange(min=1))
+def main(number: int) -> None:
+    """Compares a plain call with a timed call with metrics disabled and enabled."""
+
+    def noop() -> None:
+        pass
+
+    timed = metrics.timed("bench.noop")(noop)
+    plain_ns = per_call(noop, number)
+    metrics.set_enabled(False)
+    disabled_ns = per_call(timed, number)
+    metrics.set_enabled(True)
+    enabled_ns = per_call(timed, number)
+    print(f"plain:     {plain_ns:8.1f} ns")
+    print(f"disabled:  {disabled_ns:8.1f} ns (+{disabled_ns - plain_ns:.1f} ns)")
+    print(f"enabled:   {enabled_ns:8.1f} ns (+{enabled_ns - plain_ns:.1f} ns)")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
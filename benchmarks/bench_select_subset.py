@@ -0,0 +1,81 @@
+"""Benchmark of the per call overhead of SelectSubset against the previous implementation.
+
+Run with:
+    poetry run python benchmarks/bench_select_subset.py --rows 24 --repeat 2000
+"""
+
+import io
+import logging
+import timeit
+from typing import Callable
+
+import click
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer
+
+from pv_prediction.model.custom_blocks.select_subset import SelectSubset
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+WEATHER_PARAMS: list[str] = [
+    "wind_speed_10m",
+    "t_2m",
+    "msl_pressure",
+    "precip_1h",
+    "uv",
+]
+
+
+class LegacySelectSubset(FunctionTransformer):
+    """Previous implementation: copying selection and two INFO logs per call."""
+
+    def __init__(self, subset_features: list[str]) -> None:
+        """Selects subset features specified in subset_features."""
+        self.subset_features = subset_features
+        super().__init__(
+            func=self._select_subset, feature_names_out=lambda _, __: subset_features
+        )
+
+    def _select_subset(self, x: pd.DataFrame) -> pd.DataFrame:
+        LOGGER.info("Columns before transform: %s", x.columns)
+        y = x[self.subset_features]
+        LOGGER.info("Columns after transform: %s", y.columns)
+        return y
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest call in microseconds."""
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1e6
+
+
+@click.command()
+@click.option("--rows", default=24, type=click.IntRange(min=1))
+@click.option("--repeat", default=2000, type=click.IntRange(min=1))
+def main(rows: int, repeat: int) -> None:
+    """Compares the transform of both implementations on a weather frame."""
+    # Logs are formatted but not printed, like in a deployment shipping logs.
+    logging.basicConfig(
+        level=logging.INFO, handlers=[logging.StreamHandler(io.StringIO())]
+    )
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(
+        rng.uniform(size=(rows, 12)),
+        columns=[f"other_{i}" for i in range(7)] + WEATHER_PARAMS,
+    )
+    array = frame.to_numpy()
+    legacy = LegacySelectSubset(WEATHER_PARAMS).fit(frame)
+    selector = SelectSubset(WEATHER_PARAMS).fit(frame)
+    pd.testing.assert_frame_equal(legacy.transform(frame), selector.transform(frame))
+
+    legacy_us = best_of(lambda: legacy.transform(frame), repeat)
+    frame_us = best_of(lambda: selector.transform(frame), repeat)
+    array_us = best_of(lambda: selector.transform(array), repeat)
+    print(f"rows: {rows}, logging at INFO")
+    print(f"legacy:        {legacy_us:8.1f} us")
+    print(f"frame:         {frame_us:8.1f} us ({legacy_us / frame_us:.1f}x)")
+    print(f"array:         {array_us:8.1f} us ({legacy_us / array_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
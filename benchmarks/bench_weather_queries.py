@@ -0,0 +1,118 @@
+"""Benchmark of the common weather queries with and without the date leading index.
+
+Fills the weather table with hourly data of --locations locations over --hours
+hours (10M rows by default) and times "all locations for a time window", "latest
+forecast for a location" and "one location for a month". Run with:
+    poetry run python benchmarks/bench_weather_queries.py --database-url sqlite:///bench.db
+
+Against Postgres the table is partitioned by month, so the window queries also
+benefit from partition pruning.
+"""
+
+import datetime as dt
+import timeit
+from typing import Callable
+
+import click
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from pv_prediction.data.bulk_writer import BulkWriter
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.weather_storage import migrate_weather_table
+
+START: dt.datetime = dt.datetime(2020, 1, 1)
+
+
+def fill_table(engine: sa.Engine, locations: int, hours: int) -> None:
+    """Upserts hourly weather of locations locations over hours hours."""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(START, periods=hours, freq="h")
+    writer = BulkWriter(engine, batch_size=50_000)
+    for location in range(locations):
+        writer.upsert(
+            FlattenedWeather,
+            pd.DataFrame(
+                {
+                    "lat": 45.0 + location * 0.01,
+                    "lon": 7.0 + location * 0.01,
+                    "date": dates,
+                    "t_2m": rng.normal(10, 8, hours),
+                    "precip_1h": rng.exponential(0.2, hours),
+                    "wind_speed_10m": rng.gamma(2, 2, hours),
+                }
+            ),
+        )
+
+
+def queries(hours: int) -> dict[str, sa.Select]:
+    """Returns the benchmarked queries."""
+    middle = START + dt.timedelta(hours=hours // 2)
+    weather = FlattenedWeather
+    return {
+        "all locations, 24h window": sa.select(weather).where(
+            weather.date >= middle, weather.date < middle + dt.timedelta(days=1)
+        ),
+        "latest of a location": sa.select(weather)
+        .where(weather.lat == 45.0, weather.lon == 7.0)
+        .order_by(weather.date.desc())
+        .limit(1),
+        "one location, 30 days": sa.select(weather).where(
+            weather.lat == 45.0,
+            weather.lon == 7.0,
+            weather.date >= middle,
+            weather.date < middle + dt.timedelta(days=30),
+        ),
+    }
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest of repeat runs in milliseconds."""
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1e3
+
+
+@click.command()
+@click.option("--database-url", default="sqlite:///bench_weather.db", type=str)
+@click.option("--locations", default=200, type=click.IntRange(min=1))
+@click.option("--hours", default=50_000, type=click.IntRange(min=24 * 31))
+@click.option("--repeat", default=5, type=click.IntRange(min=1))
+def main(database_url: str, locations: int, hours: int, repeat: int) -> None:
+    """Times the weather queries with the date leading index and without it."""
+    DBSessionManager.configure(DatabaseConfig(url=database_url))
+    engine = DBSessionManager.get_engine()
+    with engine.connect() as connection:
+        rows = connection.execute(
+            sa.select(sa.func.count()).select_from(  # pylint: disable=not-callable
+                FlattenedWeather
+            )
+        ).scalar()
+    if rows != locations * hours:
+        fill_table(engine, locations, hours)
+    print(f"rows: {locations * hours:,}")
+
+    def run_all(connection: sa.Connection) -> dict[str, float]:
+        return {
+            name: best_of(lambda query=query: connection.execute(query).all(), repeat)
+            for name, query in queries(hours).items()
+        }
+
+    with engine.connect() as connection:
+        indexed = run_all(connection)
+    with engine.begin() as connection:
+        connection.execute(sa.text("DROP INDEX ix_weather_date_lat_lon"))
+    with engine.connect() as connection:
+        unindexed = run_all(connection)
+    migrate_weather_table(engine)
+
+    for name, seconds in indexed.items():
+        print(
+            f"{name:28} without: {unindexed[name]:9.2f} ms  "
+            + f"with: {seconds:9.2f} ms ({unindexed[name] / seconds:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
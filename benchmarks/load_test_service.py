@@ -0,0 +1,190 @@
+"""Load test of the prediction service reporting latency percentiles and throughput.
+
+Without --url the service is created in-process around a compiled model trained on
+synthetic data and called through the ASGI transport of httpx, which measures the
+service without network and worker overhead. With --url a running service is
+tested, e.g. one started with gunicorn from the Dockerfile.
+
+Run with:
+    poetry run python benchmarks/load_test_service.py --requests 2000 --concurrency 32
+    poetry run python benchmarks/load_test_service.py --endpoint batch --sites 100
+"""
+
+import asyncio
+import datetime as dt
+import logging
+import time
+import types
+
+import click
+import httpx
+import numpy as np
+import orjson
+import pandas as pd
+
+from pv_prediction.main import create_app
+from pv_prediction.main import ServiceConfig
+from pv_prediction.model.compiled_predictor import CompiledPredictor
+from pv_prediction.model.inferencing_runner import InferencingRunner
+from pv_prediction.model.pv_pipeline import PVPipeline
+
+# The runner is handed a model trained in-process instead of loading one from mlflow.
+# pylint: disable=protected-access
+
+PARAMETERS: list[str] = [
+    "t_2m:C",
+    "precip_1h:mm",
+    "wind_speed_10m:ms",
+    "msl_pressure:hPa",
+    "uv:idx",
+    "weather_symbol_1h:idx",
+]
+WEATHER_PARAMS: list[str] = [
+    parameter.split(":", maxsplit=1)[0] for parameter in PARAMETERS
+]
+
+
+def build_weather(hours: int, rng: np.random.Generator) -> dict:
+    """Builds a meteomatics response of one location with all PARAMETERS."""
+    start = dt.datetime(2025, 6, 1, tzinfo=dt.timezone.utc)
+    dates = [(start + dt.timedelta(hours=h)).isoformat() for h in range(hours)]
+    return {
+        "version": "3.0",
+        "user": "load-test",
+        "dateGenerated": start.isoformat(),
+        "status": "OK",
+        "data": [
+            {
+                "parameter": parameter,
+                "coordinates": [
+                    {
+                        "lat": 47.0,
+                        "lon": 8.0,
+                        "dates": [
+                            {"date": date, "value": float(value)}
+                            for date, value in zip(dates, rng.uniform(size=hours))
+                        ],
+                    }
+                ],
+            }
+            for parameter in PARAMETERS
+        ],
+    }
+
+
+def build_runner(rng: np.random.Generator) -> InferencingRunner:
+    """Returns a runner serving a compiled model trained on synthetic data."""
+    train = pd.DataFrame(
+        rng.uniform(size=(10_000, len(WEATHER_PARAMS))), columns=WEATHER_PARAMS
+    )
+    pipeline = PVPipeline.get_pipeline(WEATHER_PARAMS)
+    pipeline.set_params(estimator__verbose=-1)
+    pipeline.fit(train, train.sum(axis=1))
+    runner = InferencingRunner()
+    runner._model = CompiledPredictor.from_pipeline(pipeline)
+    runner._model._model_info = types.SimpleNamespace(model_uuid="load-test")
+    return runner
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    path: str,
+    body: bytes,
+    requests: int,
+    concurrency: int,
+) -> tuple[np.ndarray, float]:
+    """Sends requests from concurrency workers, returns the latencies and duration."""
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post(path, content=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return np.array(latencies), time.perf_counter() - started
+
+
+def build_request(
+    endpoint: str, hours: int, sites: int, rng: np.random.Generator
+) -> tuple[str, bytes]:
+    """Returns the path and body of the requests to the endpoint."""
+    weather = build_weather(hours, rng)
+    if endpoint == "single":
+        return "/predict/1", orjson.dumps(weather)
+    return "/predict", b"\n".join(
+        orjson.dumps({"pv_id": str(i), "weather": weather}) for i in range(sites)
+    )
+
+
+def build_client(
+    url: str | None, micro_batching: bool, rng: np.random.Generator
+) -> httpx.AsyncClient:
+    """Returns a client of the service at url or of an in-process service."""
+    if url is not None:
+        return httpx.AsyncClient(base_url=url, timeout=60)
+    app = create_app(
+        ServiceConfig(reload_model=False, micro_batching=micro_batching),
+        build_runner(rng),
+    )
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=60
+    )
+
+
+async def load_test(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    url: str | None,
+    endpoint: str,
+    requests: int,
+    concurrency: int,
+    hours: int,
+    sites: int,
+    micro_batching: bool,
+) -> None:
+    """Runs the load test and prints the results."""
+    rng = np.random.default_rng(0)
+    path, body = build_request(endpoint, hours, sites, rng)
+    async with build_client(url, micro_batching, rng) as client:
+        # Warm up the connections and the model.
+        await run_load(client, path, body, concurrency, concurrency)
+        latencies, seconds = await run_load(client, path, body, requests, concurrency)
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"endpoint: {endpoint}, hours: {hours}, concurrency: {concurrency}")
+    print(f"p50:        {p50:8.2f} ms")
+    print(f"p99:        {p99:8.2f} ms")
+    print(f"throughput: {requests / seconds:8.1f} requests/s")
+    if endpoint == "batch":
+        print(f"            {requests * sites / seconds:8.1f} sites/s")
+
+
+@click.command()
+@click.option("--url", default=None, help="Service to test, in-process if not set")
+@click.option("--endpoint", default="single", type=click.Choice(["single", "batch"]))
+@click.option("--requests", default=2000, type=click.IntRange(min=1))
+@click.option("--concurrency", default=32, type=click.IntRange(min=1))
+@click.option("--hours", default=48, type=click.IntRange(min=1))
+@click.option("--sites", default=100, type=click.IntRange(min=1))
+@click.option("--micro-batching", is_flag=True, default=False)
+def main(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    url: str | None,
+    endpoint: str,
+    requests: int,
+    concurrency: int,
+    hours: int,
+    sites: int,
+    micro_batching: bool,
+) -> None:
+    """Load tests the prediction service."""
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(
+        load_test(url, endpoint, requests, concurrency, hours, sites, micro_batching)
+    )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import functools
+import inspect
+import os
+import time
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Iterator
+from typing import TypeVar
+
+from prometheus_client import CollectorRegistry
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest
+from prometheus_client import Histogram
+from prometheus_client import multiprocess
+from prometheus_client import ProcessCollector
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclasses.dataclass
+class MetricsConfig:
+    """Metrics related configs."""
+
+    enabled: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    )
+
+
+REGISTRY: CollectorRegistry = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+STAGE_SECONDS: Histogram = Histogram(
+    "pv_prediction_stage_seconds",
+    "Latency of an instrumented stage.",
+    ["stage"],
+    buckets=(
+        *(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+        *(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    ),
+    registry=REGISTRY,
+)
+STAGE_BYTES: Histogram = Histogram(
+    "pv_prediction_stage_payload_bytes",
+    "Size of the payload handled by an instrumented stage.",
+    ["stage"],
+    buckets=tuple(10.0**exponent for exponent in range(2, 10)),
+    registry=REGISTRY,
+)
+STAGE_ROWS: Histogram = Histogram(
+    "pv_prediction_stage_rows",
+    "Number of rows handled by an instrumented stage.",
+    ["stage"],
+    buckets=tuple(10.0**exponent for exponent in range(0, 8)),
+    registry=REGISTRY,
+)
+
+
+class _State:
+    # A class attribute is the cheapest switch to check on every call.
+    enabled: bool = MetricsConfig().enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enables or disables recording for all instrumented stages."""
+    _State.enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Returns whether stages are recorded."""
+    return _State.enabled
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """Decorator recording the latency of every call of a function as stage.
+
+    Works for functions and coroutine functions. While metrics are disabled the
+    only overhead is a single attribute check per call.
+    """
+
+    def decorator(func: F) -> F:
+        seconds = _child(STAGE_SECONDS, stage)
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not _State.enabled:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    seconds.observe(time.perf_counter() - started)
+
+            return async_wrapper  # pyre-ignore[7]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _State.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds.observe(time.perf_counter() - started)
+
+        return wrapper  # pyre-ignore[7]
+
+    return decorator
+
+
+_NULL_CONTEXT: ContextManager[None] = contextlib.nullcontext()
+
+
+def timer(stage: str) -> ContextManager[None]:
+    """Context manager recording the latency of its block as stage."""
+    if not _State.enabled:
+        return _NULL_CONTEXT
+    return _timer(stage)
+
+
+@contextlib.contextmanager
+def _timer(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _child(STAGE_SECONDS, stage).observe(time.perf_counter() - started)
+
+
+def record_seconds(stage: str, seconds: float) -> None:
+    """Records a latency of stage measured by the caller."""
+    if _State.enabled:
+        _child(STAGE_SECONDS, stage).observe(seconds)
+
+
+def record_size(
+    stage: str, *, rows: int | None = None, payload_bytes: int | None = None
+) -> None:
+    """Records the number of rows and the payload size handled by stage."""
+    if not _State.enabled:
+        return
+    if rows is not None:
+        _child(STAGE_ROWS, stage).observe(rows)
+    if payload_bytes is not None:
+        _child(STAGE_BYTES, stage).observe(payload_bytes)
+
+
+@functools.cache
+def _child(histogram: Histogram, stage: str) -> Histogram:
+    # Resolving the labels takes a lock and a lookup, so the child is cached.
+    return histogram.labels(stage)
+
+
+def exposition() -> tuple[bytes, str]:
+    """Returns all metrics in the Prometheus text format and its content type.
+
+    If PROMETHEUS_MULTIPROC_DIR is set, e.g. for several gunicorn workers, the
+    metrics of all worker processes are aggregated.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from pv_prediction.common.metrics import is_enabled
+from pv_prediction.common.metrics import timer
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import engine_options
+from pv_prediction.data.db_session_manger import set_sqlite_pragmas
+
+ASYNC_DRIVERS: dict[str, str] = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str | sa.URL) -> sa.URL:
+    """Returns url with the async driver of its backend, i.e. aiosqlite or asyncpg.
+
+    This allows the sync and the async engine to share the same DATABASE_URL.
+    """
+    url = sa.make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise NotImplementedError(
+            f"Async sessions for the backend {backend} have not been implemented yet"
+        )
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDBSessionManager:
+    """Async counterpart of the DBSessionManager for request handlers.
+
+    Uses the same DatabaseConfig, but connects with aiosqlite or asyncpg so that
+    queries do not block the event loop. The engine and missing tables are created
+    on first use:
+
+        async with AsyncDBSessionManager.session() as session:
+            session.add(PredictionsTable(...))
+    """
+
+    config: DatabaseConfig | None = None
+    _engine: AsyncEngine | None = None
+    _session_maker: async_sessionmaker[AsyncSession] = async_sessionmaker(
+        expire_on_commit=False
+    )
+    _lock: asyncio.Lock | None = None
+
+    @classmethod
+    def configure(cls, config: DatabaseConfig) -> None:
+        """Sets the config used to create the engine.
+
+        Must be called before the current engine is used again, dispose it with
+        `close_sessions` first.
+        """
+        cls.config = config
+        cls._engine = None
+        cls._session_maker = async_sessionmaker(expire_on_commit=False)
+        cls._lock = None
+
+    @classmethod
+    async def get_engine(cls) -> AsyncEngine:
+        """Returns the engine, creating it and all missing tables on first use."""
+        if cls._engine is None:
+            async with cls._get_lock():  # pylint: disable=not-async-context-manager
+                if cls._engine is None:
+                    config = cls.config if cls.config is not None else DatabaseConfig()
+                    url = async_url(config.url)
+                    engine = create_async_engine(url, **engine_options(config, url))
+                    if url.get_backend_name() == "sqlite":
+                        set_sqlite_pragmas(engine.sync_engine, config.sqlite_pragmas)
+                    async with engine.begin() as connection:
+                        await connection.run_sync(Base.metadata.create_all)
+                    cls._session_maker.configure(bind=engine)
+                    cls._engine = engine
+        return cls._engine
+
+    @classmethod
+    def _get_lock(cls) -> asyncio.Lock:
+        # The lock is created lazily, as it binds to the event loop of its first use.
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        return cls._lock
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def session(cls) -> AsyncIterator[AsyncSession]:
+        """Provides a session which is committed on success and rolled back on errors.
+
+        The session is closed afterwards, which returns its connection to the pool.
+        """
+        session = await cls.get_session()
+        try:
+            if is_enabled():
+                # The connection is checked out lazily, so it is forced for timing.
+                with timer("db.checkout"):
+                    await session.connection()
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    @classmethod
+    async def get_session(cls) -> AsyncSession:
+        """Returns a new session which has to be released with `release_session`."""
+        await cls.get_engine()
+        return cls._session_maker()
+
+    @classmethod
+    async def release_session(cls, session: AsyncSession) -> None:
+        """Closes the session and returns its connection to the pool."""
+        await session.close()
+
+    @classmethod
+    async def close_sessions(cls) -> None:
+        """Closes all pooled connections. The engine reconnects on its next use."""
+        if cls._engine is not None:
+            await cls._engine.dispose()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import dataclasses
+import io
+import logging
+import time
+from typing import Any
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.weather_storage import create_monthly_partitions
+from pv_prediction.data.weather_storage import partition_column
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class UpsertStats:
+    """Statistics of a bulk upsert."""
+
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        """Returns the throughput of the upsert."""
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+class BulkWriter:
+    """Upserts frames or arrow tables in batches using the fast path of the dialect.
+
+    On SQLite every batch is written with a single executemany of an
+    `INSERT ... ON CONFLICT DO UPDATE`. On Postgres every batch is copied into a
+    temporary staging table with `COPY` and merged into the target table from there.
+    Missing monthly partitions of partitioned tables are created on the fly.
+    """
+
+    def __init__(
+        self, engine: sa.Engine | None = None, batch_size: int = 10_000
+    ) -> None:
+        """Inits the writer for engine, defaults to the engine of the DBSessionManager."""
+        self.engine: sa.Engine = (
+            engine if engine is not None else DBSessionManager.get_engine()
+        )
+        self.batch_size: int = batch_size
+
+    def upsert(self, table: type[Base], data: pd.DataFrame | pa.Table) -> UpsertStats:
+        """Inserts all rows of data into table, updating rows with existing keys.
+
+        Args:
+            table (type[Base]): ORM class of the target table.
+            data (pd.DataFrame | pa.Table): Rows to upsert. Columns which are not part
+                of the table are ignored, all primary key columns must be present.
+
+        Returns:
+            Number of written rows and the time it took.
+        """
+        target: sa.Table = table.__table__  # pyre-ignore[16]
+        primary_keys = [column.name for column in target.primary_key.columns]
+        missing = set(primary_keys) - set(
+            data.column_names if isinstance(data, pa.Table) else data.columns
+        )
+        if missing:
+            raise ValueError(f"Primary key columns {sorted(missing)} are missing.")
+
+        dialect = self.engine.dialect.name
+        if dialect == "sqlite":
+            write_batch = self._write_sqlite_batch
+        elif dialect == "postgresql":
+            write_batch = self._write_postgres_batch
+        else:
+            raise NotImplementedError(
+                f"Bulk upserts for the dialect {dialect} have not been implemented yet"
+            )
+
+        start = time.perf_counter()
+        rows = 0
+        for batch in self._batches(data, target):
+            write_batch(target, batch, primary_keys)
+            rows += len(batch)
+        stats = UpsertStats(rows=rows, seconds=time.perf_counter() - start)
+        LOGGER.info(
+            "Upserted %i rows into %s in %.2f seconds (%.0f rows/s).",
+            stats.rows,
+            target.name,
+            stats.seconds,
+            stats.rows_per_second,
+        )
+        return stats
+
+    def _batches(
+        self, data: pd.DataFrame | pa.Table, target: sa.Table
+    ) -> Iterator[pd.DataFrame]:
+        """Yields batches restricted to the table columns.
+
+        Timestamps are converted to naive UTC and integer columns to nullable
+        integers, so that missing values do not turn them into floats.
+        """
+        if isinstance(data, pa.Table):
+            frames = (batch.to_pandas() for batch in data.to_batches(self.batch_size))
+        else:
+            frames = (
+                data.iloc[i : i + self.batch_size]
+                for i in range(0, len(data), self.batch_size)
+            )
+        for frame in frames:
+            frame = frame[
+                [
+                    column.name
+                    for column in target.columns
+                    if column.name in frame.columns
+                ]
+            ]
+            for name, dtype in frame.dtypes.items():
+                if isinstance(dtype, pd.DatetimeTZDtype):
+                    frame = frame.assign(
+                        **{name: frame[name].dt.tz_convert("UTC").dt.tz_localize(None)}
+                    )
+                elif isinstance(target.columns[name].type, sa.Integer):
+                    frame = frame.assign(**{name: frame[name].astype("Int64")})
+            yield frame
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> list[dict[str, Any]]:
+        """Converts a frame to records with None instead of NaN or NaT."""
+        return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+    def _write_sqlite_batch(
+        self, target: sa.Table, frame: pd.DataFrame, primary_keys: list[str]
+    ) -> None:
+        statement = sqlite.insert(target)
+        statement = statement.on_conflict_do_update(
+            index_elements=primary_keys,
+            set_={
+                name: statement.excluded[name]
+                for name in frame.columns
+                if name not in primary_keys
+            },
+        )
+        with self.engine.begin() as connection:
+            connection.execute(statement, self._records(frame))
+
+    def _write_postgres_batch(
+        self, target: sa.Table, frame: pd.DataFrame, primary_keys: list[str]
+    ) -> None:
+        quote = self.engine.dialect.identifier_preparer.quote
+        table_name = quote(target.name)
+        staging_name = quote(f"staging_{target.name}")
+        columns = ", ".join(quote(name) for name in frame.columns)
+        updates = ", ".join(
+            f"{quote(name)} = EXCLUDED.{quote(name)}"
+            for name in frame.columns
+            if name not in primary_keys
+        )
+        conflict_action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        buffer = io.StringIO()
+        frame.to_csv(
+            buffer, index=False, header=False, date_format="%Y-%m-%dT%H:%M:%S.%f"
+        )
+        buffer.seek(0)
+
+        with self.engine.begin() as connection:
+            if (column := partition_column(target)) is not None and len(frame) > 0:
+                create_monthly_partitions(
+                    connection, target, frame[column].min(), frame[column].max()
+                )
+            cursor = connection.connection.cursor()
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging_name} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.copy_expert(
+                f"COPY {staging_name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {staging_name} "
+                + f"ON CONFLICT ({', '.join(quote(name) for name in primary_keys)}) {conflict_action}"
+            )
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime as dt
+import json
+import logging
+import pathlib
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME: str = "_manifest.json"
+
+
+@dataclasses.dataclass
+class ExtractionManifest:
+    """Manifest of the days already extracted into a day partitioned dataset.
+
+    Every extracted day is stored with the UTC time of its extraction. A day only
+    counts as complete if it was extracted after it ended, days extracted while
+    they were still running are fetched again on the next run.
+    """
+
+    dataset_dir: pathlib.Path
+    parameters: list[str] = dataclasses.field(default_factory=list)
+    extracted_at: dict[dt.date, dt.datetime] = dataclasses.field(default_factory=dict)
+
+    @property
+    def path(self) -> pathlib.Path:
+        """Returns the path of the manifest file inside the dataset."""
+        return self.dataset_dir / MANIFEST_FILE_NAME
+
+    @classmethod
+    def load(
+        cls, dataset_dir: pathlib.Path, parameters: list[str]
+    ) -> ExtractionManifest:
+        """Loads the manifest of dataset_dir or returns an empty one.
+
+        If the manifest was written for other parameters, all days are considered
+        missing since the stored partitions do not contain the requested columns.
+        """
+        manifest = cls(dataset_dir, parameters)
+        if not manifest.path.exists():
+            return manifest
+        content = json.loads(manifest.path.read_text())
+        if content["parameters"] != parameters:
+            LOGGER.warning(
+                "Parameters changed from %s to %s. Extracting all days again.",
+                content["parameters"],
+                parameters,
+            )
+            return manifest
+        manifest.extracted_at = {
+            dt.date.fromisoformat(day): dt.datetime.fromisoformat(extracted_at)
+            for day, extracted_at in content["extracted_at"].items()
+        }
+        return manifest
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so an interrupted run never corrupts it."""
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        content = {
+            "parameters": self.parameters,
+            "extracted_at": {
+                day.isoformat(): extracted_at.isoformat()
+                for day, extracted_at in sorted(self.extracted_at.items())
+            },
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(content, indent=2))
+        tmp_path.replace(self.path)
+
+    def is_complete(self, day: dt.date) -> bool:
+        """Returns True if the day has been extracted after it ended."""
+        extracted_at = self.extracted_at.get(day)
+        if extracted_at is None:
+            return False
+        day_end = dt.datetime.combine(
+            day + dt.timedelta(days=1), dt.time.min
+        ).astimezone()
+        return extracted_at >= day_end
+
+    def missing_days(self, start_date: dt.date, end_date: dt.date) -> list[dt.date]:
+        """Returns all days between start_date and end_date that are not complete."""
+        n_days = (end_date - start_date).days + 1
+        days = [start_date + dt.timedelta(days=i) for i in range(n_days)]
+        return [day for day in days if not self.is_complete(day)]
+
+    def mark_extracted(self, days: list[dt.date], extracted_at: dt.datetime) -> None:
+        """Marks days as extracted at extracted_at."""
+        for day in days:
+            self.extracted_at[day] = extracted_at
+
+    @staticmethod
+    def partition_path(dataset_dir: pathlib.Path, day: dt.date) -> pathlib.Path:
+        """Returns the hive style partition directory of a day."""
+        return dataset_dir / f"date={day.isoformat()}"
@@ -1,14 +1,27 @@
+import collections
 import dataclasses
 import datetime as dt
 import logging
 import os
 import pathlib
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Iterator
 
 import click
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
+
+from pv_prediction.common.metrics import record_size
+from pv_prediction.common.metrics import timed
+from pv_prediction.data.converter.extraction_manifest import ExtractionManifest
 
 LOGGER: logging.Logger = logging.getLogger(__name__)
 
@@ -22,6 +35,18 @@ class FroniusConfig:
     ip_adress: str = dataclasses.field(
         default_factory=lambda: os.getenv("FRONIUS_IP", "")
     )
+    max_workers: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("FRONIUS_MAX_WORKERS", "1"))
+    )
+    timeout: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("FRONIUS_TIMEOUT", "60"))
+    )
+    max_retries: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("FRONIUS_MAX_RETRIES", "3"))
+    )
+    backoff_seconds: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("FRONIUS_BACKOFF_SECONDS", "1"))
+    )
 
 
 class FroniusConnector:
@@ -29,11 +54,15 @@ class FroniusConnector:
 
     def __init__(self, config: FroniusConfig | None = None) -> None:
         """Initializes a Fronius connector to extract data of the corresponding API."""
+        self.config: FroniusConfig = config if config is not None else FroniusConfig()
         session = requests.Session()
         session.trust_env = False
+        # One pooled connection per worker, so parallel windows reuse connections.
+        adapter = HTTPAdapter(pool_maxsize=max(self.config.max_workers, 1))
+        session.mount("http://", adapter)
         self.session: requests.Session = session
-        self.config: FroniusConfig = config if config is not None else FroniusConfig()
 
+    @timed("fronius.query_data")
     def _query_data(
         self, start_date: dt.date, end_date: dt.date, parameters: list[str]
     ) -> pd.DataFrame:
@@ -52,69 +81,186 @@ class FroniusConnector:
             + f"{channels}"
         )
         LOGGER.debug("Calling the following url: %s", url)
-        response = self.session.get(url)
+        response = self.session.get(url, timeout=self.config.timeout)
+        record_size("fronius.query_data", payload_bytes=len(response.content))
         return self._transform_response(response, parameters)
 
     @classmethod
     def _iterate_over_body(
         cls, json_data: dict[str, Any], parameters: list[str]
     ) -> pd.DataFrame:
-        series_list = []
-        for k, v in json_data.items():
-            if isinstance(v, dict):
-                for series in cls._series_of_parameters(v, parameters.copy()):
-                    series.index = pd.to_datetime(
-                        json_data[k]["Start"]
-                    ) + pd.to_timedelta(series.index.astype("int"), unit="sec")
-                    series_list += [series]
-        return pd.concat(series_list, axis=1)[parameters]
+        frames = [
+            frame
+            for device in json_data.values()
+            if isinstance(device, dict)
+            and (frame := cls._device_frame(device, parameters)) is not None
+        ]
+        return pd.concat(frames, axis=1)[parameters]
 
-    @classmethod
-    def _series_of_parameters(
-        cls, json_data: dict[str, Any], parameters: list[str]
-    ) -> Iterator[pd.Series]:
-        if isinstance(json_data, dict):
-            for k, v in json_data.items():
-                if k in parameters:
-                    parameters.remove(k)
-                    series = pd.Series(v["Values"])
-                    series.name = k
-                    yield series
-                if len(parameters) == 0:
-                    break
-                yield from (s for s in cls._series_of_parameters(v, parameters))
+    @staticmethod
+    def _device_frame(
+        device: dict[str, Any], parameters: list[str]
+    ) -> pd.DataFrame | None:
+        """Builds a frame of all requested channels of a single device.
+
+        Channels of a device are usually sampled at the same offsets (seconds since
+        the device's start), in which case the offsets are parsed once and every
+        channel is converted to a numpy array without any alignment.
+        """
+        values_per_channel = {
+            name: channel["Values"]
+            for name, channel in device.get("Data", {}).items()
+            if name in parameters
+        }
+        if not values_per_channel:
+            return None
+        keys = next(iter(values_per_channel.values())).keys()
+        if all(values.keys() == keys for values in values_per_channel.values()):
+            offsets = np.fromiter(map(int, keys), dtype=np.int64, count=len(keys))
+            frame = pd.DataFrame(
+                {
+                    name: np.array(list(values.values()))
+                    for name, values in values_per_channel.items()
+                },
+                index=offsets,
+            )
+        else:
+            frame = pd.DataFrame(
+                {
+                    name: pd.Series(
+                        list(values.values()),
+                        index=np.fromiter(map(int, values), dtype=np.int64),
+                    )
+                    for name, values in values_per_channel.items()
+                }
+            )
+        if not frame.index.is_monotonic_increasing:
+            frame = frame.sort_index()
+        frame.index = pd.to_datetime(device["Start"]) + pd.to_timedelta(
+            frame.index, unit="sec"
+        )
+        return frame
 
     @classmethod
     def _transform_response(
         cls, response: requests.Response, parameters: list[str]
     ) -> pd.DataFrame:
         response.raise_for_status()
-        json_data = response.json()
+        try:
+            json_data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            # Truncated bodies are retried like any other failed request.
+            raise requests.JSONDecodeError(
+                e.msg, e.doc, e.pos, response=response
+            ) from e
         return cls._iterate_over_body(json_data["Body"]["Data"], parameters)
 
-    def _get_data(
+    def _query_window(
         self, start_date: dt.date, end_date: dt.date, parameters: list[str]
-    ) -> pd.DataFrame:
-        delta = dt.timedelta(days=MAX_QUERY_DAYS)
-        if not (end_date - start_date).days > MAX_QUERY_DAYS:
-            queried = self._query_data(start_date, end_date, parameters)
-            return pd.concat([queried])
-        LOGGER.info(
-            "Date difference exceeded the maximum amout of querieble data of %i days. Continuing with batchwise extraction.",
-            MAX_QUERY_DAYS,
-        )
-        query_starts = [
-            date.date()
-            for date in pd.date_range(start_date, end_date - delta, freq=delta)
-        ]
-        query_list = []
-        for start in query_starts:
-            queried = self._query_data(
-                start, start + dt.timedelta(MAX_QUERY_DAYS - 1), parameters
+    ) -> pd.DataFrame | None:
+        """Queries a single window and retries failed requests with exponential backoff.
+
+        Responses which cannot be parsed, e.g. without any of the requested channels,
+        are not retried, the window is failed right away like after the last retry.
+        """
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                return self._query_data(start_date, end_date, parameters)
+            except requests.RequestException as e:
+                if attempt == self.config.max_retries:
+                    LOGGER.error(
+                        "Giving up on window %s to %s after %i attempts: %s",
+                        start_date,
+                        end_date,
+                        attempt + 1,
+                        e,
+                    )
+                    return None
+                delay = self.config.backoff_seconds * 2**attempt
+                LOGGER.warning(
+                    "Query of window %s to %s failed (%s). Retrying in %.1f seconds.",
+                    start_date,
+                    end_date,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+            except (KeyError, TypeError, ValueError) as e:
+                LOGGER.error(
+                    "Giving up on window %s to %s, its response could not be parsed: %r",
+                    start_date,
+                    end_date,
+                    e,
+                )
+                return None
+        return None
+
+    @staticmethod
+    def _query_windows(
+        start_date: dt.date, end_date: dt.date
+    ) -> list[tuple[dt.date, dt.date]]:
+        """Splits the date range into consecutive windows of at most MAX_QUERY_DAYS days."""
+        windows = []
+        window_start = start_date
+        while window_start <= end_date:
+            window_end = min(
+                window_start + dt.timedelta(days=MAX_QUERY_DAYS - 1), end_date
+            )
+            windows += [(window_start, window_end)]
+            window_start = window_end + dt.timedelta(days=1)
+        return windows
+
+    def _iter_windows(
+        self, windows: list[tuple[dt.date, dt.date]], parameters: list[str]
+    ) -> Iterator[tuple[tuple[dt.date, dt.date], pd.DataFrame | None]]:
+        """Yields every window with its data in chronological order.
+
+        Windows are queried concurrently by up to `max_workers` threads sharing the
+        same session. At most two windows per worker are in flight at any time, so
+        results that are not consumed yet do not pile up in memory. Windows that
+        failed after all retries are yielded with None.
+        """
+        if len(windows) > 1:
+            LOGGER.info(
+                "Date difference exceeded the maximum amout of querieble data of %i days. "
+                + "Continuing with batchwise extraction of %i windows using %i workers.",
+                MAX_QUERY_DAYS,
+                len(windows),
+                self.config.max_workers,
             )
+        max_in_flight = 2 * self.config.max_workers
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            pending: collections.deque[
+                tuple[tuple[dt.date, dt.date], Future[pd.DataFrame | None]]
+            ] = collections.deque()
+            for window in windows:
+                pending.append(
+                    (window, executor.submit(self._query_window, *window, parameters))
+                )
+                while len(pending) >= max_in_flight:
+                    done_window, future = pending.popleft()
+                    yield done_window, future.result()
+            while pending:
+                done_window, future = pending.popleft()
+                yield done_window, future.result()
+
+    def _iter_data(
+        self, start_date: dt.date, end_date: dt.date, parameters: list[str]
+    ) -> Iterator[pd.DataFrame]:
+        """Yields the data of each successfully queried window in chronological order."""
+        windows = self._query_windows(start_date, end_date)
+        for _, queried in self._iter_windows(windows, parameters):
             if queried is not None:
-                query_list += [queried]
+                yield queried
 
+    def _get_data(
+        self, start_date: dt.date, end_date: dt.date, parameters: list[str]
+    ) -> pd.DataFrame:
+        query_list = list(self._iter_data(start_date, end_date, parameters))
+        if not query_list:
+            raise ValueError(
+                f"No data could be extracted between {start_date} and {end_date}."
+            )
         return pd.concat(query_list)
 
     def extract_data(
@@ -123,6 +269,8 @@ class FroniusConnector:
         end_date: dt.date,
         file_path: pathlib.Path,
         parameters: list[str],
+        *,
+        streaming: bool = False,
     ) -> None:
         """Extracts energy production data from a fronius converter.
 
@@ -133,13 +281,126 @@ class FroniusConnector:
             parameters (list[str]): List of parameters to query for. For more information
                 check out the documentation of the api here:
                 https://www.fronius.com/~/downloads/Solar%20Energy/Operating%20Instructions/42,0410,2012.pdf
+            streaming (bool): If True, every window is appended to the parquet file as a
+                row group as soon as it is parsed instead of concatenating all windows
+                in memory first.
 
         Returns:
             None
         """
+        if streaming:
+            self._write_stream(
+                self._iter_data(start_date, end_date, parameters), file_path
+            )
+            return
         api_df = self._get_data(start_date, end_date, parameters)
         api_df.to_parquet(file_path)
 
+    def extract_incremental(
+        self,
+        start_date: dt.date,
+        end_date: dt.date,
+        dataset_dir: pathlib.Path,
+        parameters: list[str],
+    ) -> None:
+        """Extracts only the days missing in a day partitioned parquet dataset.
+
+        Every day is stored in its own hive style partition (`date=YYYY-MM-DD`) and
+        recorded in a manifest once its window has been extracted. Only days which
+        are missing or were extracted before they ended are queried again, so
+        re-running the extraction resumes where a previous run stopped.
+
+        Args:
+            start_date (dt.date): The data from when to start querying the data.
+            end_date (dt.date): The data until when to query the data.
+            dataset_dir (pathlib.Path): Directory of the partitioned dataset.
+            parameters (list[str]): List of parameters to query for.
+
+        Returns:
+            None
+        """
+        manifest = ExtractionManifest.load(dataset_dir, parameters)
+        missing_days = manifest.missing_days(start_date, end_date)
+        LOGGER.info(
+            "%i of %i days need to be extracted.",
+            len(missing_days),
+            (end_date - start_date).days + 1,
+        )
+        windows = [
+            window
+            for run_start, run_end in self._consecutive_runs(missing_days)
+            for window in self._query_windows(run_start, run_end)
+        ]
+        for (window_start, window_end), queried in self._iter_windows(
+            windows, parameters
+        ):
+            if queried is None:
+                continue
+            extracted_at = dt.datetime.now(dt.timezone.utc)
+            days = pd.Index(queried.index.date)
+            for day in days.unique():
+                partition_dir = manifest.partition_path(dataset_dir, day)
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                pq.write_table(
+                    self._to_arrow(queried[days == day], None),
+                    partition_dir / "part-0.parquet",
+                )
+            manifest.mark_extracted(
+                [
+                    window_start + dt.timedelta(days=i)
+                    for i in range((window_end - window_start).days + 1)
+                ],
+                extracted_at,
+            )
+            manifest.save()
+
+    @staticmethod
+    def _consecutive_runs(days: list[dt.date]) -> list[tuple[dt.date, dt.date]]:
+        """Groups sorted days into runs of consecutive days."""
+        runs: list[tuple[dt.date, dt.date]] = []
+        for day in days:
+            if runs and runs[-1][1] + dt.timedelta(days=1) == day:
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs += [(day, day)]
+        return runs
+
+    @staticmethod
+    def _to_arrow(frame: pd.DataFrame, schema: pa.Schema | None) -> pa.Table:
+        """Converts a window to arrow with a schema that is stable across windows.
+
+        Timestamps are converted to UTC, since windows around a DST switch carry
+        different offsets, and values are cast to float as the converter returns
+        integers or floats depending on the window.
+        """
+        frame = frame.astype("float64")
+        frame.index = pd.DatetimeIndex(frame.index).tz_convert("UTC")
+        return pa.Table.from_pandas(frame, schema=schema, preserve_index=True)
+
+    def _write_stream(
+        self, frames: Iterator[pd.DataFrame], file_path: pathlib.Path
+    ) -> None:
+        """Writes every frame as its own row group to file_path.
+
+        The writer is closed even if the extraction fails, so the file stays
+        readable and contains every window that completed before the failure.
+        """
+        writer: pq.ParquetWriter | None = None
+        n_rows = 0
+        try:
+            for frame in frames:
+                table = self._to_arrow(frame, writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(file_path, table.schema)
+                writer.write_table(table)
+                n_rows += table.num_rows
+                LOGGER.info("Wrote %i rows to %s", n_rows, file_path)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError("No data could be extracted.")
+
 
 @click.command()
 @click.option(
@@ -150,9 +411,9 @@ class FroniusConnector:
 )
 @click.option(
     "--end-date",
-    required=True,
+    default=None,
     type=click.DateTime(),
-    help="Extract data from --start-date until this date",
+    help="Extract data from --start-date until this date (defaults to today)",
 )
 @click.option(
     "--output-file",
@@ -174,11 +435,45 @@ class FroniusConnector:
     type=click.STRING,
     help="Parameters to query for",
 )
-def cli(
+@click.option(
+    "--max-workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of windows to query in parallel (defaults to FRONIUS_MAX_WORKERS)",
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    default=False,
+    help="Append every window to --output-file as soon as it is extracted",
+)
+@click.option(
+    "--dataset-dir",
+    default=None,
+    type=click.Path(file_okay=False, writable=True, path_type=pathlib.Path),
+    help="Incrementally extract missing days into this day partitioned dataset "
+    + "instead of writing --output-file",
+)
+def cli(  # pylint: disable=too-many-positional-arguments
     start_date: dt.datetime,
-    end_date: dt.datetime,
+    end_date: dt.datetime | None,
     output_file: pathlib.Path,
     parameters: tuple[str, ...],
+    max_workers: int | None,
+    streaming: bool,
+    dataset_dir: pathlib.Path | None,
 ) -> None:
     """Extracts data from a Fronius converter."""
-    FroniusConnector().extract_data(start_date, end_date, output_file, list(parameters))
+    config = FroniusConfig()
+    if max_workers is not None:
+        config.max_workers = max_workers
+    end = end_date.date() if end_date is not None else dt.date.today()
+    connector = FroniusConnector(config)
+    if dataset_dir is not None:
+        connector.extract_incremental(
+            start_date.date(), end, dataset_dir, list(parameters)
+        )
+        return
+    connector.extract_data(
+        start_date.date(), end, output_file, list(parameters), streaming=streaming
+    )
@@ -1,19 +1,70 @@
 from __future__ import annotations
 
-import queue
+import contextlib
+import dataclasses
+import os
+import threading
+from typing import Any
+from typing import Iterator
 
 import sqlalchemy as sa
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from pv_prediction.common.metrics import is_enabled
+from pv_prediction.common.metrics import timer
 
 Base = declarative_base()  # pyre-ignore[5]
 
 
+@dataclasses.dataclass
+class DatabaseConfig:
+    """Database related configs."""
+
+    url: str = dataclasses.field(
+        default_factory=lambda: os.getenv("DATABASE_URL", "sqlite:///local_database.db")
+    )
+    pool_size: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("DB_POOL_SIZE", "5"))
+    )
+    max_overflow: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    )
+    pool_timeout: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    )
+    pool_recycle: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    )
+    pool_pre_ping: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    )
+    sqlite_pragmas: dict[str, str] = dataclasses.field(
+        default_factory=lambda: {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "foreign_keys": "ON",
+            "busy_timeout": "5000",
+        }
+    )
+
+
 class FlattenedWeather(Base):  # pyre-ignore[11]
-    """Historized weather data."""
+    """Historized weather data.
+
+    The primary key leads with the location, which serves lookups of the latest
+    forecast of a location, the date leading index serves time windows over all
+    locations. On Postgres the table is partitioned by month, see weather_storage.
+    Rows outside of the monthly partitions land in the default partition.
+    """
 
     __tablename__: str = "weather"
+    __table_args__: tuple[Any, ...] = (
+        sa.Index("ix_weather_date_lat_lon", "date", "lat", "lon"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
     lat: sa.Column = sa.Column(sa.Float, primary_key=True)
     lon: sa.Column = sa.Column(sa.Float, primary_key=True)
@@ -35,6 +86,35 @@ class FlattenedWeather(Base):  # pyre-ignore[11]
     sunset: sa.Column = sa.Column(sa.DateTime)
 
 
+sa.event.listen(
+    FlattenedWeather.__table__,  # pyre-ignore[16]
+    "after_create",
+    sa.DDL(
+        "CREATE TABLE IF NOT EXISTS weather_default PARTITION OF weather DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class WeatherFeatures(Base):
+    """Lag features of the weather rows derived from the produced energy.
+
+    Keyed like the weather table and materialized by the feature store. retry_after
+    is the date of the energy missing lags wait for, NULL if none do.
+    """
+
+    __tablename__: str = "weather_features"
+    __table_args__: tuple[Any, ...] = (
+        sa.Index("ix_weather_features_retry_after", "retry_after"),
+    )
+
+    lat: sa.Column = sa.Column(sa.Float, primary_key=True)
+    lon: sa.Column = sa.Column(sa.Float, primary_key=True)
+    date: sa.Column = sa.Column(sa.DateTime, primary_key=True)
+    produced_lag_168h: sa.Column = sa.Column(sa.Float)
+    produced_mean_24h_lag_168h: sa.Column = sa.Column(sa.Float)
+    retry_after: sa.Column = sa.Column(sa.DateTime)
+
+
 class EngergyTable(Base):
     """History energy information table."""
 
@@ -50,26 +130,33 @@ class EngergyTable(Base):
 
 
 class PredictionsTable(Base):
-    """Table to store the predictions."""
+    """Materialized predictions.
+
+    Every model version keeps its own predictions. The primary key serves the
+    forecast of an installation by a model over a time window as a range read.
+    """
 
     __tablename__: str = "predictions"
 
     pv_id: sa.Column = sa.Column(sa.Integer, primary_key=True)
+    model_id: sa.Column = sa.Column(sa.String, primary_key=True)
     date: sa.Column = sa.Column(sa.DateTime, primary_key=True)
     prediction_time: sa.Column = sa.Column(sa.DateTime)
-    model_id: sa.Column = sa.Column(sa.String)
     energy_produced: sa.Column = sa.Column(sa.Float)
 
 
 class DBSessionManager:
-    """DB session pool manager."""
+    """DB session manager with a lazily created, pooled engine.
 
-    initial_pool_size: int = 2
-    engine: sa.Engine = sa.create_engine("sqlite:///local_database.db")
-    Base.metadata.create_all(engine)
-    _session_maker: sessionmaker = sessionmaker(bind=engine)
+    The engine is created from the DatabaseConfig on first use, which also creates
+    missing tables. Connections are pooled by SQLAlchemy; sessions are cheap and
+    should be used for a single unit of work via the `session` context manager.
+    """
 
-    _session_pool: queue.Queue[Session] = queue.Queue(initial_pool_size)
+    config: DatabaseConfig | None = None
+    _engine: sa.Engine | None = None
+    _session_maker: sessionmaker = sessionmaker()
+    _lock: threading.Lock = threading.Lock()
 
     _instance: DBSessionManager | None = None
 
@@ -79,37 +166,105 @@ class DBSessionManager:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self) -> None:
-        """Inits a new DBSessionManager."""
-        self._session_pool = queue.Queue(self.initial_pool_size)
-        for _ in range(self.initial_pool_size):
-            try:
-                session = self._session_maker()
-                self._session_pool.put(session)
-            except ConnectionError as e:
-                print(f"Error creating session: {e}")
+    @classmethod
+    def configure(cls, config: DatabaseConfig) -> None:
+        """Sets the config used to create the engine, disposing the current engine."""
+        with cls._lock:
+            if cls._engine is not None:
+                cls._engine.dispose()
+            cls.config = config
+            cls._engine = None
+            cls._session_maker = sessionmaker()
 
     @classmethod
-    def get_session(cls) -> Session:
-        """This method attempts to retrieve a DB session from the pool.
+    def get_engine(cls) -> sa.Engine:
+        """Returns the engine, creating it and all missing tables on first use."""
+        if cls._engine is None:
+            with cls._lock:
+                if cls._engine is None:
+                    config = cls.config if cls.config is not None else DatabaseConfig()
+                    engine = create_engine(config)
+                    Base.metadata.create_all(engine)
+                    cls._session_maker.configure(bind=engine)
+                    cls._engine = engine
+        return cls._engine  # pyre-ignore[7]
+
+    @classmethod
+    @contextlib.contextmanager
+    def session(cls) -> Iterator[Session]:
+        """Provides a session which is committed on success and rolled back on errors.
 
-        - If a session exists in the pool (not empty), it retrieves and returns the session.
-        - If the pool is empty (`queue.Empty` exception is raised), it creates a new
-          session using `_init_session` and adds it to the pool before returning it.
+        The session is closed afterwards, which returns its connection to the pool.
         """
+        session = cls.get_session()
         try:
-            return cls._session_pool.get(block=False)
-        except queue.Empty:
-            session = cls._session_maker()
-            return session
+            if is_enabled():
+                # The connection is checked out lazily, so it is forced for timing.
+                with timer("db.checkout"):
+                    session.connection()
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @classmethod
+    def get_session(cls) -> Session:
+        """Returns a new session which has to be released with `release_session`."""
+        cls.get_engine()
+        return cls._session_maker()
 
     @classmethod
     def release_session(cls, session: Session) -> None:
-        """This method allows releasing a used DB session back to the pool."""
-        cls._session_pool.put(session)
+        """Closes the session and returns its connection to the pool."""
+        session.close()
 
     @classmethod
     def close_sessions(cls) -> None:
-        """Closes all sessions in the queue."""
-        while cls._session_pool.qsize() > 0:
-            cls._session_pool.get().close()
+        """Closes all pooled connections. The engine reconnects on its next use."""
+        if cls._engine is not None:
+            cls._engine.dispose()
+
+
+def create_engine(config: DatabaseConfig) -> sa.Engine:
+    """Creates an engine with the pool and SQLite settings of config."""
+    url = sa.make_url(config.url)
+    engine = sa.create_engine(url, **engine_options(config, url))
+    if url.get_backend_name() == "sqlite":
+        set_sqlite_pragmas(engine, config.sqlite_pragmas)
+    return engine
+
+
+def engine_options(config: DatabaseConfig, url: sa.URL) -> dict[str, Any]:
+    """Returns the keyword arguments of create_engine for the pool settings of config."""
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_size": config.pool_size,
+            "max_overflow": config.max_overflow,
+            "pool_timeout": config.pool_timeout,
+            "pool_recycle": config.pool_recycle,
+            "pool_pre_ping": config.pool_pre_ping,
+        }
+    if url.database in (None, "", ":memory:"):
+        # An in-memory database only lives as long as its connection, so all
+        # threads have to share a single connection.
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": config.pool_size,
+        "max_overflow": config.max_overflow,
+        "pool_timeout": config.pool_timeout,
+        "pool_pre_ping": config.pool_pre_ping,
+    }
+
+
+def set_sqlite_pragmas(engine: sa.Engine, pragmas: dict[str, str]) -> None:
+    """Sets pragmas on every new DBAPI connection of engine."""
+
+    @sa.event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+
+import click
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from pv_prediction.data.bulk_writer import BulkWriter
+from pv_prediction.data.bulk_writer import UpsertStats
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import EngergyTable
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.db_session_manger import WeatherFeatures
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+KEYS: list[str] = ["lat", "lon", "date"]
+# Derived from the location and date only, hence computed wherever they are needed.
+WEATHER_FEATURES: list[str] = ["sun_elevation", "sun_azimuth", "clear_sky_ghi"]
+# Oldest and newest hour before a date of the produced energy a lag feature uses.
+# The newest hour lies beyond the forecast horizon, so that the lags are known for
+# every forecast hour just like in training.
+LAG_WINDOWS: dict[str, tuple[int, int]] = {
+    "produced_lag_168h": (168, 168),
+    "produced_mean_24h_lag_168h": (191, 168),
+}
+LAG_FEATURES: list[str] = list(LAG_WINDOWS)
+FEATURES: list[str] = WEATHER_FEATURES + LAG_FEATURES
+# Hours after the last produced energy for which all lag features are known.
+MAX_LEAD_HOURS: int = min(newest for _, newest in LAG_WINDOWS.values())
+
+
+def solar_position(
+    lat: np.ndarray, lon: np.ndarray, date: pd.DatetimeIndex
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the elevation and azimuth of the sun in degrees.
+
+    Uses the NOAA approximation of the solar position, which is accurate to a few
+    tenths of a degree. Naive dates are UTC. The azimuth is measured clockwise from
+    north.
+    """
+    if date.tz is not None:
+        date = date.tz_convert("UTC").tz_localize(None)
+    hours = (
+        date.hour.to_numpy()
+        + date.minute.to_numpy() / 60
+        + date.second.to_numpy() / 3600
+    )
+    gamma = 2 * np.pi / 365 * (date.dayofyear.to_numpy() - 1 + (hours - 12) / 24)
+    equation_of_time = 229.18 * (
+        0.000075
+        + 0.001868 * np.cos(gamma)
+        - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma)
+        - 0.040849 * np.sin(2 * gamma)
+    )
+    declination = (
+        0.006918
+        - 0.399912 * np.cos(gamma)
+        + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma)
+        + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma)
+        + 0.00148 * np.sin(3 * gamma)
+    )
+    true_solar_minutes = hours * 60 + equation_of_time + 4 * np.asarray(lon)
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+    latitude = np.radians(np.asarray(lat))
+
+    cos_zenith = np.sin(latitude) * np.sin(declination) + np.cos(latitude) * np.cos(
+        declination
+    ) * np.cos(hour_angle)
+    elevation = 90 - np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+    azimuth = np.degrees(
+        np.arctan2(
+            np.sin(hour_angle),
+            np.cos(hour_angle) * np.sin(latitude)
+            - np.tan(declination) * np.cos(latitude),
+        )
+    )
+    return elevation, (azimuth + 180) % 360
+
+
+def clear_sky_ghi(elevation: np.ndarray) -> np.ndarray:
+    """Returns the clear sky global horizontal irradiance in W/m2 (Haurwitz model)."""
+    cos_zenith = np.sin(np.radians(elevation))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ghi = 1098 * cos_zenith * np.exp(-0.059 / cos_zenith)
+    return np.where(cos_zenith > 0, ghi, 0.0)
+
+
+def hourly_produced(
+    engine: sa.Engine, start: dt.datetime, end: dt.datetime
+) -> pd.Series:
+    """Returns the produced energy from start to end summed up per hour."""
+    energy = pd.read_sql(
+        sa.select(EngergyTable.date, EngergyTable.produced).where(
+            EngergyTable.date >= start, EngergyTable.date < end
+        ),
+        engine,
+        parse_dates=["date"],
+        index_col="date",
+    )
+    return energy["produced"].resample("h").sum(min_count=1).dropna()
+
+
+def weather_features(
+    lat: np.ndarray, lon: np.ndarray, date: pd.DatetimeIndex
+) -> dict[str, np.ndarray]:
+    """Returns the WEATHER_FEATURES of the locations at the dates."""
+    elevation, azimuth = solar_position(lat, lon, date)
+    return {
+        "sun_elevation": elevation,
+        "sun_azimuth": azimuth,
+        "clear_sky_ghi": clear_sky_ghi(elevation),
+    }
+
+
+def lag_features(date: pd.DatetimeIndex, produced: pd.Series) -> dict[str, np.ndarray]:
+    """Returns the LAG_FEATURES at the naive UTC dates, NaN without energy.
+
+    Args:
+        date (pd.DatetimeIndex): Naive UTC dates to compute the lags for.
+        produced (pd.Series): Hourly produced energy, covering the LAG_WINDOWS
+            before the dates for complete lags.
+    """
+    produced = produced.asfreq("h") if len(produced) else produced
+    mean_24h = produced.rolling(24, min_periods=24).mean()
+    week_before = date - pd.Timedelta(hours=168)
+    return {
+        "produced_lag_168h": produced.reindex(week_before).to_numpy(),
+        "produced_mean_24h_lag_168h": mean_24h.reindex(week_before).to_numpy(),
+    }
+
+
+def compute_lags(
+    keys: pd.DataFrame, produced: pd.Series, energy_until: dt.datetime | None
+) -> pd.DataFrame:
+    """Computes the lag features of all (lat, lon, date) rows of keys at once.
+
+    Args:
+        keys (pd.DataFrame): Locations and naive UTC dates to compute lags for.
+        produced (pd.Series): Hourly produced energy, covering the LAG_WINDOWS
+            before the dates of keys for complete lags.
+        energy_until (dt.datetime | None): Date of the last produced energy.
+
+    Returns:
+        The keys with the LAG_FEATURES and retry_after, the date of the energy the
+        missing lags wait for. Lags missing energy before energy_until, i.e. because
+        of a gap in the energy, do not wait and are never retried.
+    """
+    date = pd.DatetimeIndex(keys["date"])
+    lags = lag_features(date, produced)
+    waits_for = pd.DataFrame(
+        {
+            name: date - pd.Timedelta(hours=newest)
+            for name, (_, newest) in LAG_WINDOWS.items()
+        },
+        index=keys.index,
+    ).where(pd.DataFrame(lags, index=keys.index).isna())
+    if energy_until is not None:
+        waits_for = waits_for.where(waits_for > energy_until)
+    return keys[KEYS].assign(**lags, retry_after=waits_for.max(axis=1))
+
+
+class FeatureStore:
+    """Lag features of the weather rows materialized in the weather_features table.
+
+    Materializing is incremental: only weather rows without lags and rows whose
+    missing lags wait for energy which has been extracted since are computed,
+    vectorized over all of them, and upserted.
+
+    `join` adds all FEATURES to weather rows in training and serving alike. The
+    weather features are computed on the fly, lags which are not materialized,
+    e.g. of the forecast weather of a request, are computed from the energy.
+    """
+
+    def __init__(self, engine: sa.Engine | None = None) -> None:
+        """Inits the store on engine, defaults to the engine of the DBSessionManager."""
+        self.engine: sa.Engine = (
+            engine if engine is not None else DBSessionManager.get_engine()
+        )
+
+    def last_energy(self) -> dt.datetime | None:
+        """Returns the date of the last produced energy, None without energy."""
+        with self.engine.connect() as connection:
+            return connection.execute(
+                sa.select(EngergyTable.date).order_by(EngergyTable.date.desc()).limit(1)
+            ).scalar()
+
+    def stale_keys(self, last_energy: dt.datetime | None = None) -> pd.DataFrame:
+        """Returns the keys of the weather rows whose lags have to be computed.
+
+        These are the rows without lags and the rows whose lags wait for energy up
+        to last_energy, defaults to the date of the last produced energy.
+        """
+        weather = FlattenedWeather.__table__
+        features = WeatherFeatures.__table__
+        last_energy = last_energy if last_energy is not None else self.last_energy()
+        conditions = [features.c.date.is_(None)]
+        if last_energy is not None:
+            conditions.append(features.c.retry_after <= last_energy)
+        query = (
+            sa.select(weather.c.lat, weather.c.lon, weather.c.date)
+            .select_from(
+                weather.outerjoin(
+                    features, sa.and_(*[weather.c[k] == features.c[k] for k in KEYS])
+                )
+            )
+            .where(sa.or_(*conditions))
+        )
+        return pd.read_sql(query, self.engine, parse_dates=["date"])
+
+    def materialize(self) -> UpsertStats:
+        """Computes and upserts the lags of all stale weather rows."""
+        last_energy = self.last_energy()
+        keys = self.stale_keys(last_energy)
+        if keys.empty:
+            LOGGER.info("All features are up to date.")
+            return UpsertStats(rows=0, seconds=0.0)
+        LOGGER.info("Materializing the features of %s weather rows.", len(keys))
+        return BulkWriter(self.engine).upsert(
+            WeatherFeatures,
+            compute_lags(keys, self._produced(keys["date"]), last_energy),
+        )
+
+    def _produced(self, date: pd.Series | pd.DatetimeIndex) -> pd.Series:
+        """Returns the hourly produced energy the lags of the naive UTC dates use."""
+        return hourly_produced(
+            self.engine,
+            date.min()
+            - dt.timedelta(hours=max(oldest for oldest, _ in LAG_WINDOWS.values())),
+            date.max() - dt.timedelta(hours=MAX_LEAD_HOURS - 1),
+        )
+
+    def read(
+        self, lat: float, lon: float, start: dt.datetime, end: dt.datetime
+    ) -> pd.DataFrame:
+        """Returns the stored lags of (lat, lon) from start to end, indexed by date."""
+        return pd.read_sql(
+            sa.select(
+                WeatherFeatures.date,
+                *[getattr(WeatherFeatures, name) for name in LAG_FEATURES],
+            ).where(
+                WeatherFeatures.lat == lat,
+                WeatherFeatures.lon == lon,
+                WeatherFeatures.date >= start,
+                WeatherFeatures.date < end,
+            ),
+            self.engine,
+            parse_dates=["date"],
+            index_col="date",
+        )
+
+    def join(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Adds all FEATURES to a frame of weather rows with lat, lon and date.
+
+        Lags which are not stored are computed from the produced energy, lags
+        without energy are NaN.
+        """
+        if frame.empty:
+            return frame.assign(**{name: np.nan for name in FEATURES})
+        date = pd.DatetimeIndex(frame["date"])
+        if date.tz is not None:
+            date = date.tz_convert("UTC").tz_localize(None)
+        stored = pd.read_sql(
+            sa.select(
+                *[getattr(WeatherFeatures, name) for name in KEYS + LAG_FEATURES]
+            ).where(
+                WeatherFeatures.date >= date.min().to_pydatetime(),
+                WeatherFeatures.date <= date.max().to_pydatetime(),
+                WeatherFeatures.lat.in_(frame["lat"].unique().tolist()),
+                WeatherFeatures.lon.in_(frame["lon"].unique().tolist()),
+            ),
+            self.engine,
+            parse_dates=["date"],
+        )
+        lookup = pd.MultiIndex.from_arrays([frame["lat"], frame["lon"], date])
+        lags = stored.set_index(KEYS)[LAG_FEATURES].reindex(lookup)
+        if (incomplete := lags.isna().any(axis=1).to_numpy()).any():
+            lags.iloc[incomplete] = pd.DataFrame(
+                lag_features(date[incomplete], self._produced(date[incomplete]))
+            ).to_numpy()
+        if (missing := int(lags.isna().any(axis=1).sum())) > 0:
+            LOGGER.warning("Lag features of %s rows lack produced energy.", missing)
+        return frame.assign(
+            **weather_features(frame["lat"].to_numpy(), frame["lon"].to_numpy(), date),
+            **{name: lags[name].to_numpy() for name in LAG_FEATURES},
+        )
+
+
+@click.command()
+@click.option(
+    "--database-url",
+    default=None,
+    type=click.STRING,
+    help="Database of the weather and energy tables (defaults to DATABASE_URL)",
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    default=False,
+    help="Drop and recompute the weather_features table, e.g. after its columns changed",
+)
+def cli(database_url: str | None, rebuild: bool) -> None:
+    """Materializes the features of all new weather rows."""
+    config = DatabaseConfig()
+    if database_url is not None:
+        config.url = database_url
+    DBSessionManager.configure(config)
+    if rebuild:
+        table: sa.Table = WeatherFeatures.__table__  # pyre-ignore[16]
+        table.drop(DBSessionManager.get_engine(), checkfirst=True)
+        table.create(DBSessionManager.get_engine())
+    FeatureStore().materialize()
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
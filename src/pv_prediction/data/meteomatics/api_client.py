@@ -1,15 +1,25 @@
 import dataclasses
 import datetime as dt
+import logging
 import os
+import pathlib
+from typing import Any
 
 import pytz
 import requests
 
+from pv_prediction.common.metrics import record_size
+from pv_prediction.common.metrics import timed
+from pv_prediction.common.metrics import timer
+from pv_prediction.data.meteomatics.response_cache import ResponseCache
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
 from pv_prediction.data.meteomatics.schemata import WeatherResponse
 
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
 
 @dataclasses.dataclass
-class MeteomaticsConfig:
+class MeteomaticsConfig:  # pylint: disable=too-many-instance-attributes
     """Meteomatics related configs."""
 
     username: str = dataclasses.field(
@@ -24,17 +34,49 @@ class MeteomaticsConfig:
     timezone: str = dataclasses.field(
         default_factory=lambda: os.getenv("TIMEZONE", "Europe/Zurich")
     )
+    max_concurrency: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("METEO_MAX_CONCURRENCY", "4"))
+    )
+    max_days_per_request: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("METEO_MAX_DAYS_PER_REQUEST", "10"))
+    )
+    max_parameters_per_request: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("METEO_MAX_PARAMETERS_PER_REQUEST", "10"))
+    )
+    max_locations_per_request: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("METEO_MAX_LOCATIONS_PER_REQUEST", "100"))
+    )
+    cache_dir: str = dataclasses.field(
+        default_factory=lambda: os.getenv("METEO_CACHE_DIR", "")
+    )
+    cache_max_mb: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("METEO_CACHE_MAX_MB", "100"))
+    )
 
 
 class APIClient:
     """Meteomatics API Client to fetch weather data."""
 
-    def __init__(self, config: MeteomaticsConfig | None = None) -> None:
-        """Initialize the Meteomatics API client."""
+    def __init__(
+        self,
+        config: MeteomaticsConfig | None = None,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        """Initialize the Meteomatics API client.
+
+        Responses are cached in cache or, if no cache is passed, in the directory
+        configured by cache_dir. Without either, every query goes to the API.
+        """
         self.config: MeteomaticsConfig = (
             config if config is not None else MeteomaticsConfig()
         )
         self.base_url: str = self.config.base_url
+        if cache is None and self.config.cache_dir:
+            cache = ResponseCache(
+                pathlib.Path(self.config.cache_dir),
+                max_bytes=self.config.cache_max_mb * 1_000_000,
+            )
+        self.cache: ResponseCache | None = cache
 
     def _build_url(
         self, valid_datetime: str, parameters: str, locations: str, response_format: str
@@ -59,39 +101,125 @@ class APIClient:
         Returns:
             Parsed weather data as pandas DataFrame.
         """
-        timezone = pytz.timezone(self.config.timezone)
-        datetime = dt.datetime.combine(date, dt.datetime.min.time()).astimezone(
-            timezone
-        )
-        following_day = datetime + dt.timedelta(days=1)
-        iso_date_string = (
-            datetime.isoformat() + "--" + following_day.isoformat() + ":PT1H"
-        )
         return self._get_weather_data(
-            iso_date_string,
+            self._date_range(date, date),
             parameters,
             locations,
         )
 
-    def _get_weather_data(
+    def get_weather_columns_for_date(
+        self,
+        date: dt.date,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+    ) -> WeatherColumns:
+        """Fetch weather data for a specific date without validating every value.
+
+        Only the envelope of the response is validated, the coordinates, dates and
+        values are decoded straight into numpy columns. Use this for large requests,
+        get_weather_data_for_date validates the full response model instead.
+
+        Args:
+            date (datetime.date): Date to fetch the hourly weather data for.
+            parameters (list[str]): List of weather parameters to fetch.
+            locations (list of tuple): List of location tuples (latitude, longitude).
+
+        Returns:
+            Weather data decoded into numpy columns.
+        """
+        return WeatherColumns.parse(
+            self._get_weather_payload(
+                self._date_range(date, date), parameters, locations
+            )
+        )
+
+    def _date_range(
+        self, start_date: dt.date, end_date: dt.date, *, include_end: bool = True
+    ) -> str:
+        """Hourly ISO date range from the start of start_date until the end of end_date.
+
+        The range includes midnight of the following day, unless include_end is
+        False. Consecutive ranges must exclude it, as it is the first hour of the
+        next range.
+        """
+        timezone = pytz.timezone(self.config.timezone)
+        datetime = dt.datetime.combine(start_date, dt.datetime.min.time()).astimezone(
+            timezone
+        )
+        end = datetime + dt.timedelta(days=(end_date - start_date).days + 1)
+        if not include_end:
+            end -= dt.timedelta(hours=1)
+        return datetime.isoformat() + "--" + end.isoformat() + ":PT1H"
+
+    def _query_url(
         self,
         date_range: str,
         parameters: list[str],
         locations: list[tuple[float, float]],
-        response_format: str = "json",
-    ) -> WeatherResponse:
+        response_format: str,
+    ) -> str:
         formatted_parameters = ",".join(parameters)
         formatted_locations = ",".join([f"{lat},{lon}" for lat, lon in locations])
-
-        url = self._build_url(
+        return self._build_url(
             date_range, formatted_parameters, formatted_locations, response_format
         )
-        response = requests.get(
-            url, auth=(self.config.username, self.config.password), timeout=10
+
+    @timed("meteomatics.get_weather_data")
+    def _get_weather_data(
+        self,
+        date_range: str,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+        response_format: str = "json",
+    ) -> WeatherResponse:
+        return WeatherResponse(
+            **self._get_weather_payload(
+                date_range, parameters, locations, response_format
+            )
         )
+
+    def _get_weather_payload(
+        self,
+        date_range: str,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+        response_format: str = "json",
+    ) -> dict[str, Any]:
+        url = self._query_url(date_range, parameters, locations, response_format)
+        if self.cache is not None and (cached := self.cache.get(url)) is not None:
+            return cached
+        with timer("meteomatics.request"):
+            response = requests.get(
+                url, auth=(self.config.username, self.config.password), timeout=10
+            )
         response.raise_for_status()
+        record_size("meteomatics.request", payload_bytes=len(response.content))
         if response_format != "json":
             raise NotImplementedError(
                 f"The response format {response_format} has not been implemented yet"
             )
-        return WeatherResponse(**response.json())
+        payload = response.json()
+        self._cache_response(url, date_range, payload)
+        return payload
+
+    def _cache_response(self, url: str, date_range: str, payload: Any) -> None:
+        """Caches payload if a cache is configured and the date range can be parsed."""
+        if self.cache is None:
+            return
+        try:
+            valid_from, valid_until = self._interval(date_range)
+        except ValueError:
+            LOGGER.debug("Not caching response of unparsable date range %s", date_range)
+            return
+        self.cache.put(url, payload, valid_from, valid_until)
+
+    @staticmethod
+    def _interval(date_range: str) -> tuple[dt.datetime, dt.datetime]:
+        """Parses the start and end of an ISO date range like `start--end:PT1H`."""
+        without_step = date_range.split(":P", 1)[0]
+        start, _, end = without_step.partition("--")
+        valid_from = dt.datetime.fromisoformat(start)
+        valid_until = dt.datetime.fromisoformat(end) if end else valid_from
+        if valid_from.tzinfo is None or valid_until.tzinfo is None:
+            raise ValueError(f"Date range {date_range} is not timezone aware.")
+        return valid_from, valid_until
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import logging
+from types import TracebackType
+from typing import Any
+from typing import TypeVar
+
+import httpx
+
+from pv_prediction.common.metrics import record_size
+from pv_prediction.common.metrics import timer
+from pv_prediction.data.meteomatics.api_client import APIClient
+from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.response_cache import ResponseCache
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
+from pv_prediction.data.meteomatics.schemata import WeatherResponse
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _chunks(items: list[T], size: int) -> list[list[T]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+class AsyncAPIClient(APIClient):
+    """Asynchronous Meteomatics API client sharing one pooled HTTP connection.
+
+    Use it as an async context manager so the connection pool is closed again:
+
+        async with AsyncAPIClient() as client:
+            responses = await client.get_weather_data_for_range(...)
+    """
+
+    def __init__(
+        self,
+        config: MeteomaticsConfig | None = None,
+        cache: ResponseCache | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """Initialize the asynchronous Meteomatics API client."""
+        super().__init__(config, cache)
+        self._client: httpx.AsyncClient = httpx.AsyncClient(
+            auth=(self.config.username, self.config.password),
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=self.config.max_concurrency,
+                max_keepalive_connections=self.config.max_concurrency,
+            ),
+            transport=transport,
+        )
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            self.config.max_concurrency
+        )
+
+    async def __aenter__(self) -> AsyncAPIClient:
+        """Returns the client itself."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Closes the connection pool."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the connection pool."""
+        await self._client.aclose()
+
+    async def get_weather_data_for_range(
+        self,
+        start_date: dt.date,
+        end_date: dt.date,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+    ) -> list[WeatherResponse]:
+        """Fetch weather data from the Meteomatics API for a range of days.
+
+        The range is split into as few requests as the configured API limits allow,
+        i.e. into spans of at most `max_days_per_request` days, groups of at most
+        `max_parameters_per_request` parameters and `max_locations_per_request`
+        locations. The requests run concurrently, at most `max_concurrency` at a time.
+
+        Args:
+            start_date (datetime.date): First day to fetch.
+            end_date (datetime.date): Last day to fetch (inclusive).
+            parameters (list[str]): List of weather parameters to fetch.
+            locations (list of tuple): List of location tuples (latitude, longitude).
+
+        Returns:
+            Responses ordered by time span, parameter group and location group.
+        """
+        return [
+            WeatherResponse(**payload)
+            for payload in await self._get_weather_payloads(
+                start_date, end_date, parameters, locations
+            )
+        ]
+
+    async def get_weather_columns_for_range(
+        self,
+        start_date: dt.date,
+        end_date: dt.date,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+    ) -> list[WeatherColumns]:
+        """Fetch weather data for a range of days without validating every value.
+
+        Splits the requests like get_weather_data_for_range, but only validates the
+        envelope of every response and decodes the values into numpy columns.
+        """
+        return [
+            WeatherColumns.parse(payload)
+            for payload in await self._get_weather_payloads(
+                start_date, end_date, parameters, locations
+            )
+        ]
+
+    async def _get_weather_payloads(
+        self,
+        start_date: dt.date,
+        end_date: dt.date,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+    ) -> list[dict[str, Any]]:
+        # Only the last span includes the midnight it ends on, so that no hour is
+        # fetched twice.
+        date_ranges = [
+            self._date_range(span_start, span_end, include_end=span_end == end_date)
+            for span_start, span_end in self._spans(start_date, end_date)
+        ]
+        queries = [
+            (date_range, parameter_group, location_group)
+            for date_range in date_ranges
+            for parameter_group in _chunks(
+                parameters, self.config.max_parameters_per_request
+            )
+            for location_group in _chunks(
+                locations, self.config.max_locations_per_request
+            )
+        ]
+        LOGGER.info(
+            "Fetching weather data from %s to %s with %i requests.",
+            start_date,
+            end_date,
+            len(queries),
+        )
+        return list(
+            await asyncio.gather(
+                *(self._get_weather_payload_async(*query) for query in queries)
+            )
+        )
+
+    def _spans(
+        self, start_date: dt.date, end_date: dt.date
+    ) -> list[tuple[dt.date, dt.date]]:
+        spans = []
+        span_start = start_date
+        while span_start <= end_date:
+            span_end = min(
+                span_start + dt.timedelta(days=self.config.max_days_per_request - 1),
+                end_date,
+            )
+            spans += [(span_start, span_end)]
+            span_start = span_end + dt.timedelta(days=1)
+        return spans
+
+    async def _get_weather_payload_async(
+        self,
+        date_range: str,
+        parameters: list[str],
+        locations: list[tuple[float, float]],
+        response_format: str = "json",
+    ) -> dict[str, Any]:
+        url = self._query_url(date_range, parameters, locations, response_format)
+        if self.cache is not None and (cached := self.cache.get(url)) is not None:
+            return cached
+        # Only the request itself is timed, neither waiting for a connection slot
+        # nor cache hits.
+        async with self._semaphore:
+            with timer("meteomatics.request"):
+                response = await self._client.get(url)
+        response.raise_for_status()
+        record_size("meteomatics.request", payload_bytes=len(response.content))
+        if response_format != "json":
+            raise NotImplementedError(
+                f"The response format {response_format} has not been implemented yet"
+            )
+        payload = response.json()
+        self._cache_response(url, date_range, payload)
+        return payload
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import Any
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters of a response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+
+
+class ResponseCache:  # pylint: disable=too-many-instance-attributes
+    """Size bounded on-disk cache of API responses keyed by their query URL.
+
+    Entries are stored as one json file per URL, named after the URL's sha256 hash.
+    How long an entry stays valid depends on the queried time interval: intervals
+    which lie completely in the past never change and are kept until evicted,
+    forecasts expire the faster the closer they are to now. If the cache grows
+    beyond max_bytes, the least recently used entries are evicted until it is back
+    below evict_to_ratio * max_bytes. The size is tracked per write, the directory
+    is only scanned on startup and when entries have to be evicted.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        *,
+        max_bytes: int = 100_000_000,
+        min_ttl: dt.timedelta = dt.timedelta(minutes=10),
+        max_ttl: dt.timedelta = dt.timedelta(hours=6),
+        ttl_lead_ratio: float = 0.25,
+        evict_to_ratio: float = 0.9,
+    ) -> None:
+        """Initializes the cache in directory, creating the directory if necessary."""
+        self.directory: pathlib.Path = directory
+        self.max_bytes: int = max_bytes
+        self.min_ttl: dt.timedelta = min_ttl
+        self.max_ttl: dt.timedelta = max_ttl
+        self.ttl_lead_ratio: float = ttl_lead_ratio
+        self.evict_to_ratio: float = evict_to_ratio
+        self.stats: CacheStats = CacheStats()
+        self._lock: threading.Lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sizes: dict[pathlib.Path, int] = {}
+        self._total_bytes: int = 0
+        self._scan()
+
+    def ttl(
+        self, valid_from: dt.datetime, valid_until: dt.datetime, now: dt.datetime
+    ) -> dt.timedelta | None:
+        """Returns how long a response for the interval stays valid, None if forever.
+
+        The ttl grows with the lead time until the first hour of the interval which
+        is not in the past yet and is clipped to [min_ttl, max_ttl].
+        """
+        if valid_until < now:
+            return None
+        lead_time = max(valid_from - now, dt.timedelta(0))
+        return min(max(lead_time * self.ttl_lead_ratio, self.min_ttl), self.max_ttl)
+
+    def _path(self, url: str) -> pathlib.Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url: str, now: dt.datetime | None = None) -> Any | None:
+        """Returns the cached response of url or None if it is missing or expired."""
+        now = now if now is not None else dt.datetime.now(dt.timezone.utc)
+        path = self._path(url)
+        with self._lock:
+            try:
+                entry = json.loads(path.read_bytes())
+                expires_at = entry["expires_at"]
+                expired = (
+                    expires_at is not None
+                    and dt.datetime.fromisoformat(expires_at) <= now
+                )
+                content = entry["content"]
+            except FileNotFoundError:
+                self.stats.misses += 1
+                return None
+            except (ValueError, KeyError, TypeError) as e:
+                # e.g. an entry truncated by a full disk or a killed process.
+                LOGGER.warning("Dropping corrupt response cache entry %s: %r", path, e)
+                self._remove(path)
+                self.stats.misses += 1
+                return None
+            if expired:
+                self._remove(path)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            # Touching the entry marks it as recently used for the eviction.
+            os.utime(path)
+            self.stats.hits += 1
+            return content
+
+    def put(
+        self,
+        url: str,
+        content: Any,
+        valid_from: dt.datetime,
+        valid_until: dt.datetime,
+        *,
+        now: dt.datetime | None = None,
+    ) -> None:
+        """Caches the response of url which covers the interval valid_from to valid_until."""
+        now = now if now is not None else dt.datetime.now(dt.timezone.utc)
+        ttl = self.ttl(valid_from, valid_until, now)
+        entry = {
+            "url": url,
+            "expires_at": (now + ttl).isoformat() if ttl is not None else None,
+            "content": content,
+        }
+        path = self._path(url)
+        with self._lock:
+            # The lock only guards this process, other processes sharing the
+            # directory write to their own temporary file.
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            size = tmp_path.write_bytes(json.dumps(entry).encode())
+            tmp_path.replace(path)
+            self._total_bytes += size - self._sizes.get(path, 0)
+            self._sizes[path] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: pathlib.Path) -> None:
+        path.unlink(missing_ok=True)
+        self._total_bytes -= self._sizes.pop(path, 0)
+
+    def _scan(self) -> list[tuple[pathlib.Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries += [(path, path.stat())]
+            except FileNotFoundError:
+                continue
+        self._sizes = {path: stat.st_size for path, stat in entries}
+        self._total_bytes = sum(self._sizes.values())
+        return entries
+
+    def _evict(self) -> None:
+        # Rescanning picks up the entries written by other processes as well.
+        entries = self._scan()
+        target_bytes = self.max_bytes * self.evict_to_ratio
+        for path, _ in sorted(entries, key=lambda entry: entry[1].st_mtime):
+            if self._total_bytes <= target_bytes:
+                break
+            self._remove(path)
+            self.stats.evictions += 1
+            LOGGER.debug("Evicted %s from the response cache.", path.name)
@@ -1,8 +1,20 @@
+from __future__ import annotations
+
+import dataclasses
 import re
 from datetime import datetime
+from typing import Any
+from typing import Iterable
+from typing import Iterator
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
 from pydantic import BaseModel
 
+from pv_prediction.common.metrics import record_size
+from pv_prediction.common.metrics import timed
+
 
 class FlattenedWeather(BaseModel):
     """Weather Response but flattened with lat, lon and date as must have keys."""
@@ -27,6 +39,17 @@ class FlattenedWeather(BaseModel):
     sunset: datetime | None = None
 
 
+@dataclasses.dataclass
+class ParameterColumns:
+    """All values of a single parameter as columns aligned by position."""
+
+    parameter: str
+    lat: np.ndarray
+    lon: np.ndarray
+    date: pd.DatetimeIndex
+    value: np.ndarray | pd.DatetimeIndex
+
+
 class DateValue(BaseModel):
     """Measurement date and its value."""
 
@@ -58,6 +81,7 @@ class WeatherResponse(BaseModel):
     status: str
     data: list[DataParameter]
 
+    @timed("weather.flatten_response")
     def flatten_response(self) -> list[FlattenedWeather]:
         """Flattens weather response."""
         flattened_dict = {}
@@ -78,8 +102,113 @@ class WeatherResponse(BaseModel):
                     flattened_dict[key] = flattened_dict[key] | {
                         changed_param: transformed_value
                     }
+        record_size("weather.flatten_response", rows=len(flattened_dict))
         return [FlattenedWeather(**value) for value in flattened_dict.values()]
 
+    def to_dataframe(self) -> pd.DataFrame:
+        """Flattens the response into a frame with one row per (lat, lon, date).
+
+        Contains the same rows and columns as flatten_response, but converts the
+        units once per parameter and does not build a pydantic model per row.
+        """
+        return self.frame_from_columns(self._parameter_columns())
+
+    def to_arrow(self) -> pa.Table:
+        """Flattens the response into an arrow table, see to_dataframe."""
+        return pa.Table.from_pandas(self.to_dataframe(), preserve_index=False)
+
+    @classmethod
+    @timed("weather.frame_from_columns")
+    def frame_from_columns(cls, columns: Iterable[ParameterColumns]) -> pd.DataFrame:
+        """Pivots parameter columns into one row per (lat, lon, date).
+
+        Units are converted once per parameter on the whole column. The result has
+        the columns of FlattenedWeather in the same order, missing parameters are NaN.
+        """
+        columns = list(columns)
+        fields = list(FlattenedWeather.model_fields)
+        if cls._share_keys(columns):
+            # All parameters cover the same locations and dates, as for a single
+            # request, so the values are aligned by position already.
+            first = columns[0]
+            frame = {"lat": first.lat, "lon": first.lon, "date": first.date}
+            for column in columns:
+                name, unit = cls._split_units(column.parameter)
+                values = column.value
+                if not isinstance(values, pd.DatetimeIndex):
+                    values = cls._convert_units(column.parameter, values, unit)
+                frame[name] = values
+            return pd.DataFrame(frame).reindex(columns=fields)
+
+        series_list = []
+        for column in columns:
+            name, unit = cls._split_units(column.parameter)
+            values = column.value
+            if not isinstance(values, pd.DatetimeIndex):
+                values = cls._convert_units(column.parameter, values, unit)
+            series_list += [
+                pd.Series(
+                    values,
+                    index=pd.MultiIndex.from_arrays(
+                        [column.lat, column.lon, column.date],
+                        names=["lat", "lon", "date"],
+                    ),
+                    name=name,
+                )
+            ]
+        if not series_list:
+            return pd.DataFrame(columns=fields)
+        frame = pd.concat(series_list, axis=1)
+        frame = frame.loc[:, ~frame.columns.duplicated(keep="last")]
+        return frame.reset_index().reindex(columns=fields)
+
+    @staticmethod
+    def _share_keys(columns: list[ParameterColumns]) -> bool:
+        if not columns:
+            return False
+        first = columns[0]
+        return all(
+            np.array_equal(column.lat, first.lat)
+            and np.array_equal(column.lon, first.lon)
+            and column.date.equals(first.date)
+            for column in columns[1:]
+        )
+
+    def _parameter_columns(self) -> Iterator[ParameterColumns]:
+        for param in self.data:
+            counts = [len(coord.dates) for coord in param.coordinates]
+            date_values = [
+                date_value for coord in param.coordinates for date_value in coord.dates
+            ]
+            values = [date_value.value for date_value in date_values]
+            yield ParameterColumns(
+                parameter=param.parameter,
+                lat=np.repeat([coord.lat for coord in param.coordinates], counts),
+                lon=np.repeat([coord.lon for coord in param.coordinates], counts),
+                date=self._to_datetime_index(
+                    [date_value.date for date_value in date_values]
+                ),
+                value=(
+                    self._to_datetime_index(values)  # pyre-ignore[6]
+                    if values and isinstance(values[0], datetime)
+                    else np.asarray(values)
+                ),
+            )
+
+    @staticmethod
+    def _to_datetime_index(datetimes: list[datetime]) -> pd.DatetimeIndex:
+        """Converts timezone aware datetimes to UTC via their epoch seconds.
+
+        This is an order of magnitude faster than letting pandas infer the
+        timezones of the datetime objects.
+        """
+        epoch_seconds = np.fromiter(
+            (value.timestamp() for value in datetimes),
+            dtype=np.float64,
+            count=len(datetimes),
+        )
+        return pd.to_datetime(epoch_seconds, unit="s", utc=True)
+
     @classmethod
     def _preprocess_params(
         cls, parameter: str, value: float | int | datetime
@@ -87,13 +216,20 @@ class WeatherResponse(BaseModel):
         new_param, unit = cls._split_units(parameter)
         if isinstance(value, datetime):
             return new_param, value
+        return new_param, cls._convert_units(parameter, value, unit)
+
+    @classmethod
+    def _convert_units(
+        cls, parameter: str, value: float | int | np.ndarray, unit: str
+    ) -> float | int | np.ndarray:
+        """Converts a value or a numpy array of values to SI based units."""
         if parameter.startswith("t"):
-            return new_param, cls._preprocess_temperature(value, unit)
+            return cls._preprocess_temperature(value, unit)
         if parameter.startswith("wind_gusts"):
-            return new_param, cls._preprocess_wind_speed(value, unit)
+            return cls._preprocess_wind_speed(value, unit)
         if parameter.startswith("msl_pressure"):
-            return new_param, cls._preprocess_pressure(value, unit)
-        return new_param, value
+            return cls._preprocess_pressure(value, unit)
+        return value
 
     @staticmethod
     def _split_units(parameter: str) -> tuple[str, str]:
@@ -104,7 +240,9 @@ class WeatherResponse(BaseModel):
         return splits[0], only_letters_unit
 
     @staticmethod
-    def _preprocess_wind_speed(value: int | float, unit: str) -> float | int:
+    def _preprocess_wind_speed(
+        value: int | float | np.ndarray, unit: str
+    ) -> float | int | np.ndarray:
         if unit == "kmh":
             return value / 3.6
         if unit == "kn":
@@ -114,7 +252,9 @@ class WeatherResponse(BaseModel):
         return value
 
     @staticmethod
-    def _preprocess_temperature(value: int | float, unit: str) -> float | int:
+    def _preprocess_temperature(
+        value: int | float | np.ndarray, unit: str
+    ) -> float | int | np.ndarray:
         if unit == "F":
             return (value - 32) / 1.8
         if unit == "K":
@@ -122,7 +262,109 @@ class WeatherResponse(BaseModel):
         return value
 
     @staticmethod
-    def _preprocess_pressure(value: int | float, unit: str) -> float | int:
+    def _preprocess_pressure(
+        value: int | float | np.ndarray, unit: str
+    ) -> float | int | np.ndarray:
         if unit == "Pa":
             return value / 100
         return value
+
+
+class ParameterEnvelope(BaseModel):
+    """Parameter of which the coordinates are not validated."""
+
+    parameter: str
+    coordinates: list[Any]
+
+
+class WeatherEnvelope(BaseModel):
+    """Response of weather API of which only the envelope is validated."""
+
+    version: str
+    user: str
+    dateGenerated: datetime
+    status: str
+    data: list[ParameterEnvelope]
+
+
+@dataclasses.dataclass
+class WeatherColumns:
+    """Response of weather API decoded into numpy columns without per value validation.
+
+    Parsing a WeatherResponse validates a pydantic model for every single value,
+    which gets expensive for many locations and long time ranges. WeatherColumns
+    only validates the envelope and decodes the coordinates, dates and values of
+    every parameter directly into typed arrays.
+    """
+
+    version: str
+    user: str
+    date_generated: datetime
+    status: str
+    columns: list[ParameterColumns]
+
+    @classmethod
+    def parse(cls, payload: dict[str, Any]) -> WeatherColumns:
+        """Parses a json decoded API response.
+
+        Raises:
+            ValidationError: If the envelope is invalid.
+            ValueError: If the coordinates of a parameter cannot be decoded.
+        """
+        envelope = WeatherEnvelope.model_validate(payload)
+        return cls(
+            version=envelope.version,
+            user=envelope.user,
+            date_generated=envelope.dateGenerated,
+            status=envelope.status,
+            columns=[cls._decode_parameter(param) for param in envelope.data],
+        )
+
+    @staticmethod
+    def _decode_parameter(param: ParameterEnvelope) -> ParameterColumns:
+        try:
+            return WeatherColumns._decode_coordinates(param)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(
+                f"Invalid coordinates of parameter {param.parameter}: {e!r}"
+            ) from e
+
+    @staticmethod
+    def _decode_coordinates(param: ParameterEnvelope) -> ParameterColumns:
+        counts = [len(coord["dates"]) for coord in param.coordinates]
+        date_values = [
+            date_value for coord in param.coordinates for date_value in coord["dates"]
+        ]
+        values = [date_value["value"] for date_value in date_values]
+        return ParameterColumns(
+            parameter=param.parameter,
+            lat=np.repeat(
+                np.array([coord["lat"] for coord in param.coordinates], dtype=float),
+                counts,
+            ),
+            lon=np.repeat(
+                np.array([coord["lon"] for coord in param.coordinates], dtype=float),
+                counts,
+            ),
+            date=pd.to_datetime(
+                [date_value["date"] for date_value in date_values],
+                utc=True,
+                format="ISO8601",
+            ),
+            value=(
+                pd.to_datetime(values, utc=True, format="ISO8601")
+                if values and isinstance(values[0], str)
+                else np.asarray(values)
+            ),
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Flattens the response into a frame with one row per (lat, lon, date).
+
+        Returns the same frame as WeatherResponse.to_dataframe.
+        """
+        return WeatherResponse.frame_from_columns(self.columns)
+
+    def to_arrow(self) -> pa.Table:
+        """Flattens the response into an arrow table, see to_dataframe."""
+        return pa.Table.from_pandas(self.to_dataframe(), preserve_index=False)
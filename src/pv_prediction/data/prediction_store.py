@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from typing import Iterable
+
+import click
+import pandas as pd
+import sqlalchemy as sa
+
+from pv_prediction.data.async_db_session_manager import AsyncDBSessionManager
+from pv_prediction.data.bulk_writer import BulkWriter
+from pv_prediction.data.bulk_writer import UpsertStats
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import PredictionsTable
+from pv_prediction.data.weather_storage import rename_to_legacy
+from pv_prediction.model.schemata import Prediction
+from pv_prediction.model.schemata import PredictionResponse
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def _primary_keys(connection: sa.Connection) -> tuple[list[str], list[str]]:
+    """Returns the primary key columns of the existing and the current table."""
+    table: sa.Table = PredictionsTable.__table__  # pyre-ignore[16]
+    existing = sa.inspect(connection).get_pk_constraint(table.name)
+    return existing["constrained_columns"], [c.name for c in table.primary_key]
+
+
+def check_predictions_table(engine: sa.Engine) -> None:
+    """Raises a ValueError if the predictions table has an outdated primary key.
+
+    Upserts conflict on the primary key, which fail on tables created before
+    predictions were keyed by model version.
+    """
+    with engine.connect() as connection:
+        if not sa.inspect(connection).has_table(PredictionsTable.__tablename__):
+            return
+        existing, current = _primary_keys(connection)
+    if sorted(existing) != sorted(current):
+        raise ValueError(
+            f"The predictions table is keyed by {existing} instead of {current}, "
+            + "migrate it with migrate-predictions-table."
+        )
+
+
+def migrate_predictions_table(engine: sa.Engine, keep_legacy: bool = False) -> None:
+    """Migrates an existing predictions table to the current primary key.
+
+    A table with another primary key is renamed to `predictions_legacy`, the
+    current table is created and all rows with a model_id are copied over, all
+    within one transaction. Rows without a model_id cannot be attributed to a model
+    version, the next forecast run materializes them again.
+
+    Args:
+        engine (sa.Engine): Engine of the database to migrate.
+        keep_legacy (bool): Whether to keep the renamed table instead of dropping it.
+    """
+    table: sa.Table = PredictionsTable.__table__  # pyre-ignore[16]
+    with engine.begin() as connection:
+        if not sa.inspect(connection).has_table(table.name):
+            LOGGER.info("Creating the %s table.", table.name)
+            table.create(connection)
+            return
+        existing, current = _primary_keys(connection)
+        if sorted(existing) == sorted(current):
+            LOGGER.info("The %s table is up to date.", table.name)
+            return
+        quote = connection.dialect.identifier_preparer.quote
+        legacy_name = rename_to_legacy(connection, table)
+        table.create(connection)
+        legacy_columns = {
+            column["name"] for column in sa.inspect(connection).get_columns(legacy_name)
+        }
+        if "model_id" in legacy_columns:
+            columns = ", ".join(
+                quote(column.name)
+                for column in table.columns
+                if column.name in legacy_columns
+            )
+            copied = connection.execute(
+                sa.text(
+                    f"INSERT INTO {quote(table.name)} ({columns}) "
+                    + f"SELECT {columns} FROM {quote(legacy_name)} "
+                    + "WHERE model_id IS NOT NULL"
+                )
+            ).rowcount
+            LOGGER.info("Copied %i rows into the %s table.", copied, table.name)
+        else:
+            LOGGER.warning(
+                "The rows of %s have no model_id and are not copied.", legacy_name
+            )
+        if not keep_legacy:
+            connection.execute(sa.text(f"DROP TABLE {quote(legacy_name)}"))
+
+
+def prediction_rows(predictions: Iterable[PredictionResponse]) -> pd.DataFrame:
+    """Flattens prediction responses into rows of the predictions table.
+
+    Raises:
+        ValueError: If the pv_id of a response is not an integer, as the table
+            keys the installations by integer ids like the forecast sites.
+    """
+    return pd.DataFrame(
+        [
+            {
+                "pv_id": _integer_pv_id(response.pv_id),
+                "model_id": response.model_id,
+                "date": prediction.date,
+                "prediction_time": response.prediction_time,
+                "energy_produced": prediction.energy_produced,
+            }
+            for response in predictions
+            for prediction in response.predictions
+        ],
+        columns=["pv_id", "model_id", "date", "prediction_time", "energy_produced"],
+    )
+
+
+def _integer_pv_id(pv_id: str) -> int:
+    try:
+        return int(pv_id)
+    except ValueError as e:
+        raise ValueError(
+            f"Only predictions of integer pv ids can be stored, not of {pv_id!r}."
+        ) from e
+
+
+class PredictionStore:
+    """Materialized predictions of all installations and model versions.
+
+    Predictions are written in bulk with the BulkWriter, e.g. by the scheduled
+    forecast runs, and read asynchronously through the AsyncDBSessionManager, so
+    that serving a forecast is a single range read of the primary key.
+    """
+
+    def __init__(self, engine: sa.Engine | None = None) -> None:
+        """Inits the store, writing with engine or the engine of the DBSessionManager."""
+        self.writer: BulkWriter = BulkWriter(engine)
+
+    def check(self) -> None:
+        """Raises a ValueError if the predictions table has to be migrated first."""
+        check_predictions_table(self.writer.engine)
+
+    def write(self, predictions: Iterable[PredictionResponse]) -> UpsertStats:
+        """Upserts the predictions, replacing earlier predictions of the same model.
+
+        Raises a ValueError before writing anything if a pv_id is not an integer.
+        """
+        return self.writer.upsert(PredictionsTable, prediction_rows(predictions))
+
+    async def read(
+        self, pv_id: int, model_id: str, start: dt.datetime, end: dt.datetime
+    ) -> PredictionResponse | None:
+        """Returns the predictions of model_id for pv_id from start until before end.
+
+        The prediction time of the response is the time of the oldest prediction.
+        Returns None if no prediction is materialized in the window.
+        """
+        query = (
+            sa.select(
+                PredictionsTable.date,
+                PredictionsTable.prediction_time,
+                PredictionsTable.energy_produced,
+            )
+            .where(
+                PredictionsTable.pv_id == pv_id,
+                PredictionsTable.model_id == model_id,
+                PredictionsTable.date >= _naive_utc(start),
+                PredictionsTable.date < _naive_utc(end),
+            )
+            .order_by(PredictionsTable.date)
+        )
+        async with AsyncDBSessionManager.session() as session:
+            rows = (await session.execute(query)).all()
+        if not rows:
+            return None
+        return PredictionResponse(
+            pv_id=str(pv_id),
+            prediction_time=min(row.prediction_time for row in rows).replace(
+                tzinfo=dt.timezone.utc
+            ),
+            model_id=model_id,
+            predictions=[
+                Prediction(
+                    date=row.date.replace(tzinfo=dt.timezone.utc),
+                    energy_produced=row.energy_produced,
+                )
+                for row in rows
+            ],
+        )
+
+
+def _naive_utc(datetime: dt.datetime) -> dt.datetime:
+    # The table stores naive UTC datetimes, see BulkWriter.
+    if datetime.tzinfo is None:
+        return datetime
+    return datetime.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+
+@click.command()
+@click.option(
+    "--database-url",
+    default=None,
+    type=click.STRING,
+    help="Database to migrate (defaults to DATABASE_URL)",
+)
+@click.option(
+    "--keep-legacy",
+    is_flag=True,
+    default=False,
+    help="Keep the previous table as predictions_legacy",
+)
+def cli(database_url: str | None, keep_legacy: bool) -> None:
+    """Migrates the predictions table to the primary key (pv_id, model_id, date)."""
+    config = DatabaseConfig()
+    if database_url is not None:
+        config.url = database_url
+    DBSessionManager.configure(config)
+    migrate_predictions_table(DBSessionManager.get_engine(), keep_legacy=keep_legacy)
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,274 @@
+import datetime as dt
+import logging
+import re
+
+import click
+import sqlalchemy as sa
+
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import FlattenedWeather
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def partition_column(table: sa.Table) -> str | None:
+    """Returns the column a Postgres table is range partitioned by, None if it is not."""
+    partition_by = table.dialect_options["postgresql"]["partition_by"]
+    if partition_by is None:
+        return None
+    match = re.fullmatch(r"\s*RANGE\s*\(\s*(\w+)\s*\)\s*", partition_by, re.IGNORECASE)
+    if match is None:
+        raise NotImplementedError(f"Partitioning by {partition_by} is not supported")
+    return match.group(1)
+
+
+def month_starts(start: dt.datetime, end: dt.datetime) -> list[dt.date]:
+    """Returns the first days of all months from the month of start to that of end."""
+    month = dt.date(start.year, start.month, 1)
+    months = []
+    while month <= end.date():
+        months += [month]
+        month = _next_month(month)
+    return months
+
+
+def _next_month(month: dt.date) -> dt.date:
+    return (month + dt.timedelta(days=32)).replace(day=1)
+
+
+def default_partition(table: sa.Table) -> str:
+    """Returns the name of the default partition of a partitioned table."""
+    return f"{table.name}_default"
+
+
+def create_monthly_partitions(
+    connection: sa.Connection, table: sa.Table, start: dt.datetime, end: dt.datetime
+) -> list[str]:
+    """Creates the missing monthly partitions of a Postgres table from start to end.
+
+    Rows of a new partition's month which were inserted into the default partition
+    in the meantime are moved into the new partition, as Postgres refuses to create
+    a partition overlapping rows of the default partition.
+
+    Args:
+        connection (sa.Connection): Connection to the Postgres database.
+        table (sa.Table): Table partitioned by `RANGE (<date column>)`.
+        start (dt.datetime): Earliest date which has to fit into a partition.
+        end (dt.datetime): Latest date which has to fit into a partition.
+
+    Returns:
+        Names of the partitions covering start to end.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    names = []
+    for month in month_starts(start, end):
+        name = f"{table.name}_{month:%Y_%m}"
+        names += [name]
+        if _exists(connection, name):
+            continue
+        bounds = (
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            + f"TO ('{_next_month(month).isoformat()}')"
+        )
+        if _default_has_rows(connection, table, month):
+            _move_default_rows(connection, table, name, month, bounds)
+            continue
+        connection.execute(
+            sa.text(
+                f"CREATE TABLE IF NOT EXISTS {quote(name)} "
+                + f"PARTITION OF {quote(table.name)} {bounds}"
+            )
+        )
+    return names
+
+
+def _exists(connection: sa.Connection, name: str) -> bool:
+    return bool(
+        connection.execute(
+            sa.text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+        ).scalar()
+    )
+
+
+def _default_has_rows(
+    connection: sa.Connection, table: sa.Table, month: dt.date
+) -> bool:
+    default_name = default_partition(table)
+    if not _exists(connection, default_name):
+        return False
+    quote = connection.dialect.identifier_preparer.quote
+    column = quote(partition_column(table))  # pyre-ignore[6]
+    return bool(
+        connection.execute(
+            sa.text(
+                f"SELECT EXISTS (SELECT 1 FROM {quote(default_name)} "
+                + f"WHERE {column} >= :start AND {column} < :end)"
+            ),
+            {"start": month, "end": _next_month(month)},
+        ).scalar()
+    )
+
+
+def _move_default_rows(
+    connection: sa.Connection, table: sa.Table, name: str, month: dt.date, bounds: str
+) -> None:
+    quote = connection.dialect.identifier_preparer.quote
+    column = quote(partition_column(table))  # pyre-ignore[6]
+    connection.execute(
+        sa.text(
+            f"CREATE TABLE {quote(name)} (LIKE {quote(table.name)} INCLUDING DEFAULTS)"
+        )
+    )
+    moved = connection.execute(
+        sa.text(
+            f"WITH moved AS (DELETE FROM {quote(default_partition(table))} "
+            + f"WHERE {column} >= :start AND {column} < :end RETURNING *) "
+            + f"INSERT INTO {quote(name)} SELECT * FROM moved"
+        ),
+        {"start": month, "end": _next_month(month)},
+    ).rowcount
+    connection.execute(
+        sa.text(
+            f"ALTER TABLE {quote(table.name)} ATTACH PARTITION {quote(name)} {bounds}"
+        )
+    )
+    LOGGER.info("Moved %i rows from the default partition into %s.", moved, name)
+
+
+def _create_default_partition(connection: sa.Connection, table: sa.Table) -> None:
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(
+        sa.text(
+            f"CREATE TABLE IF NOT EXISTS {quote(default_partition(table))} "
+            + f"PARTITION OF {quote(table.name)} DEFAULT"
+        )
+    )
+
+
+def _is_partitioned(connection: sa.Connection, table_name: str) -> bool:
+    return bool(
+        connection.execute(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                + "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name)"
+            ),
+            {"name": table_name},
+        ).scalar()
+    )
+
+
+def migrate_weather_table(engine: sa.Engine, keep_legacy: bool = False) -> None:
+    """Migrates an existing weather table to the current storage layout.
+
+    On Postgres an unpartitioned weather table is renamed to `weather_legacy`, the
+    partitioned table with its monthly and default partitions is created and all
+    rows are copied over, all within one transaction. A missing default partition
+    of a partitioned table is created. Missing indexes are created on every
+    database.
+
+    Args:
+        engine (sa.Engine): Engine of the database to migrate.
+        keep_legacy (bool): Whether to keep the renamed table instead of dropping it.
+    """
+    table: sa.Table = FlattenedWeather.__table__  # pyre-ignore[16]
+    with engine.begin() as connection:
+        if not sa.inspect(connection).has_table(table.name):
+            LOGGER.info("Creating the %s table.", table.name)
+            table.create(connection)
+        elif connection.dialect.name == "postgresql":
+            if _is_partitioned(connection, table.name):
+                _create_default_partition(connection, table)
+            else:
+                _partition_postgres_table(connection, table, keep_legacy)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def rename_to_legacy(connection: sa.Connection, table: sa.Table) -> str:
+    """Renames table to <name>_legacy, freeing its names for a new table.
+
+    On Postgres the primary key constraint and the indexes are renamed as well, as
+    their names are unique per schema. Returns the new name of the table.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    legacy_name = f"{table.name}_legacy"
+    LOGGER.info("Moving the %s table to %s.", table.name, legacy_name)
+    connection.execute(
+        sa.text(f"ALTER TABLE {quote(table.name)} RENAME TO {quote(legacy_name)}")
+    )
+    if connection.dialect.name != "postgresql":
+        return legacy_name
+    primary_key_name = connection.execute(
+        sa.text(
+            "SELECT conname FROM pg_constraint "
+            + "WHERE conrelid = CAST(:name AS regclass) AND contype = 'p'"
+        ),
+        {"name": legacy_name},
+    ).scalar()
+    if primary_key_name is not None:
+        connection.execute(
+            sa.text(
+                f"ALTER TABLE {quote(legacy_name)} RENAME CONSTRAINT "
+                + f"{quote(primary_key_name)} TO {quote(legacy_name + '_pkey')}"
+            )
+        )
+    for index in sa.inspect(connection).get_indexes(legacy_name):
+        connection.execute(
+            sa.text(
+                f"ALTER INDEX {quote(index['name'])} "
+                + f"RENAME TO {quote(index['name'] + '_legacy')}"
+            )
+        )
+    return legacy_name
+
+
+def _partition_postgres_table(
+    connection: sa.Connection, table: sa.Table, keep_legacy: bool
+) -> None:
+    quote = connection.dialect.identifier_preparer.quote
+    legacy_name = rename_to_legacy(connection, table)
+    table.create(connection)
+
+    column = partition_column(table)
+    start, end = connection.execute(
+        sa.text(f"SELECT min({column}), max({column}) FROM {quote(legacy_name)}")
+    ).one()
+    if start is not None:
+        create_monthly_partitions(connection, table, start, end)
+        columns = ", ".join(quote(column.name) for column in table.columns)
+        copied = connection.execute(
+            sa.text(
+                f"INSERT INTO {quote(table.name)} ({columns}) "
+                + f"SELECT {columns} FROM {quote(legacy_name)}"
+            )
+        ).rowcount
+        LOGGER.info("Copied %i rows into the partitioned %s table.", copied, table.name)
+    if not keep_legacy:
+        connection.execute(sa.text(f"DROP TABLE {quote(legacy_name)}"))
+
+
+@click.command()
+@click.option(
+    "--database-url",
+    default=None,
+    type=click.STRING,
+    help="Database to migrate (defaults to DATABASE_URL)",
+)
+@click.option(
+    "--keep-legacy",
+    is_flag=True,
+    default=False,
+    help="Keep the unpartitioned table as weather_legacy on Postgres",
+)
+def cli(database_url: str | None, keep_legacy: bool) -> None:
+    """Migrates the weather table to the monthly partitioned and indexed layout."""
+    config = DatabaseConfig()
+    if database_url is not None:
+        config.url = database_url
+    DBSessionManager.configure(config)
+    migrate_weather_table(DBSessionManager.get_engine(), keep_legacy=keep_legacy)
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
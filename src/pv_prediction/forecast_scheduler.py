@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime as dt
+import logging
+import os
+import time
+from typing import Callable
+
+import click
+import pytz
+import sqlalchemy as sa
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from pv_prediction.common.metrics import record_seconds
+from pv_prediction.common.metrics import record_size
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.data.feature_store import MAX_LEAD_HOURS
+from pv_prediction.data.meteomatics.async_api_client import AsyncAPIClient
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
+from pv_prediction.data.prediction_store import PredictionStore
+from pv_prediction.model.inferencing_runner import InferencingRunner
+from pv_prediction.model.model_reloader import ModelReloader
+from pv_prediction.model.schemata import PredictionResponse
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+DEFAULT_PARAMETERS: str = ",".join(
+    [
+        "t_2m:C",
+        "precip_1h:mm",
+        "wind_speed_10m:ms",
+        "msl_pressure:hPa",
+        "uv:idx",
+        "weather_symbol_1h:idx",
+    ]
+)
+
+
+@dataclasses.dataclass
+class Site:
+    """PV installation whose production is forecasted."""
+
+    pv_id: int
+    lat: float
+    lon: float
+
+
+def parse_sites(sites: str) -> list[Site]:
+    """Parses comma separated sites of the form pv_id:lat:lon."""
+    parsed = []
+    for site in filter(None, (site.strip() for site in sites.split(","))):
+        pv_id, lat, lon = site.split(":")
+        parsed += [Site(pv_id=int(pv_id), lat=float(lat), lon=float(lon))]
+    return parsed
+
+
+@dataclasses.dataclass
+class ForecastConfig:
+    """Scheduled forecast related configs."""
+
+    cron: str = dataclasses.field(
+        default_factory=lambda: os.getenv("FORECAST_CRON", "5 * * * *")
+    )
+    sites: list[Site] = dataclasses.field(
+        default_factory=lambda: parse_sites(os.getenv("FORECAST_SITES", ""))
+    )
+    parameters: list[str] = dataclasses.field(
+        default_factory=lambda: os.getenv(
+            "FORECAST_PARAMETERS", DEFAULT_PARAMETERS
+        ).split(",")
+    )
+    horizon_days: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("FORECAST_HORIZON_DAYS", "3"))
+    )
+    predict_batch_size: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("FORECAST_PREDICT_BATCH_SIZE", "64"))
+    )
+    db_concurrency: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("FORECAST_DB_CONCURRENCY", "2"))
+    )
+
+
+@dataclasses.dataclass
+class RunStats:
+    """Outcome and stage durations of a forecast run.
+
+    The stage durations are summed over all sites, as the stages of different
+    sites overlap, their sum exceeds the total duration of a pipelined run.
+    """
+
+    sites: int = 0
+    failed: int = 0
+    fetch_seconds: float = 0.0
+    predict_seconds: float = 0.0
+    persist_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+
+class ForecastPipeline:
+    """Fetches, predicts and persists the forecasts of all sites in a pipeline.
+
+    Every stage runs concurrently with the others: while a batch of sites is
+    predicted, the weather of the next sites is fetched and the previous
+    predictions are written. Each stage is limited separately, the weather API by
+    METEO_MAX_CONCURRENCY, the model by a single prediction thread which predicts
+    up to predict_batch_size fetched sites per call and the database by
+    db_concurrency writers. Failures only drop the affected sites.
+    """
+
+    def __init__(
+        self,
+        runner: InferencingRunner,
+        config: ForecastConfig | None = None,
+        *,
+        engine: sa.Engine | None = None,
+        client_factory: Callable[[], AsyncAPIClient] = AsyncAPIClient,
+    ) -> None:
+        """Inits the pipeline, a new API client is created for every run."""
+        self.runner: InferencingRunner = runner
+        self.config: ForecastConfig = config if config is not None else ForecastConfig()
+        self.store: PredictionStore = PredictionStore(engine)
+        self.client_factory: Callable[[], AsyncAPIClient] = client_factory
+
+    def run(self) -> RunStats:
+        """Runs the pipeline for all configured sites, logs and records its stats."""
+        stats = asyncio.run(self.run_async())
+        record_seconds("forecast.fetch", stats.fetch_seconds)
+        record_seconds("forecast.predict", stats.predict_seconds)
+        record_seconds("forecast.persist", stats.persist_seconds)
+        record_seconds("forecast.run", stats.total_seconds)
+        record_size("forecast.failed", rows=stats.failed)
+        LOGGER.info(
+            "Forecasted %i of %i sites in %.2f seconds "
+            + "(fetch %.2f s, predict %.2f s, persist %.2f s).",
+            stats.sites - stats.failed,
+            stats.sites,
+            stats.total_seconds,
+            stats.fetch_seconds,
+            stats.predict_seconds,
+            stats.persist_seconds,
+        )
+        return stats
+
+    async def run_async(self, sites: list[Site] | None = None) -> RunStats:
+        """Runs the pipeline for sites, all configured sites by default."""
+        sites = sites if sites is not None else self.config.sites
+        started = time.perf_counter()
+        stats = RunStats(sites=len(sites))
+        fetched: asyncio.Queue[tuple[Site, WeatherColumns] | None] = asyncio.Queue(
+            maxsize=2 * self.config.predict_batch_size
+        )
+        if (
+            self.runner.feature_store is not None
+            and 24 * self.config.horizon_days > MAX_LEAD_HOURS
+        ):
+            raise ValueError(
+                f"Lag features are only known {MAX_LEAD_HOURS} hours ahead, decrease "
+                + "FORECAST_HORIZON_DAYS."
+            )
+        async with self.client_factory() as client:
+            if client.config.max_days_per_request < self.config.horizon_days:
+                raise ValueError(
+                    "The forecast horizon must fit into a single request, increase "
+                    + "METEO_MAX_DAYS_PER_REQUEST."
+                )
+            # Only sites which are being fetched count towards the fetch duration,
+            # not those waiting for a free connection.
+            semaphore = asyncio.Semaphore(client.config.max_concurrency)
+            predictor = asyncio.create_task(self._predict_stage(fetched, stats))
+            try:
+                await asyncio.gather(
+                    *(
+                        self._fetch(
+                            client, site, semaphore, fetched=fetched, stats=stats
+                        )
+                        for site in sites
+                    )
+                )
+            finally:
+                # The predictor must finish even if fetching was aborted.
+                await fetched.put(None)
+                await predictor
+        stats.total_seconds = time.perf_counter() - started
+        return stats
+
+    async def _fetch(
+        self,
+        client: AsyncAPIClient,
+        site: Site,
+        semaphore: asyncio.Semaphore,
+        *,
+        fetched: asyncio.Queue[tuple[Site, WeatherColumns] | None],
+        stats: RunStats,
+    ) -> None:
+        start_date = dt.datetime.now(pytz.timezone(client.config.timezone)).date()
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                responses = await client.get_weather_columns_for_range(
+                    start_date,
+                    start_date + dt.timedelta(days=self.config.horizon_days - 1),
+                    self.config.parameters,
+                    [(site.lat, site.lon)],
+                )
+                # Parameter groups of different requests cover the same dates.
+                weather = dataclasses.replace(
+                    responses[0],
+                    columns=[
+                        column for response in responses for column in response.columns
+                    ],
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                # A single site must neither abort the run nor the other sites.
+                LOGGER.exception("Fetching the weather of site %i failed.", site.pv_id)
+                stats.failed += 1
+                return
+            finally:
+                stats.fetch_seconds += time.perf_counter() - started
+        await fetched.put((site, weather))
+
+    async def _predict_stage(
+        self,
+        fetched: asyncio.Queue[tuple[Site, WeatherColumns] | None],
+        stats: RunStats,
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.config.db_concurrency)
+        writes: list[asyncio.Task[None]] = []
+        done = False
+        while not done:
+            item = await fetched.get()
+            if item is None:
+                break
+            batch = [item]
+            # Predict everything fetched in the meantime with a single model call.
+            while len(batch) < self.config.predict_batch_size and not fetched.empty():
+                if (item := fetched.get_nowait()) is None:
+                    done = True
+                    break
+                batch += [item]
+            started = time.perf_counter()
+            try:
+                results = await asyncio.to_thread(
+                    self.runner.apply_model_batch,
+                    [(str(site.pv_id), weather) for site, weather in batch],
+                    return_exceptions=True,
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOGGER.exception("Predicting a batch of %i sites failed.", len(batch))
+                stats.failed += len(batch)
+                continue
+            finally:
+                stats.predict_seconds += time.perf_counter() - started
+            predictions = []
+            for (site, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    LOGGER.error("Predicting site %i failed: %r", site.pv_id, result)
+                    stats.failed += 1
+                else:
+                    predictions += [result]
+            if not predictions:
+                continue
+            writes += [
+                asyncio.create_task(self._persist(predictions, semaphore, stats))
+            ]
+        await asyncio.gather(*writes)
+
+    async def _persist(
+        self,
+        predictions: list[PredictionResponse],
+        semaphore: asyncio.Semaphore,
+        stats: RunStats,
+    ) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.store.write, predictions)
+            except sa.exc.SQLAlchemyError:
+                LOGGER.exception(
+                    "Writing the predictions of %i sites failed.", len(predictions)
+                )
+                stats.failed += len(predictions)
+            finally:
+                stats.persist_seconds += time.perf_counter() - started
+
+
+class ForecastScheduler:
+    """Runs the forecast pipeline on the configured cron schedule.
+
+    Runs never overlap: a run which is due while the previous one is still going
+    is skipped with a warning, which means the sites do not fit into the schedule.
+    """
+
+    def __init__(self, pipeline: ForecastPipeline) -> None:
+        """Inits the scheduler of pipeline."""
+        self.pipeline: ForecastPipeline = pipeline
+        self.last_stats: RunStats | None = None
+        self._scheduler: BlockingScheduler = BlockingScheduler()
+        self._scheduler.add_job(
+            self.run,
+            CronTrigger.from_crontab(pipeline.config.cron, timezone=dt.timezone.utc),
+            max_instances=1,
+            coalesce=True,
+        )
+
+    def run(self) -> RunStats:
+        """Runs the pipeline once."""
+        self.last_stats = self.pipeline.run()
+        return self.last_stats
+
+    def start(self) -> None:
+        """Runs the pipeline on schedule until the process is stopped."""
+        LOGGER.info(
+            "Forecasting %i sites on the schedule %s.",
+            len(self.pipeline.config.sites),
+            self.pipeline.config.cron,
+        )
+        self._scheduler.start()
+
+
+@click.command()
+@click.option(
+    "--database-url",
+    default=None,
+    type=click.STRING,
+    help="Database of the predictions table (defaults to DATABASE_URL)",
+)
+@click.option("--once", is_flag=True, default=False, help="Run once and exit")
+@click.option("--use-features", is_flag=True, default=False)
+def cli(database_url: str | None, once: bool, use_features: bool) -> None:
+    """Forecasts the production of all sites in FORECAST_SITES on FORECAST_CRON."""
+    config = DatabaseConfig()
+    if database_url is not None:
+        config.url = database_url
+    DBSessionManager.configure(config)
+    runner = InferencingRunner(feature_store=FeatureStore() if use_features else None)
+    pipeline = ForecastPipeline(runner)
+    pipeline.store.check()
+    scheduler = ForecastScheduler(pipeline)
+    if once:
+        scheduler.run()
+        return
+    reloader = ModelReloader(runner)
+    reloader.load()
+    reloader.start()
+    try:
+        scheduler.start()
+    finally:
+        reloader.shutdown()
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
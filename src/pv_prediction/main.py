@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import datetime as dt
+import functools
+import logging
+import os
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+
+import orjson
+from fastapi import FastAPI
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive
+
+from pv_prediction.common import metrics
+from pv_prediction.data.async_db_session_manager import AsyncDBSessionManager
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
+from pv_prediction.forecast_scheduler import ForecastPipeline
+from pv_prediction.forecast_scheduler import RunStats
+from pv_prediction.model.inferencing_runner import InferencingRunner
+from pv_prediction.model.inferencing_runner import PredictionResponse
+from pv_prediction.model.micro_batcher import MicroBatcher
+from pv_prediction.model.model_reloader import ModelReloader
+from pv_prediction.model.prediction_cache import PredictionCache
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ServiceConfig:
+    """Prediction service related configs."""
+
+    reload_model: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("SERVE_RELOAD_MODEL", "true").lower()
+        == "true"
+    )
+    micro_batching: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("SERVE_MICRO_BATCHING", "false").lower()
+        == "true"
+    )
+    use_features: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("SERVE_USE_FEATURES", "false").lower()
+        == "true"
+    )
+    stream_batch_size: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("SERVE_STREAM_BATCH_SIZE", "64"))
+    )
+    materialized_predictions: bool = dataclasses.field(
+        default_factory=lambda: os.getenv(
+            "SERVE_MATERIALIZED_PREDICTIONS", "false"
+        ).lower()
+        == "true"
+    )
+    forecast_hours: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("SERVE_FORECAST_HOURS", "48"))
+    )
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson, which serializes datetimes natively."""
+
+    def render(self, content: Any) -> bytes:  # pyre-ignore[2]
+        """Renders content as json."""
+        return orjson.dumps(content)
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """Streaming response which is sent while the request body is still read.
+
+    Before ASGI 2.4 StreamingResponse listens for disconnects on receive, which
+    would swallow the body. A disconnect is noticed by reading the body instead.
+    """
+
+    async def listen_for_disconnect(self, receive: Receive) -> None:
+        """Waits until the response is sent, leaving receive to the request."""
+        await asyncio.Event().wait()
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(service: FastAPI) -> AsyncIterator[None]:
+    runner: InferencingRunner = service.state.runner
+    pipeline: ForecastPipeline | None = service.state.pipeline
+    if pipeline is not None:
+        await run_in_threadpool(pipeline.store.check)
+    reloader = ModelReloader(runner) if service.state.config.reload_model else None
+    # The reloader loads the first model, then only new versions.
+    await run_in_threadpool(
+        reloader.load if reloader is not None else runner.load_model
+    )
+    if reloader is not None:
+        reloader.start()
+    try:
+        yield
+    finally:
+        if reloader is not None:
+            reloader.shutdown()
+        if service.state.batcher is not None:
+            await service.state.batcher.aclose()
+        if pipeline is not None:
+            await AsyncDBSessionManager.close_sessions()
+        runner.close()
+
+
+def create_app(
+    config: ServiceConfig | None = None,
+    runner: InferencingRunner | None = None,
+    pipeline: ForecastPipeline | None = None,
+) -> FastAPI:
+    """Creates the prediction service around a single runner per worker process.
+
+    The model of the runner is loaded on startup, before the first request is
+    accepted, and reloaded in the background whenever its registry alias moves.
+    With materialized predictions, forecasts are read from the predictions table
+    and only missing forecasts are predicted live by the forecast pipeline. With
+    METRICS_ENABLED, the latency of every route and instrumented stage is exposed
+    on /metrics.
+    """
+    config = config if config is not None else ServiceConfig()
+    if runner is None:
+        runner = InferencingRunner(
+            feature_store=FeatureStore() if config.use_features else None,
+            prediction_cache=PredictionCache.from_config(),
+        )
+    if pipeline is None and config.materialized_predictions:
+        pipeline = ForecastPipeline(runner)
+
+    service = FastAPI(lifespan=_lifespan, default_response_class=OrjsonResponse)
+    service.state.config = config
+    service.state.runner = runner
+    service.state.batcher = MicroBatcher(runner) if config.micro_batching else None
+    service.state.pipeline = pipeline
+
+    if metrics.is_enabled():
+        service.middleware("http")(_time_request)
+
+    @service.get("/metrics")
+    async def prometheus_metrics() -> Response:
+        """Returns the metrics in the Prometheus text format."""
+        if not metrics.is_enabled():
+            raise HTTPException(status_code=404, detail="Metrics are disabled.")
+        content, media_type = metrics.exposition()
+        return Response(content, media_type=media_type)
+
+    @service.get("/health")
+    async def health() -> dict[str, str]:
+        """Returns the id of the model in use."""
+        return {"status": "ok", "model_id": runner.model.model_info.model_uuid}
+
+    @service.post("/predict/{pv_id}")
+    async def predict(pv_id: str, request: Request) -> OrjsonResponse:
+        """Predicts the PV installation pv_id from a meteomatics weather response."""
+        weather = _parse_weather(await request.body())
+        if service.state.batcher is not None:
+            prediction = await service.state.batcher.predict(pv_id, weather)
+        else:
+            prediction = await run_in_threadpool(runner.apply_model, weather, pv_id)
+        return OrjsonResponse(prediction.model_dump())
+
+    @service.post("/predict")
+    async def predict_batch(request: Request) -> RequestStreamingResponse:
+        """Predicts many PV installations, streamed as newline delimited json.
+
+        Every line of the request is an object with a pv_id and its weather
+        response. The request is read line by line, lines are predicted in batches
+        of SERVE_STREAM_BATCH_SIZE and every batch is streamed as soon as it is
+        predicted, one prediction per line. Invalid lines and failed batches are
+        answered with an error line instead of aborting the stream.
+        """
+        return RequestStreamingResponse(
+            _stream_predictions(
+                runner, _lines(request.stream()), config.stream_batch_size
+            ),
+            media_type="application/x-ndjson",
+        )
+
+    live_forecasts: dict[tuple[int, str], asyncio.Task[RunStats]] = {}
+
+    @service.get("/forecast/{pv_id}")
+    async def forecast(pv_id: int) -> OrjsonResponse:
+        """Returns the forecast of the next SERVE_FORECAST_HOURS hours of pv_id.
+
+        The forecast of the current model is read from the materialized
+        predictions. If it does not cover all hours, the site is forecasted live
+        and its predictions are materialized for the following requests.
+        Concurrent requests of a site share a single live forecast.
+        """
+        if pipeline is None:
+            raise HTTPException(
+                status_code=404, detail="Materialized predictions are disabled."
+            )
+        start = dt.datetime.now(dt.timezone.utc).replace(
+            minute=0, second=0, microsecond=0
+        )
+        end = start + dt.timedelta(hours=config.forecast_hours)
+        model_id = runner.model.model_info.model_uuid
+        prediction = await pipeline.store.read(pv_id, model_id, start, end)
+        if prediction is None or len(prediction.predictions) < config.forecast_hours:
+            site = next(
+                (site for site in pipeline.config.sites if site.pv_id == pv_id), None
+            )
+            if site is None:
+                raise HTTPException(status_code=404, detail=f"Unknown site {pv_id}.")
+            key = (pv_id, model_id)
+            if (task := live_forecasts.get(key)) is None:
+                LOGGER.info("Forecasting site %i live.", pv_id)
+                task = asyncio.create_task(pipeline.run_async([site]))
+                live_forecasts[key] = task
+                task.add_done_callback(lambda _: live_forecasts.pop(key, None))
+            # A cancelled request must not cancel the forecast of the others.
+            if (await asyncio.shield(task)).failed:
+                raise HTTPException(
+                    status_code=502, detail=f"Forecasting site {pv_id} failed."
+                )
+            prediction = await pipeline.store.read(pv_id, model_id, start, end)
+            if prediction is None:
+                raise HTTPException(
+                    status_code=404, detail=f"No forecast of site {pv_id}."
+                )
+        return OrjsonResponse(prediction.model_dump())
+
+    return service
+
+
+async def _time_request(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route is only known once the request has been routed. Its template keeps
+    # the number of stages independent of the pv ids.
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    stage = f"http.{request.method} {route}"
+    # call_next returns once the response starts, a streamed body is only produced
+    # while it is sent. The request is timed until its last chunk.
+    if (body := getattr(response, "body_iterator", None)) is None:
+        metrics.record_seconds(stage, time.perf_counter() - started)
+    else:
+        response.body_iterator = _timed_body(body, stage, started)  # pyre-ignore[16]
+    return response
+
+
+async def _timed_body(
+    body: AsyncIterator[bytes], stage: str, started: float
+) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        metrics.record_seconds(stage, time.perf_counter() - started)
+
+
+def _parse_weather(body: bytes) -> WeatherColumns:
+    try:
+        return WeatherColumns.parse(orjson.loads(body))
+    # Invalid json, failed validations and undecodable coordinates are ValueErrors.
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Splits a stream of chunks into lines, holding at most one partial line."""
+    rest = b""
+    async for chunk in chunks:
+        *lines, rest = (rest + chunk).split(b"\n")
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+async def _stream_predictions(
+    runner: InferencingRunner, lines: AsyncIterator[bytes], batch_size: int
+) -> AsyncIterator[bytes]:
+    batch: list[tuple[str, WeatherColumns]] = []
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = orjson.loads(line)
+            batch += [(str(item["pv_id"]), WeatherColumns.parse(item["weather"]))]
+        # Invalid json, failed validations and unparsable dates are ValueErrors.
+        except (ValueError, KeyError, TypeError) as e:
+            yield _error_line(None, f"Invalid line: {e!r}")
+            continue
+        if len(batch) >= batch_size:
+            for output in await _predict_lines(runner, batch):
+                yield output
+            batch = []
+    if batch:
+        for output in await _predict_lines(runner, batch):
+            yield output
+
+
+async def _predict_lines(
+    runner: InferencingRunner, batch: list[tuple[str, WeatherColumns]]
+) -> list[bytes]:
+    try:
+        predictions: list[PredictionResponse | Exception] = await run_in_threadpool(
+            functools.partial(runner.apply_model_batch, batch, return_exceptions=True)
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        LOGGER.exception("Predicting a batch of %i installations failed.", len(batch))
+        return [_error_line(pv_id, repr(e)) for pv_id, _ in batch]
+    lines = []
+    for (pv_id, _), prediction in zip(batch, predictions):
+        if isinstance(prediction, Exception):
+            LOGGER.error("Predicting installation %s failed: %r", pv_id, prediction)
+            lines += [_error_line(pv_id, repr(prediction))]
+        else:
+            lines += [
+                orjson.dumps(prediction.model_dump(), option=orjson.OPT_APPEND_NEWLINE)
+            ]
+    return lines
+
+
+def _error_line(pv_id: str | None, error: str) -> bytes:
+    return orjson.dumps(
+        {"pv_id": pv_id, "error": error}, option=orjson.OPT_APPEND_NEWLINE
+    )
+
+
+app: FastAPI = create_app()
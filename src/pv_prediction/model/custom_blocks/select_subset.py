@@ -1,31 +1,102 @@
+from __future__ import annotations
+
 import logging
+from typing import Any
+from typing import TypeVar
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from sklearn.preprocessing import FunctionTransformer
 
 LOGGER: logging.Logger = logging.getLogger(__name__)
 
+T = TypeVar("T", pd.DataFrame, np.ndarray, pa.Table)
+
+# Fitted state is set outside of __init__ by sklearn convention.
+# pylint: disable=attribute-defined-outside-init
+
 
 class SelectSubset(FunctionTransformer):
-    """Custom transformation class that allows to select a subset of features."""
+    """Custom transformation class that allows to select a subset of features.
+
+    Accepts pandas frames, arrow tables and numpy arrays. Frames and tables are
+    selected by column name, arrays by the positions the features had in the frame
+    the transformer was fitted on. The positions of a frame's columns are cached,
+    so that they are only looked up again when the schema changes. Whenever the
+    selected columns are adjacent, the result is a view of the input.
+    """
 
     def __init__(self, subset_features: list[str]) -> None:
         """Selects subset features specified in subset_features."""
         self.subset_features = subset_features
-
-        def _subset_feature_names_callable(
-            self: SelectSubset,
-            input_names: list[str],  # pylint: disable=unused-argument
-        ) -> list[str]:
-            return self.subset_features
-
         super().__init__(
             func=self._select_subset,
-            feature_names_out=_subset_feature_names_callable,
+            feature_names_out=_subset_feature_names,
         )
 
-    def _select_subset(self, x: pd.DataFrame) -> pd.DataFrame:
-        LOGGER.info("Columns before transform: %s", x.columns)
-        y = x[self.subset_features]
-        LOGGER.info("Columns after transform: %s", y.columns)
-        return y
+    def fit(self, X: Any, y: Any = None) -> SelectSubset:
+        """Stores the positions of the subset features if X has column names."""
+        super().fit(X, y)
+        if hasattr(self, "feature_names_in_"):
+            self.positions_: np.ndarray = _positions(
+                pd.Index(self.feature_names_in_), self.subset_features
+            )
+        return self
+
+    def transform(self, X: T) -> T:
+        """Selects the subset features of X."""
+        return self._select_subset(X)
+
+    def _select_subset(self, x: T) -> T:
+        if isinstance(x, pa.Table):
+            return x.select(self.subset_features)
+        if isinstance(x, np.ndarray):
+            if getattr(self, "positions_", None) is None:
+                raise ValueError(
+                    "Selecting from arrays requires fitting on a frame with column names."
+                )
+            return x[:, _as_slice(self.positions_)]
+        return x.iloc[:, self._frame_selection(x.columns)]
+
+    def _frame_selection(self, columns: pd.Index) -> slice | np.ndarray:
+        """Returns the selection of the subset features, cached per schema."""
+        cached = getattr(self, "_schema_cache", None)
+        if cached is not None and (cached[0] is columns or cached[0].equals(columns)):
+            selection = cached[1]
+        else:
+            selection = _as_slice(_positions(columns, self.subset_features))
+            LOGGER.debug(
+                "Selecting %s from columns %s.", self.subset_features, list(columns)
+            )
+        self._schema_cache: tuple[pd.Index, slice | np.ndarray] = (columns, selection)
+        return selection
+
+
+def _subset_feature_names(
+    transformer: SelectSubset,
+    input_names: list[str],  # pylint: disable=unused-argument
+) -> list[str]:
+    # Defined at module level, so that the transformer can be pickled and hashed by
+    # the joblib memory of the pipeline.
+    return transformer.subset_features
+
+
+def _positions(columns: pd.Index, features: list[str]) -> np.ndarray:
+    positions = columns.get_indexer(features)
+    if (positions < 0).any():
+        missing = [feature for feature, i in zip(features, positions) if i < 0]
+        raise KeyError(f"Columns {missing} are missing.")
+    return positions
+
+
+def _as_slice(positions: np.ndarray) -> slice | np.ndarray:
+    """Returns a slice if the positions are evenly spaced, as slicing returns views."""
+    if len(positions) == 0:
+        return positions
+    if len(positions) == 1:
+        return slice(positions[0], positions[0] + 1)
+    step = positions[1] - positions[0]
+    if step > 0 and (np.diff(positions) == step).all():
+        return slice(positions[0], positions[-1] + 1, step)
+    return positions
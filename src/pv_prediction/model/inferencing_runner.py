@@ -1,77 +1,299 @@
+import dataclasses
 import datetime as dt
+import logging
 from threading import Lock
-from typing import Annotated
+from typing import Literal
+from typing import overload
+from typing import Sequence
 
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
-from pydantic import PlainSerializer
 
+from pv_prediction.common.metrics import record_size
+from pv_prediction.common.metrics import timer
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
 from pv_prediction.data.meteomatics.schemata import WeatherResponse
+from pv_prediction.model.compiled_predictor import CompiledPredictor
+from pv_prediction.model.prediction_cache import PredictionCache
+from pv_prediction.model.prediction_cache import weather_fingerprints
 from pv_prediction.model.pv_pipeline import PVPipeline
+from pv_prediction.model.schemata import Prediction
+from pv_prediction.model.schemata import PredictionResponse
 
-DateTime = Annotated[dt.datetime, PlainSerializer(lambda dt: dt.isoformat())]
+LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
-class Prediction(BaseModel):
-    """PV prediction at some time."""
+@dataclasses.dataclass
+class _Batch:
+    """The stacked input of a batch and the rows of every request in it."""
 
-    date: DateTime
-    energy_produced: float
+    requests: Sequence[tuple[str, WeatherResponse | WeatherColumns]]
+    frames: dict[int, pd.DataFrame]
+    df_input: pd.DataFrame
+    offsets: list[int]
 
+    @property
+    def rows(self) -> dict[int, tuple[int, int]]:
+        """Returns the first and the end row of every request in the input."""
+        return dict(zip(self.frames, zip(self.offsets[:-1], self.offsets[1:])))
 
-class PredictionResponse(BaseModel):
-    """Predictionresponse."""
-
-    pv_id: str
-    prediction_time: DateTime
-    model_id: str
-    predictions: list[Prediction]
+    def take(self, indices: list[int]) -> pd.DataFrame:
+        """Returns the input rows of the requests at indices."""
+        if len(indices) == len(self.frames):
+            return self.df_input
+        rows = self.rows
+        return self.df_input.iloc[
+            np.concatenate([np.arange(*rows[i]) for i in indices])
+        ]
 
 
 class InferencingRunner:
-    """Class to apply the model online to some data."""
+    """Class to apply the model online to some data.
+
+    Predictions never wait for a model load: every call reads the current model
+    once and keeps using it, while `load_model` prepares the next model on the side
+    and swaps it in with a single assignment.
+    """
 
     _lock: Lock = Lock()
     model_name: str = "pv_model"
     model_alias = "production"
+    compile_model: bool = True
+
+    def __init__(
+        self,
+        feature_store: FeatureStore | None = None,
+        prediction_cache: PredictionCache | None = None,
+    ) -> None:
+        """Initialize the InferencingRunner.
 
-    def __init__(self) -> None:
-        """Initialize the InferencingRunner."""
-        self._model: PVPipeline | None = None
+        If a feature store is given, its materialized features are added to the
+        weather data, which models trained with features require. If a prediction
+        cache is given, weather which the current model already predicted is
+        answered from the cache.
+        """
+        self.feature_store: FeatureStore | None = feature_store
+        self.prediction_cache: PredictionCache | None = prediction_cache
+        self._model: PVPipeline | CompiledPredictor | None = None
 
     @property
-    def model(self) -> PVPipeline:
-        """Returns the current model to predict."""
-        if not self._model:
-            self.load_model()
+    def model(self) -> PVPipeline | CompiledPredictor:
+        """Returns the current model to predict, loading it on first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
         return self._model  # pyre-ignore[7]
 
-    def load_model(self) -> None:
-        """Reload the model."""
+    def load_model(self, version: str | None = None) -> None:
+        """Loads the model of the alias, warms it up and swaps it in.
+
+        If version is given, exactly that version is loaded, e.g. the version the
+        alias was resolved to by the caller. The lock only serializes concurrent
+        loads, predictions keep using the previous model until the new one is ready.
+        """
         with self._lock:
-            self._model = PVPipeline.load_from_mlflow(self.model_name, self.model_alias)
+            self._model = self._load(version)
+
+    def close(self) -> None:
+        """Closes the connections of the prediction cache."""
+        if self.prediction_cache is not None:
+            self.prediction_cache.close()
+
+    def _load(self, version: str | None = None) -> PVPipeline | CompiledPredictor:
+        model = PVPipeline.load_from_mlflow(
+            self.model_name, self.model_alias, version=version
+        )
+        if self.compile_model:
+            try:
+                model = CompiledPredictor.from_pipeline(model)
+            except ValueError as e:
+                LOGGER.warning("Serving the uncompiled pipeline: %s", e)
+        # A dummy prediction, so that the first request does not pay for lazy setup.
+        model.predict(pd.DataFrame({param: [0.0] for param in model.weather_params}))
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(model.model_info.model_uuid)
+        return model
 
     def apply_model(
         self,
-        response: WeatherResponse,
+        response: WeatherResponse | WeatherColumns,
+        pv_id: str = "1",
     ) -> PredictionResponse:
-        """Applies model to weather data."""
-        flattened = response.flatten_response()
-        df_input = pd.DataFrame([res.model_dump() for res in flattened])
-        preds = self.model.predict(df_input)
-        return PredictionResponse(
-            pv_id=str(1),
-            prediction_time=dt.datetime.now(dt.timezone.utc),
-            model_id=self.model.model_info.model_uuid,
-            predictions=[
-                Prediction(
-                    date=ele.date,
-                    energy_produced=preds[i],
+        """Applies model to weather data of the PV installation pv_id."""
+        return self.apply_model_batch([(pv_id, response)])[0]
+
+    @overload
+    def apply_model_batch(
+        self,
+        requests: Sequence[tuple[str, WeatherResponse | WeatherColumns]],
+        *,
+        return_exceptions: Literal[False] = False,
+    ) -> list[PredictionResponse]: ...
+
+    @overload
+    def apply_model_batch(
+        self,
+        requests: Sequence[tuple[str, WeatherResponse | WeatherColumns]],
+        *,
+        return_exceptions: Literal[True],
+    ) -> list[PredictionResponse | Exception]: ...
+
+    def apply_model_batch(
+        self,
+        requests: Sequence[tuple[str, WeatherResponse | WeatherColumns]],
+        *,
+        return_exceptions: bool = False,
+    ) -> list[PredictionResponse] | list[PredictionResponse | Exception]:
+        """Applies the model to the weather data of many PV installations at once.
+
+        The weather of all installations is stacked into a single frame, so that the
+        model is only called once, and the predictions are split up again afterwards.
+        With a prediction cache, only installations whose weather has not been
+        predicted by the current model yet are passed to the model.
+
+        Args:
+            requests (Sequence[tuple[str, WeatherResponse | WeatherColumns]]): Pairs of
+                PV installation id and its weather data.
+            return_exceptions (bool): Whether a failing request gets its exception in
+                place of its response instead of failing all requests. A failed model
+                call is then retried request by request, so that only the requests
+                which fail on their own get an exception.
+
+        Returns:
+            One prediction response per request, in the order of the requests.
+        """
+        if not requests:
+            return []
+        model = self.model
+        results: list[PredictionResponse | Exception | None] = [None] * len(requests)
+        batch = self._batch(requests, results, return_exceptions)
+        if batch is None:
+            return results  # pyre-ignore[7]
+
+        misses = list(batch.frames)
+        fingerprints: dict[int, str] = {}
+        if self.prediction_cache is not None:
+            fingerprints = dict(
+                zip(
+                    batch.frames,
+                    weather_fingerprints(batch.df_input, batch.offsets),
                 )
-                for i, ele in enumerate(flattened)
-            ],
+            )
+            model_id = model.model_info.model_uuid
+            for i in batch.frames:
+                results[i] = self.prediction_cache.get(
+                    model_id, requests[i][0], fingerprints[i]
+                )
+            misses = [i for i in batch.frames if results[i] is None]
+        if misses:
+            predicted = self._predict_settled(
+                model, batch, misses, return_exceptions=return_exceptions
+            )
+            for i, result in zip(misses, predicted):
+                if self.prediction_cache is not None and not isinstance(
+                    result, Exception
+                ):
+                    self.prediction_cache.put(fingerprints[i], result)
+                results[i] = result
+        return results  # pyre-ignore[7]
+
+    def _batch(
+        self,
+        requests: Sequence[tuple[str, WeatherResponse | WeatherColumns]],
+        results: list[PredictionResponse | Exception | None],
+        return_exceptions: bool,
+    ) -> _Batch | None:
+        """Stacks the weather of all requests, None if no request could be stacked.
+
+        With return_exceptions, the exception of a request whose weather cannot be
+        converted is put into results instead of raising it.
+        """
+        frames: dict[int, pd.DataFrame] = {}
+        with timer("inference.dataframe"):
+            for i, (_, response) in enumerate(requests):
+                try:
+                    frames[i] = response.to_dataframe()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    if not return_exceptions:
+                        raise
+                    results[i] = e
+            if not frames:
+                return None
+            df_input = (
+                next(iter(frames.values()))
+                if len(frames) == 1
+                else pd.concat(frames.values(), ignore_index=True)
+            )
+        record_size("inference.dataframe", rows=len(df_input))
+        if self.feature_store is not None:
+            df_input = self.feature_store.join(df_input)
+        offsets = np.cumsum([0] + [len(frame) for frame in frames.values()]).tolist()
+        return _Batch(
+            requests=requests,
+            frames=frames,
+            df_input=df_input,
+            offsets=offsets,
         )
 
-    def run(self, pv_to_predict: WeatherResponse) -> PredictionResponse:
+    def _predict_settled(
+        self,
+        model: PVPipeline | CompiledPredictor,
+        batch: _Batch,
+        indices: list[int],
+        *,
+        return_exceptions: bool,
+    ) -> list[PredictionResponse | Exception]:
+        try:
+            return self._predict(model, batch, indices)  # pyre-ignore[7]
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if not return_exceptions:
+                raise
+            if len(indices) == 1:
+                return [e]
+            LOGGER.warning(
+                "Predicting a batch of %i requests failed (%r), "
+                + "predicting them one by one.",
+                len(indices),
+                e,
+            )
+            return [
+                self._predict_settled(model, batch, [i], return_exceptions=True)[0]
+                for i in indices
+            ]
+
+    def _predict(
+        self,
+        model: PVPipeline | CompiledPredictor,
+        batch: _Batch,
+        indices: list[int],
+    ) -> list[PredictionResponse]:
+        preds = np.asarray(model.predict(batch.take(indices)), dtype=float)
+        prediction_time = dt.datetime.now(dt.timezone.utc)
+        model_id = model.model_info.model_uuid
+
+        responses = []
+        start = 0
+        for i in indices:
+            frame = batch.frames[i]
+            end = start + len(frame)
+            responses += [
+                PredictionResponse(
+                    pv_id=batch.requests[i][0],
+                    prediction_time=prediction_time,
+                    model_id=model_id,
+                    predictions=[
+                        Prediction(date=date, energy_produced=pred)
+                        for date, pred in zip(frame["date"], preds[start:end].tolist())
+                    ],
+                )
+            ]
+            start = end
+        return responses
+
+    def run(
+        self, pv_to_predict: WeatherResponse | WeatherColumns
+    ) -> PredictionResponse:
         """Run the prediction on the provided weather data."""
         return self.apply_model(pv_to_predict)
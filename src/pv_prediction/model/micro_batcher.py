@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import functools
+import logging
+import os
+
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
+from pv_prediction.data.meteomatics.schemata import WeatherResponse
+from pv_prediction.model.inferencing_runner import InferencingRunner
+from pv_prediction.model.inferencing_runner import PredictionResponse
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+Request = tuple[
+    str,
+    WeatherResponse | WeatherColumns,
+    "asyncio.Future[PredictionResponse]",
+]
+
+
+@dataclasses.dataclass
+class MicroBatchConfig:
+    """Micro batching related configs."""
+
+    max_batch_size: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+    )
+    max_wait_ms: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+    )
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into batched model calls.
+
+    Requests arriving within max_wait_ms of the first waiting request are collected
+    into one batch of at most max_batch_size requests, which is predicted with a
+    single `apply_model_batch` call in the default executor, so that the event loop
+    keeps serving requests in the meantime. A request which fails on its own only
+    fails its own prediction, not the others of its batch:
+
+        batcher = MicroBatcher(InferencingRunner())
+        prediction = await batcher.predict("1", weather)
+    """
+
+    def __init__(
+        self, runner: InferencingRunner, config: MicroBatchConfig | None = None
+    ) -> None:
+        """Inits the batcher, the batching task is started with the first request."""
+        self.runner: InferencingRunner = runner
+        self.config: MicroBatchConfig = (
+            config if config is not None else MicroBatchConfig()
+        )
+        self._queue: asyncio.Queue[Request] = asyncio.Queue()
+        self._worker: asyncio.Task[None] | None = None
+
+    async def predict(
+        self, pv_id: str, response: WeatherResponse | WeatherColumns
+    ) -> PredictionResponse:
+        """Predicts the PV installation pv_id as part of the next batch."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future: asyncio.Future[PredictionResponse] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._queue.put_nowait((pv_id, response, future))
+        return await future
+
+    async def aclose(self) -> None:
+        """Stops the batching task, pending requests are cancelled."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            self._queue.get_nowait()[2].cancel()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            LOGGER.debug("Predicting a batch of %i requests.", len(batch))
+            try:
+                predictions = await loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        self.runner.apply_model_batch,
+                        [(pv_id, response) for pv_id, response, _ in batch],
+                        return_exceptions=True,
+                    ),
+                )
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), prediction in zip(batch, predictions):
+                if future.done():
+                    continue
+                if isinstance(prediction, Exception):
+                    future.set_exception(prediction)
+                else:
+                    future.set_result(prediction)
+
+    async def _next_batch(self) -> list[Request]:
+        """Waits for a request and collects everything arriving until max_wait_ms."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.config.max_wait_ms / 1000
+        while len(batch) < self.config.max_batch_size:
+            try:
+                batch += [self._queue.get_nowait()]
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch += [await asyncio.wait_for(self._queue.get(), timeout)]
+            except asyncio.TimeoutError:
+                break
+        return batch
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+
+import mlflow.artifacts
+import mlflow.models.model
+from filelock import FileLock
+from mlflow.exceptions import MlflowException
+from mlflow.tracking import MlflowClient
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ModelCacheConfig:
+    """Model artifact cache related configs."""
+
+    cache_dir: str = dataclasses.field(
+        default_factory=lambda: os.getenv("MODEL_CACHE_DIR", "")
+    )
+    lock_timeout: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("MODEL_CACHE_LOCK_TIMEOUT", "600"))
+    )
+
+
+def directory_checksum(directory: pathlib.Path) -> str:
+    """Returns the sha256 hash over the relative paths and contents of all files."""
+    digest = hashlib.sha256()
+    for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+        digest.update(path.relative_to(directory).as_posix().encode())
+        with path.open("rb") as file:
+            while chunk := file.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelArtifactCache:
+    """Local cache of registered model artifacts shared by all worker processes.
+
+    Artifacts are stored content addressed under `objects/<sha256>` and every
+    registered model version points to its object with a small json file, so that
+    versions with the same content share one copy. Downloads are guarded by a file
+    lock per model version, hence concurrently starting workers download a model
+    only once. The version an alias resolved to last is remembered as well, which
+    allows to start from the cache while the tracking server is unreachable.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        lock_timeout: float = 600,
+        client: MlflowClient | None = None,
+    ) -> None:
+        """Initializes the cache in directory, creating the directory if necessary."""
+        self.directory: pathlib.Path = directory
+        self.lock_timeout: float = lock_timeout
+        self._client: MlflowClient | None = client
+        for sub_directory in ["objects", "versions", "aliases", "locks"]:
+            (self.directory / sub_directory).mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(
+        cls, config: ModelCacheConfig | None = None
+    ) -> ModelArtifactCache | None:
+        """Returns the configured cache or None if no cache directory is configured."""
+        config = config if config is not None else ModelCacheConfig()
+        if not config.cache_dir:
+            return None
+        return cls(pathlib.Path(config.cache_dir), lock_timeout=config.lock_timeout)
+
+    @property
+    def client(self) -> MlflowClient:
+        """Returns the client of the model registry, created on first use."""
+        if self._client is None:
+            self._client = MlflowClient()
+        return self._client
+
+    def get(self, model_name: str, alias: str) -> pathlib.Path:
+        """Returns the local directory of the model version the alias points to.
+
+        Downloads the artifacts if the version is not cached yet. If the registry
+        cannot be reached, the version the alias resolved to last is used.
+        """
+        alias_path = self.directory / "aliases" / f"{model_name}@{alias}.json"
+        try:
+            version = self.client.get_model_version_by_alias(model_name, alias).version
+        except Exception:  # pylint: disable=broad-exception-caught
+            if not alias_path.exists():
+                raise
+            version = json.loads(alias_path.read_text())["version"]
+            LOGGER.warning(
+                "Could not resolve %s@%s, using the cached version %s.",
+                model_name,
+                alias,
+                version,
+                exc_info=True,
+            )
+            return self.get_version(model_name, str(version))
+
+        path = self.get_version(model_name, str(version))
+        _write_atomically(alias_path, {"version": str(version)})
+        return path
+
+    def get_version(self, model_name: str, version: str) -> pathlib.Path:
+        """Returns the local directory of a model version, downloading it if necessary."""
+        version_path = self.directory / "versions" / model_name / f"{version}.json"
+        lock_path = self.directory / "locks" / f"{model_name}-{version}.lock"
+        with FileLock(lock_path, timeout=self.lock_timeout):
+            if (path := self._cached_object(version_path)) is not None:
+                LOGGER.info(
+                    "Loading %s version %s from the cache.", model_name, version
+                )
+                return path
+            return self._download(model_name, version, version_path)
+
+    def _cached_object(self, version_path: pathlib.Path) -> pathlib.Path | None:
+        if not version_path.exists():
+            return None
+        checksum = json.loads(version_path.read_text())["checksum"]
+        path = self.directory / "objects" / checksum
+        if path.is_dir() and directory_checksum(path) == checksum:
+            return path
+        LOGGER.warning("Cached artifacts at %s are corrupt, downloading again.", path)
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+
+    def _download(
+        self, model_name: str, version: str, version_path: pathlib.Path
+    ) -> pathlib.Path:
+        LOGGER.info("Downloading %s version %s.", model_name, version)
+        tmp_dir = pathlib.Path(
+            tempfile.mkdtemp(dir=self.directory / "objects", prefix=".download-")
+        )
+        try:
+            local_path = pathlib.Path(
+                mlflow.artifacts.download_artifacts(
+                    artifact_uri=f"models:/{model_name}/{version}",
+                    dst_path=str(tmp_dir),
+                )
+            )
+            checksum = directory_checksum(local_path)
+            path = self.directory / "objects" / checksum
+            # Another version with the same content may have been cached already.
+            if not path.exists():
+                local_path.rename(path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        version_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomically(version_path, {"version": version, "checksum": checksum})
+        return path
+
+
+def load_model_info(path: pathlib.Path) -> mlflow.models.model.ModelInfo:
+    """Returns the model info of the model stored at path.
+
+    Without a reachable tracking server the logged model cannot be fetched, the
+    model info is then built from the local MLmodel file only.
+    """
+    model = mlflow.models.Model.load(path)
+    try:
+        return model.get_model_info()
+    except MlflowException:
+        LOGGER.warning("Could not fetch the logged model of %s.", path, exc_info=True)
+        model.model_id = None
+        return model.get_model_info()
+
+
+def _write_atomically(path: pathlib.Path, content: dict[str, str]) -> None:
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(content))
+    tmp_path.replace(path)
@@ -0,0 +1,116 @@
+import dataclasses
+import datetime as dt
+import logging
+import os
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from mlflow.tracking import MlflowClient
+
+from pv_prediction.model.inferencing_runner import InferencingRunner
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ModelReloadConfig:
+    """Model reload related configs."""
+
+    interval_seconds: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "60"))
+    )
+
+
+class ModelReloader:
+    """Reloads the model of an InferencingRunner when its registry alias moves.
+
+    Polls the MLflow model registry in a background thread and loads a new model
+    version as soon as the alias points to it. The model is loaded with `load`
+    before `start`, so that it is ready before the first request needs it.
+    """
+
+    def __init__(
+        self,
+        runner: InferencingRunner,
+        config: ModelReloadConfig | None = None,
+        client: MlflowClient | None = None,
+    ) -> None:
+        """Inits the reloader of runner, polling with the default MlflowClient."""
+        self.runner: InferencingRunner = runner
+        self.config: ModelReloadConfig = (
+            config if config is not None else ModelReloadConfig()
+        )
+        self.client: MlflowClient = client if client is not None else MlflowClient()
+        self.loaded_version: str | None = None
+        self._scheduler: BackgroundScheduler = BackgroundScheduler()
+
+    def load(self) -> None:
+        """Loads the model on startup, even if the registry cannot be reached.
+
+        Without the registry the runner falls back to its cached model artifacts.
+        The version of the alias is then loaded by the first check which reaches
+        the registry.
+        """
+        try:
+            version = self._alias_version()
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.exception(
+                "Resolving %s@%s failed, loading the model without the registry.",
+                self.runner.model_name,
+                self.runner.model_alias,
+            )
+            self.runner.load_model()
+            return
+        self._load(version)
+
+    def check(self) -> bool:
+        """Loads the model if the alias points to a new version.
+
+        The resolved version is loaded explicitly, so that the alias moving on in
+        the meantime cannot load a different version than the one recorded.
+
+        Returns:
+            Whether a new model version has been loaded.
+        """
+        version = self._alias_version()
+        if version == self.loaded_version:
+            return False
+        self._load(version)
+        return True
+
+    def _alias_version(self) -> str:
+        return self.client.get_model_version_by_alias(
+            self.runner.model_name, self.runner.model_alias
+        ).version
+
+    def _load(self, version: str) -> None:
+        LOGGER.info(
+            "Loading version %s of %s@%s.",
+            version,
+            self.runner.model_name,
+            self.runner.model_alias,
+        )
+        self.runner.load_model(version=version)
+        self.loaded_version = version
+
+    def _check_safely(self) -> None:
+        try:
+            self.check()
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.exception("Checking for a new model version failed.")
+
+    def start(self) -> None:
+        """Starts polling the registry in the background."""
+        self._scheduler.add_job(
+            self._check_safely,
+            "interval",
+            seconds=self.config.interval_seconds,
+            next_run_time=dt.datetime.now(dt.timezone.utc),
+            max_instances=1,
+            coalesce=True,
+        )
+        self._scheduler.start()
+
+    def shutdown(self) -> None:
+        """Stops polling, waiting for a running check to finish."""
+        if self._scheduler.running:
+            self._scheduler.shutdown()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Sequence
+
+import orjson
+import pandas as pd
+
+from pv_prediction.data.meteomatics.response_cache import CacheStats
+from pv_prediction.model.schemata import PredictionResponse
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+Key = tuple[str, str, str]
+
+
+@dataclasses.dataclass
+class PredictionCacheConfig:
+    """Prediction cache related configs."""
+
+    max_entries: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+    )
+    sqlite_path: str = dataclasses.field(
+        default_factory=lambda: os.getenv("PREDICTION_CACHE_SQLITE_PATH", "")
+    )
+    sqlite_max_entries: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("PREDICTION_CACHE_SQLITE_SIZE", "100000"))
+    )
+
+
+def weather_fingerprints(frame: pd.DataFrame, offsets: Sequence[int]) -> list[str]:
+    """Returns a hash of the columns and values of every slice of rows of frame.
+
+    The rows of all slices are hashed in a single pass, slice i covers the rows
+    offsets[i] to offsets[i + 1].
+    """
+    columns = "\x00".join(map(str, frame.columns)).encode()
+    row_hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    fingerprints = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        digest = hashlib.blake2b(columns, digest_size=16)
+        digest.update(row_hashes[start:end].tobytes())
+        fingerprints += [digest.hexdigest()]
+    return fingerprints
+
+
+class PredictionCache:  # pylint: disable=too-many-instance-attributes
+    """Cache of prediction responses keyed by model, PV installation and weather.
+
+    The most recently used max_entries responses are kept in memory. If a SQLite
+    path is given, the most recently stored sqlite_max_entries responses are kept
+    there as well, which shares them between worker processes and restarts. Every
+    thread uses its own SQLite connection outside of the lock of the in-memory
+    entries. Entries of other models are dropped with `invalidate` whenever a new
+    model is loaded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        sqlite_path: pathlib.Path | None = None,
+        sqlite_max_entries: int = 100_000,
+    ) -> None:
+        """Inits the cache, creating the SQLite database if a path is given."""
+        self.max_entries: int = max_entries
+        self.sqlite_max_entries: int = sqlite_max_entries
+        self.stats: CacheStats = CacheStats()
+        self._entries: collections.OrderedDict[Key, PredictionResponse] = (
+            collections.OrderedDict()
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._sqlite_path: pathlib.Path | None = sqlite_path
+        self._local: threading.local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        if (connection := self._connection()) is not None:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (model_id TEXT, pv_id TEXT, "
+                + "fingerprint TEXT, response BLOB, "
+                + "PRIMARY KEY (model_id, pv_id, fingerprint))"
+            )
+
+    @classmethod
+    def from_config(
+        cls, config: PredictionCacheConfig | None = None
+    ) -> PredictionCache | None:
+        """Returns the configured cache or None if caching is disabled."""
+        config = config if config is not None else PredictionCacheConfig()
+        if config.max_entries <= 0 and not config.sqlite_path:
+            return None
+        return cls(
+            max_entries=config.max_entries,
+            sqlite_path=(
+                pathlib.Path(config.sqlite_path) if config.sqlite_path else None
+            ),
+            sqlite_max_entries=config.sqlite_max_entries,
+        )
+
+    def get(
+        self, model_id: str, pv_id: str, fingerprint: str
+    ) -> PredictionResponse | None:
+        """Returns the cached response or None if it is not cached."""
+        key = (model_id, pv_id, fingerprint)
+        with self._lock:
+            if (response := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return response
+        connection = self._connection()
+        row = (
+            connection.execute(
+                "SELECT response FROM predictions "
+                + "WHERE model_id = ? AND pv_id = ? AND fingerprint = ?",
+                key,
+            ).fetchone()
+            if connection is not None
+            else None
+        )
+        with self._lock:
+            if row is None:
+                self.stats.misses += 1
+                return None
+            response = PredictionResponse.model_validate(orjson.loads(row[0]))
+            self._remember(key, response)
+            self.stats.hits += 1
+            return response
+
+    def put(self, fingerprint: str, response: PredictionResponse) -> None:
+        """Caches the response predicted from weather with the fingerprint."""
+        key = (response.model_id, response.pv_id, fingerprint)
+        with self._lock:
+            self._remember(key, response)
+        if (connection := self._connection()) is not None:
+            # Replacing a row gives it a new rowid, so the rowids order the rows by
+            # the time they were stored.
+            cursor = connection.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                (*key, orjson.dumps(response.model_dump())),
+            )
+            connection.execute(
+                "DELETE FROM predictions WHERE rowid <= ?",
+                (cursor.lastrowid - self.sqlite_max_entries,),
+            )
+
+    def invalidate(self, model_id: str) -> None:
+        """Drops all entries which have not been predicted by the model model_id."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] != model_id]:
+                del self._entries[key]
+        if (connection := self._connection()) is not None:
+            connection.execute(
+                "DELETE FROM predictions WHERE model_id != ?", (model_id,)
+            )
+        LOGGER.info("Invalidated the cached predictions of all but %s.", model_id)
+
+    def close(self) -> None:
+        """Closes the SQLite connections of all threads."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._sqlite_path = None
+        for connection in connections:
+            connection.close()
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """Returns the SQLite connection of the current thread, None without SQLite."""
+        if self._sqlite_path is None:
+            return None
+        if (connection := getattr(self._local, "connection", None)) is not None:
+            return connection
+        self._sqlite_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            self._sqlite_path, check_same_thread=False, isolation_level=None
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        self._local.connection = connection
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _remember(self, key: Key, response: PredictionResponse) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from typing import Any
+
 import mlflow.models.model
 import mlflow.sklearn
+import numpy as np
 from joblib import Memory
 from lightgbm.sklearn import LGBMRegressor
 from sklearn.pipeline import Pipeline
 
+from pv_prediction.common.metrics import timed
 from pv_prediction.model.custom_blocks.select_subset import SelectSubset
+from pv_prediction.model.model_artifact_cache import load_model_info
+from pv_prediction.model.model_artifact_cache import ModelArtifactCache
 
 
 class PVPipeline(Pipeline):
@@ -32,16 +38,24 @@ class PVPipeline(Pipeline):
         return self._model_info
 
     @classmethod
-    def get_pipeline(cls, weather_params: list[str]) -> PVPipeline:
-        """Returns an example pipeline."""
+    def get_pipeline(
+        cls, weather_params: list[str], memory: Memory | str | None = None
+    ) -> PVPipeline:
+        """Returns an example pipeline, caching fitted transformers in memory if set."""
         return cls(
             [
                 ("selector", SelectSubset(weather_params)),
                 ("estimator", LGBMRegressor()),
             ],
             weather_params,
+            memory=memory,
         )
 
+    @timed("model.predict")
+    def predict(self, X: Any, **params: Any) -> np.ndarray:  # pyre-ignore[2]
+        """Predicts X with the fitted pipeline."""
+        return super().predict(X, **params)
+
     def log_model(self) -> None:
         """Log model to mlflow as pv_model."""
         self._model_info = mlflow.sklearn.log_model(
@@ -53,9 +67,31 @@ class PVPipeline(Pipeline):
         self._model_info = model_info
 
     @staticmethod
-    def load_from_mlflow(model_name: str, model_version_alias: str) -> PVPipeline:
-        """Load model from mlflow by specifying model_name and model_version."""
-        model_uri = f"models:/{model_name}@{model_version_alias}"
+    def load_from_mlflow(
+        model_name: str, model_version_alias: str, version: str | None = None
+    ) -> PVPipeline:
+        """Load model from mlflow by specifying model_name and model_version.
+
+        If version is given, exactly that version is loaded instead of the one the
+        alias points to at the time of loading. If MODEL_CACHE_DIR is set, the model
+        is loaded from the local artifact cache, which downloads every model version
+        only once for all worker processes.
+        """
+        if (cache := ModelArtifactCache.from_config()) is not None:
+            local_path = (
+                cache.get(model_name, model_version_alias)
+                if version is None
+                else cache.get_version(model_name, version)
+            )
+            model: PVPipeline = mlflow.sklearn.load_model(str(local_path))
+            model.set_model_info(load_model_info(local_path))
+            return model
+
+        model_uri = (
+            f"models:/{model_name}@{model_version_alias}"
+            if version is None
+            else f"models:/{model_name}/{version}"
+        )
         model: PVPipeline = mlflow.sklearn.load_model(model_uri)
         model.set_model_info(mlflow.models.get_model_info(model_uri))
         return model
@@ -0,0 +1,23 @@
+import datetime as dt
+from typing import Annotated
+
+from pydantic import BaseModel
+from pydantic import PlainSerializer
+
+DateTime = Annotated[dt.datetime, PlainSerializer(lambda dt: dt.isoformat())]
+
+
+class Prediction(BaseModel):
+    """PV prediction at some time."""
+
+    date: DateTime
+    energy_produced: float
+
+
+class PredictionResponse(BaseModel):
+    """Predictionresponse."""
+
+    pv_id: str
+    prediction_time: DateTime
+    model_id: str
+    predictions: list[Prediction]
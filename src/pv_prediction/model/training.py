@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime as dt
+import logging
+import os
+import time
+from typing import Any
+
+import click
+import mlflow
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from mlflow.tracking import MlflowClient
+from scipy import stats
+from sklearn.base import clone
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import TimeSeriesSplit
+
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.feature_store import FEATURES
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.data.feature_store import hourly_produced
+from pv_prediction.model.pv_pipeline import PVPipeline
+
+LOGGER: logging.Logger = logging.getLogger(__name__)
+
+MODEL_NAME: str = "pv_model"
+MODEL_ALIAS: str = "production"
+
+WEATHER_PARAMS: list[str] = [
+    column.name
+    for column in FlattenedWeather.__table__.columns
+    if isinstance(column.type, (sa.Float, sa.Integer))
+    and column.name not in ["lat", "lon"]
+]
+
+PARAM_DISTRIBUTIONS: dict[str, Any] = {  # pyre-ignore[33]
+    "estimator__n_estimators": stats.randint(100, 1000),
+    "estimator__learning_rate": stats.loguniform(0.01, 0.3),
+    "estimator__num_leaves": stats.randint(8, 128),
+    "estimator__min_child_samples": stats.randint(5, 100),
+    "estimator__subsample": stats.uniform(0.5, 0.5),
+    "estimator__subsample_freq": [1],
+    "estimator__colsample_bytree": stats.uniform(0.5, 0.5),
+    "estimator__reg_lambda": stats.loguniform(1e-3, 10),
+}
+
+
+@dataclasses.dataclass
+class TrainingConfig:  # pylint: disable=too-many-instance-attributes
+    """Training related configs."""
+
+    n_splits: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("TRAIN_N_SPLITS", "5"))
+    )
+    n_iter: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("TRAIN_N_ITER", "20"))
+    )
+    n_jobs: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("TRAIN_N_JOBS", str(os.cpu_count())))
+    )
+    cache_dir: str = dataclasses.field(
+        default_factory=lambda: os.getenv("TRAIN_CACHE_DIR", "")
+    )
+    incremental_n_estimators: int = dataclasses.field(
+        default_factory=lambda: int(os.getenv("TRAIN_INCREMENTAL_N_ESTIMATORS", "100"))
+    )
+    holdout_days: float = dataclasses.field(
+        default_factory=lambda: float(os.getenv("TRAIN_HOLDOUT_DAYS", "7"))
+    )
+    use_features: bool = dataclasses.field(
+        default_factory=lambda: os.getenv("TRAIN_USE_FEATURES", "false").lower()
+        == "true"
+    )
+    random_state: int = 0
+
+    @property
+    def estimator_threads(self) -> int:
+        """Returns the LightGBM threads per search process.
+
+        The cores are split among the processes of the search, so that the folds
+        fitted in parallel do not oversubscribe the CPUs. Negative n_jobs are
+        resolved like joblib does, -1 runs one process per CPU, -2 all but one.
+        """
+        cpu_count = os.cpu_count() or 1
+        processes = cpu_count + 1 + self.n_jobs if self.n_jobs < 0 else self.n_jobs
+        return max(1, cpu_count // max(1, processes))
+
+
+def load_training_data(
+    engine: sa.Engine,
+    lat: float,
+    lon: float,
+    start: dt.datetime,
+    end: dt.datetime,
+    *,
+    with_features: bool = False,
+) -> tuple[pd.DataFrame, pd.Series]:
+    """Returns the weather at (lat, lon) and the hourly produced energy, by date.
+
+    The energy is summed up per hour and joined with the weather of the same hour.
+    Hours without weather or energy are dropped, the rows are sorted by date. If
+    with_features is set, the features of the feature store are added the same way
+    as in serving.
+    """
+    weather = pd.read_sql(
+        sa.select(
+            FlattenedWeather.date,
+            *[getattr(FlattenedWeather, name) for name in WEATHER_PARAMS],
+        ).where(
+            FlattenedWeather.lat == lat,
+            FlattenedWeather.lon == lon,
+            FlattenedWeather.date >= start,
+            FlattenedWeather.date < end,
+        ),
+        engine,
+        parse_dates=["date"],
+        index_col="date",
+    )
+    params = WEATHER_PARAMS
+    if with_features:
+        weather = (
+            FeatureStore(engine)
+            .join(weather.reset_index().assign(lat=lat, lon=lon))
+            .set_index("date")
+        )
+        params = WEATHER_PARAMS + FEATURES
+    produced = hourly_produced(engine, start, end).rename("produced")
+    data = weather.join(produced, how="inner").sort_index()
+    return data[params], data["produced"]
+
+
+def search(
+    x: pd.DataFrame, y: pd.Series, config: TrainingConfig
+) -> tuple[PVPipeline, dict[str, float]]:
+    """Searches hyperparameters with time series cross validation and refits the best.
+
+    Candidates are evaluated in config.n_jobs processes. The best pipeline is refit
+    on all data using every core. Returns the pipeline and the metrics of the search.
+    """
+    pipeline = PVPipeline.get_pipeline(list(x.columns), memory=config.cache_dir or None)
+    pipeline.set_params(estimator__n_jobs=config.estimator_threads)
+    random_search = RandomizedSearchCV(
+        pipeline,
+        PARAM_DISTRIBUTIONS,
+        n_iter=config.n_iter,
+        scoring="neg_root_mean_squared_error",
+        n_jobs=config.n_jobs,
+        cv=TimeSeriesSplit(n_splits=config.n_splits),
+        refit=False,
+        random_state=config.random_state,
+    )
+    LOGGER.info(
+        "Searching %s candidates in %s processes with %s threads each.",
+        config.n_iter,
+        config.n_jobs,
+        config.estimator_threads,
+    )
+    started = time.perf_counter()
+    random_search.fit(x, y)
+    search_seconds = time.perf_counter() - started
+
+    pipeline.set_params(**random_search.best_params_, estimator__n_jobs=-1)
+    started = time.perf_counter()
+    pipeline.fit(x, y)
+    refit_seconds = time.perf_counter() - started
+
+    best = random_search.best_index_
+    return pipeline, {
+        "cv_rmse": -float(random_search.best_score_),
+        "cv_rmse_std": float(random_search.cv_results_["std_test_score"][best]),
+        "search_seconds": search_seconds,
+        "refit_seconds": refit_seconds,
+    }
+
+
+def train(
+    engine: sa.Engine,
+    lat: float,
+    lon: float,
+    start: dt.datetime,
+    end: dt.datetime,
+    *,
+    config: TrainingConfig | None = None,
+) -> PVPipeline:
+    """Trains a pipeline on the data of (lat, lon) and logs it to mlflow as pv_model."""
+    config = config if config is not None else TrainingConfig()
+    started = time.perf_counter()
+    x, y = load_training_data(
+        engine, lat, lon, start, end, with_features=config.use_features
+    )
+    load_seconds = time.perf_counter() - started
+    if len(x) <= config.n_splits:
+        raise ValueError(
+            f"{len(x)} samples are not enough for {config.n_splits} splits."
+        )
+    LOGGER.info("Training on %s hours from %s to %s.", len(x), start, end)
+
+    with mlflow.start_run():
+        pipeline, metrics = search(x, y, config)
+        mlflow.log_params(
+            {
+                "lat": lat,
+                "lon": lon,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "n_samples": len(x),
+                "n_splits": config.n_splits,
+                "n_iter": config.n_iter,
+                "n_jobs": config.n_jobs,
+                "use_features": config.use_features,
+                "estimator_threads": config.estimator_threads,
+                **{key: pipeline.get_params()[key] for key in PARAM_DISTRIBUTIONS},
+            }
+        )
+        mlflow.log_metrics(metrics | {"load_seconds": load_seconds})
+        pipeline.log_model()
+    LOGGER.info("Logged the best model with a cv rmse of %.3f.", metrics["cv_rmse"])
+    return pipeline
+
+
+def continue_boosting(
+    pipeline: PVPipeline, x: pd.DataFrame, y: pd.Series, n_estimators: int
+) -> PVPipeline:
+    """Returns a copy of the fitted pipeline with n_estimators trees fitted on x added.
+
+    The fitted pipeline is left untouched, the copy continues boosting from its
+    LightGBM booster, hence the cost only depends on x and n_estimators.
+    """
+    candidate = clone(pipeline)
+    candidate.set_params(estimator__n_estimators=n_estimators)
+    return candidate.fit(
+        x, y, estimator__init_model=pipeline.named_steps["estimator"].booster_
+    )
+
+
+def retrain(
+    engine: sa.Engine,
+    lat: float,
+    lon: float,
+    start: dt.datetime,
+    end: dt.datetime,
+    *,
+    config: TrainingConfig | None = None,
+    promote: bool = False,
+) -> PVPipeline | None:
+    """Continues boosting the production model on the data from start to end only.
+
+    The last config.holdout_days of the window are held out. The candidate adds
+    config.incremental_n_estimators trees to the production booster, fitted on the
+    rest of the window, and is registered only if its rmse on the holdout is not
+    worse than the one of the production model. If promote is set, the registered
+    version becomes the production model. Returns the registered pipeline or None.
+    """
+    config = config if config is not None else TrainingConfig()
+    production = PVPipeline.load_from_mlflow(MODEL_NAME, MODEL_ALIAS)
+    started = time.perf_counter()
+    x, y = load_training_data(
+        engine,
+        lat,
+        lon,
+        start,
+        end,
+        with_features=not set(FEATURES).isdisjoint(production.weather_params),
+    )
+    load_seconds = time.perf_counter() - started
+    is_train = np.asarray(x.index < end - dt.timedelta(days=config.holdout_days))
+    if is_train.all() or not is_train.any():
+        raise ValueError(
+            f"The {len(x)} samples from {start} to {end} do not cover both the "
+            + f"training window and the holdout of {config.holdout_days} days."
+        )
+    LOGGER.info(
+        "Continuing training on %s hours, holding out %s hours.",
+        is_train.sum(),
+        (~is_train).sum(),
+    )
+
+    started = time.perf_counter()
+    candidate = continue_boosting(
+        production, x[is_train], y[is_train], config.incremental_n_estimators
+    )
+    metrics = {
+        "fit_seconds": time.perf_counter() - started,
+        "load_seconds": load_seconds,
+        "holdout_rmse": root_mean_squared_error(
+            y[~is_train], candidate.predict(x[~is_train])
+        ),
+        "production_holdout_rmse": root_mean_squared_error(
+            y[~is_train], production.predict(x[~is_train])
+        ),
+    }
+
+    with mlflow.start_run():
+        mlflow.log_params(
+            {
+                "lat": lat,
+                "lon": lon,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "n_samples": len(x),
+                "holdout_days": config.holdout_days,
+                "incremental_n_estimators": config.incremental_n_estimators,
+                "init_model_uri": production.model_info.model_uri,
+            }
+        )
+        mlflow.log_metrics(metrics)
+        if metrics["holdout_rmse"] > metrics["production_holdout_rmse"]:
+            LOGGER.warning(
+                "Not registering the candidate, its holdout rmse %.3f is worse than "
+                + "the %.3f of the production model.",
+                metrics["holdout_rmse"],
+                metrics["production_holdout_rmse"],
+            )
+            return None
+        candidate.log_model()
+
+    LOGGER.info(
+        "Registered version %s of %s.",
+        candidate.model_info.registered_model_version,
+        MODEL_NAME,
+    )
+    if promote:
+        MlflowClient().set_registered_model_alias(
+            MODEL_NAME, MODEL_ALIAS, candidate.model_info.registered_model_version
+        )
+    return candidate
+
+
+@click.command()
+@click.option("--lat", required=True, type=click.FLOAT, help="Latitude of the PV")
+@click.option("--lon", required=True, type=click.FLOAT, help="Longitude of the PV")
+@click.option(
+    "--start",
+    required=True,
+    type=click.DateTime(),
+    help="Start of the training data (inclusive)",
+)
+@click.option(
+    "--end",
+    required=True,
+    type=click.DateTime(),
+    help="End of the training data (exclusive)",
+)
+@click.option(
+    "--database-url",
+    default=None,
+    type=click.STRING,
+    help="Database to read the training data from (defaults to DATABASE_URL)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Continue boosting the production model on the window instead of a search",
+)
+@click.option(
+    "--promote",
+    is_flag=True,
+    default=False,
+    help="Make an incrementally trained model the production model if registered",
+)
+def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    lat: float,
+    lon: float,
+    start: dt.datetime,
+    end: dt.datetime,
+    database_url: str | None,
+    incremental: bool,
+    promote: bool,
+) -> None:
+    """Trains the PV model on the energy and weather tables and logs it to mlflow."""
+    config = DatabaseConfig()
+    if database_url is not None:
+        config.url = database_url
+    DBSessionManager.configure(config)
+    if incremental:
+        retrain(DBSessionManager.get_engine(), lat, lon, start, end, promote=promote)
+    else:
+        train(DBSessionManager.get_engine(), lat, lon, start, end)
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
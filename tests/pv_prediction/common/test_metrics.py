@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from pv_prediction.common import metrics
+
+
+def _sample(name: str, stage: str) -> float | None:
+    return metrics.REGISTRY.get_sample_value(name, {"stage": stage})
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(metrics.set_enabled, metrics.is_enabled())
+        metrics.set_enabled(True)
+
+    def test_timed(self) -> None:
+        @metrics.timed("test.sync")
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        @metrics.timed("test.async")
+        async def add_async(a: int, b: int) -> int:
+            return a + b
+
+        before = _sample("pv_prediction_stage_seconds_count", "test.sync") or 0.0
+        self.assertEqual(add(1, 2), 3)
+        self.assertEqual(asyncio.run(add_async(1, 2)), 3)
+        self.assertEqual(
+            _sample("pv_prediction_stage_seconds_count", "test.sync"), before + 1
+        )
+        self.assertEqual(_sample("pv_prediction_stage_seconds_count", "test.async"), 1)
+
+        metrics.set_enabled(False)
+        self.assertEqual(add(1, 2), 3)
+        self.assertEqual(
+            _sample("pv_prediction_stage_seconds_count", "test.sync"), before + 1
+        )
+
+    def test_timed_records_failures(self) -> None:
+        @metrics.timed("test.failure")
+        def fail() -> None:
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(
+            _sample("pv_prediction_stage_seconds_count", "test.failure"), 1
+        )
+
+    def test_timer_and_sizes(self) -> None:
+        with metrics.timer("test.timer"):
+            pass
+        metrics.record_seconds("test.timer", 2.0)
+        metrics.record_size("test.size", rows=10, payload_bytes=2048)
+
+        self.assertEqual(_sample("pv_prediction_stage_seconds_count", "test.timer"), 2)
+        self.assertGreaterEqual(
+            _sample("pv_prediction_stage_seconds_sum", "test.timer"), 2.0
+        )
+        self.assertEqual(_sample("pv_prediction_stage_rows_sum", "test.size"), 10)
+        self.assertEqual(
+            _sample("pv_prediction_stage_payload_bytes_sum", "test.size"), 2048
+        )
+
+        metrics.set_enabled(False)
+        with metrics.timer("test.disabled"):
+            pass
+        metrics.record_size("test.disabled", rows=1)
+        self.assertIsNone(_sample("pv_prediction_stage_seconds_count", "test.disabled"))
+        self.assertIsNone(_sample("pv_prediction_stage_rows_count", "test.disabled"))
+
+    def test_exposition(self) -> None:
+        metrics.record_size("test.exposition", rows=3)
+        content, content_type = metrics.exposition()
+        self.assertIn(
+            b'pv_prediction_stage_rows_count{stage="test.exposition"} 1.0', content
+        )
+        self.assertTrue(content_type.startswith("text/plain"))
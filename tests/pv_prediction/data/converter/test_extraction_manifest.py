@@ -0,0 +1,33 @@
+import datetime as dt
+import pathlib
+import tempfile
+import unittest
+
+from pv_prediction.data.converter.extraction_manifest import ExtractionManifest
+
+
+class TestExtractionManifest(unittest.TestCase):
+    def test_missing_days(self) -> None:
+        manifest = ExtractionManifest(pathlib.Path("dataset"), ["Param1"])
+        manifest.mark_extracted(
+            [dt.date(2024, 1, 1), dt.date(2024, 1, 2)],
+            dt.datetime(2024, 1, 2, 12, tzinfo=dt.timezone.utc),
+        )
+        self.assertEqual(
+            manifest.missing_days(dt.date(2024, 1, 1), dt.date(2024, 1, 3)),
+            [dt.date(2024, 1, 2), dt.date(2024, 1, 3)],
+        )
+
+    def test_save_and_load(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset_dir = pathlib.Path(tmp_dir) / "dataset"
+            extracted_at = dt.datetime(2024, 1, 5, tzinfo=dt.timezone.utc)
+            manifest = ExtractionManifest(dataset_dir, ["Param1"])
+            manifest.mark_extracted([dt.date(2024, 1, 1)], extracted_at)
+            manifest.save()
+
+            loaded = ExtractionManifest.load(dataset_dir, ["Param1"])
+            self.assertEqual(loaded.extracted_at, {dt.date(2024, 1, 1): extracted_at})
+
+            changed = ExtractionManifest.load(dataset_dir, ["Param2"])
+            self.assertEqual(changed.extracted_at, {})
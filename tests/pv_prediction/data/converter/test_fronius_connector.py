@@ -1,7 +1,16 @@
+import datetime as dt
+import pathlib
+import tempfile
 import unittest
+from typing import Iterator
+from unittest import mock
 
+import orjson
 import pandas as pd
+import pyarrow.parquet as pq
+import requests
 
+from pv_prediction.data.converter.fronius_connector import FroniusConfig
 from pv_prediction.data.converter.fronius_connector import FroniusConnector
 
 # pylint: disable=protected-access
@@ -64,3 +73,255 @@ class TestFroniusConnector(unittest.TestCase):
                 ),
             ),
         )
+
+    def test_transform_response_unaligned_channels(self) -> None:
+        response = mock.MagicMock()
+        response.content = orjson.dumps(
+            {
+                "Body": {
+                    "Data": {
+                        "inverter/1": {
+                            "Data": {
+                                "Param1": {"Values": {"600": 2, "0": 1}},
+                                "Param2": {"Values": {"300": 0.5}},
+                                "Param3": {"Values": {"0": 9}},
+                            },
+                            "Start": "2024-07-09T00:00:00+02:00",
+                        }
+                    }
+                }
+            }
+        )
+        result = FroniusConnector._transform_response(response, ["Param2", "Param1"])
+        response.raise_for_status.assert_called_once()
+        pd.testing.assert_frame_equal(
+            result,
+            pd.DataFrame(
+                {"Param2": [None, 0.5, None], "Param1": [1.0, None, 2.0]},
+                index=pd.to_datetime(
+                    [
+                        "2024-07-09T00:00:00+02:00",
+                        "2024-07-09T00:05:00+02:00",
+                        "2024-07-09T00:10:00+02:00",
+                    ]
+                ),
+                dtype="float64",
+            ),
+        )
+
+    def test_query_windows(self) -> None:
+        windows = FroniusConnector._query_windows(
+            dt.date(2024, 1, 1), dt.date(2024, 2, 5)
+        )
+        self.assertEqual(
+            windows,
+            [
+                (dt.date(2024, 1, 1), dt.date(2024, 1, 16)),
+                (dt.date(2024, 1, 17), dt.date(2024, 2, 1)),
+                (dt.date(2024, 2, 2), dt.date(2024, 2, 5)),
+            ],
+        )
+        self.assertEqual(
+            FroniusConnector._query_windows(dt.date(2024, 1, 1), dt.date(2024, 1, 1)),
+            [(dt.date(2024, 1, 1), dt.date(2024, 1, 1))],
+        )
+
+    @mock.patch("pv_prediction.data.converter.fronius_connector.time.sleep")
+    @mock.patch(
+        "pv_prediction.data.converter.fronius_connector.FroniusConnector._query_data"
+    )
+    def test_query_window_retries(
+        self, mock_query_data: mock.MagicMock, mock_sleep: mock.MagicMock
+    ) -> None:
+        connector = FroniusConnector(
+            FroniusConfig(ip_adress="ip", max_retries=2, backoff_seconds=1)
+        )
+        mock_query_data.side_effect = [
+            requests.ConnectionError("timeout"),
+            requests.ConnectionError("timeout"),
+            "data",
+        ]
+        result = connector._query_window(dt.date(2024, 1, 1), dt.date(2024, 1, 2), [])
+        self.assertEqual(result, "data")
+        mock_sleep.assert_has_calls([mock.call(1), mock.call(2)])
+
+        mock_query_data.side_effect = requests.ConnectionError("timeout")
+        self.assertIsNone(
+            connector._query_window(dt.date(2024, 1, 1), dt.date(2024, 1, 2), [])
+        )
+
+    @mock.patch("pv_prediction.data.converter.fronius_connector.time.sleep")
+    def test_query_window_retries_malformed_body(
+        self, mock_sleep: mock.MagicMock
+    ) -> None:
+        connector = FroniusConnector(
+            FroniusConfig(ip_adress="ip", max_retries=1, backoff_seconds=1)
+        )
+        truncated = mock.MagicMock(content=b'{"Body": {"Data": ')
+        complete = mock.MagicMock(
+            content=orjson.dumps(
+                {
+                    "Body": {
+                        "Data": {
+                            "inverter/1": {
+                                "Data": {"Param1": {"Values": {"0": 1}}},
+                                "Start": "2024-07-09T00:00:00+02:00",
+                            }
+                        }
+                    }
+                }
+            )
+        )
+        with mock.patch.object(
+            connector.session, "get", side_effect=[truncated, complete]
+        ), self.assertLogs(level="WARNING"):
+            result = connector._query_window(
+                dt.date(2024, 7, 9), dt.date(2024, 7, 9), ["Param1"]
+            )
+
+        self.assertEqual(result["Param1"].tolist(), [1])
+        mock_sleep.assert_called_once_with(1)
+
+        with mock.patch.object(
+            connector.session, "get", return_value=truncated
+        ), self.assertLogs(level="ERROR"):
+            self.assertIsNone(
+                connector._query_window(
+                    dt.date(2024, 7, 9), dt.date(2024, 7, 9), ["Param1"]
+                )
+            )
+
+    @mock.patch("pv_prediction.data.converter.fronius_connector.time.sleep")
+    def test_get_data_skips_unparsable_windows(
+        self, mock_sleep: mock.MagicMock
+    ) -> None:
+        def get(url: str, **_: object) -> mock.MagicMock:
+            device = {
+                "Data": {"Param1": {"Values": {"0": 1}}},
+                "Start": "2024-01-01T00:00:00+01:00",
+            }
+            if "StartDate=17.1.2024" in url:
+                # None of the requested channels.
+                device["Data"] = {"Other": {"Values": {"0": 1}}}
+            body = {"Body": {"Data": {"inverter/1": device}}}
+            if "StartDate=2.2.2024" in url:
+                body = {"Head": {}}
+            return mock.MagicMock(content=orjson.dumps(body))
+
+        connector = FroniusConnector(
+            FroniusConfig(ip_adress="ip", max_retries=1, max_workers=2)
+        )
+        with mock.patch.object(
+            connector.session, "get", side_effect=get
+        ), self.assertLogs(level="ERROR") as logs:
+            result = connector._get_data(
+                dt.date(2024, 1, 1), dt.date(2024, 2, 14), ["Param1"]
+            )
+
+        self.assertEqual(result["Param1"].tolist(), [1])
+        self.assertEqual(len(logs.output), 2)
+        mock_sleep.assert_not_called()
+
+    @mock.patch(
+        "pv_prediction.data.converter.fronius_connector.FroniusConnector._query_window"
+    )
+    def test_get_data_keeps_order(self, mock_query_window: mock.MagicMock) -> None:
+        def query_window(
+            start_date: dt.date, end_date: dt.date, parameters: list[str]
+        ) -> pd.DataFrame | None:
+            if start_date == dt.date(2024, 1, 17):
+                return None
+            return pd.DataFrame({"Param": parameters}, index=[start_date, end_date])
+
+        mock_query_window.side_effect = query_window
+        connector = FroniusConnector(FroniusConfig(ip_adress="ip", max_workers=3))
+        result = connector._get_data(
+            dt.date(2024, 1, 1), dt.date(2024, 3, 1), ["a", "b"]
+        )
+        self.assertEqual(
+            list(result.index),
+            [
+                dt.date(2024, 1, 1),
+                dt.date(2024, 1, 16),
+                dt.date(2024, 2, 2),
+                dt.date(2024, 2, 17),
+                dt.date(2024, 2, 18),
+                dt.date(2024, 3, 1),
+            ],
+        )
+
+    def test_write_stream(self) -> None:
+        def frames() -> Iterator[pd.DataFrame]:
+            yield pd.DataFrame(
+                {"Param1": [1, 2]},
+                index=pd.to_datetime(
+                    ["2024-03-30T00:00:00+01:00", "2024-03-30T00:05:00+01:00"]
+                ),
+            )
+            yield pd.DataFrame(
+                {"Param1": [0.5]},
+                index=pd.to_datetime(["2024-04-01T00:00:00+02:00"]),
+            )
+            raise requests.ConnectionError("connection lost")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = pathlib.Path(tmp_dir) / "data.parquet"
+            with self.assertRaises(requests.ConnectionError):
+                FroniusConnector(FroniusConfig(ip_adress="ip"))._write_stream(
+                    frames(), file_path
+                )
+            self.assertEqual(pq.ParquetFile(file_path).num_row_groups, 2)
+            result = pd.read_parquet(file_path)
+
+        pd.testing.assert_frame_equal(
+            result,
+            pd.DataFrame(
+                {"Param1": [1.0, 2.0, 0.5]},
+                index=pd.to_datetime(
+                    [
+                        "2024-03-29T23:00:00Z",
+                        "2024-03-29T23:05:00Z",
+                        "2024-03-31T22:00:00Z",
+                    ]
+                ),
+            ),
+        )
+
+    @mock.patch(
+        "pv_prediction.data.converter.fronius_connector.FroniusConnector._query_window"
+    )
+    def test_extract_incremental(self, mock_query_window: mock.MagicMock) -> None:
+        def query_window(
+            start_date: dt.date, end_date: dt.date, parameters: list[str]
+        ) -> pd.DataFrame | None:
+            index = pd.date_range(
+                f"{start_date.isoformat()}T00:00:00+01:00",
+                f"{end_date.isoformat()}T12:00:00+01:00",
+                freq="12h",
+            )
+            return pd.DataFrame({p: range(len(index)) for p in parameters}, index=index)
+
+        mock_query_window.side_effect = query_window
+        connector = FroniusConnector(FroniusConfig(ip_adress="ip"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset_dir = pathlib.Path(tmp_dir)
+            connector.extract_incremental(
+                dt.date(2024, 1, 1), dt.date(2024, 1, 20), dataset_dir, ["Param1"]
+            )
+            mock_query_window.assert_has_calls(
+                [
+                    mock.call(dt.date(2024, 1, 1), dt.date(2024, 1, 16), ["Param1"]),
+                    mock.call(dt.date(2024, 1, 17), dt.date(2024, 1, 20), ["Param1"]),
+                ]
+            )
+            result = pd.read_parquet(dataset_dir)
+            self.assertEqual(len(result), 40)
+            self.assertEqual(len(list(dataset_dir.glob("date=*/part-0.parquet"))), 20)
+
+            mock_query_window.reset_mock()
+            connector.extract_incremental(
+                dt.date(2024, 1, 1), dt.date(2024, 1, 22), dataset_dir, ["Param1"]
+            )
+            mock_query_window.assert_called_once_with(
+                dt.date(2024, 1, 21), dt.date(2024, 1, 22), ["Param1"]
+            )
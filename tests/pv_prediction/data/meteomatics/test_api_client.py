@@ -6,6 +6,7 @@ from pydantic import ValidationError
 
 from pv_prediction.data.meteomatics.api_client import APIClient
 from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
 from pv_prediction.data.meteomatics.schemata import WeatherResponse
 
 # pylint: disable=protected-access
@@ -74,6 +75,21 @@ class TestAPIClient(unittest.TestCase):
         )
         self.assertEqual(result, mock_get_weather_data.return_value)
 
+    @mock.patch("pv_prediction.data.meteomatics.api_client.requests.get")
+    def test_get_weather_columns_for_date(self, mock_get: mock.MagicMock) -> None:
+        mock_get.return_value.json.return_value = self.response
+        result = self.client.get_weather_columns_for_date(
+            dt.date(2025, 12, 12), ["param1"], [(1.0, 2.0)]
+        )
+        self.assertIsInstance(result, WeatherColumns)
+        self.assertEqual(len(result.columns), 2)
+        mock_get.assert_called_once_with(
+            "https://api.meteomatics.com/"
+            + "2025-12-12T00:00:00+01:00--2025-12-13T00:00:00+01:00:PT1H/param1/1.0,2.0/json",
+            auth=("user", "password"),
+            timeout=10,
+        )
+
     @mock.patch("pv_prediction.data.meteomatics.api_client.requests.get")
     def test_get_weather_data(self, mock_get: mock.MagicMock) -> None:
         mock_response: mock.MagicMock = mock_get.return_value
@@ -90,6 +106,31 @@ class TestAPIClient(unittest.TestCase):
             timeout=10,
         )
 
+    @mock.patch("pv_prediction.data.meteomatics.api_client.requests.get")
+    def test_get_weather_data_cached(self, mock_get: mock.MagicMock) -> None:
+        mock_cache = mock.MagicMock()
+        mock_cache.get.return_value = None
+        mock_get.return_value.json.return_value = self.response
+        client = APIClient(
+            MeteomaticsConfig(username="user", password="pw"), mock_cache
+        )
+        date_range = "2025-06-29T00:00:00+02:00--2025-06-30T00:00:00+02:00:PT1H"
+        url = f"https://api.meteomatics.com/{date_range}/param1/1.0,1.0/json"
+
+        client._get_weather_data(date_range, ["param1"], [(1.0, 1.0)])
+        mock_cache.put.assert_called_once_with(
+            url,
+            self.response,
+            dt.datetime.fromisoformat("2025-06-29T00:00:00+02:00"),
+            dt.datetime.fromisoformat("2025-06-30T00:00:00+02:00"),
+        )
+
+        mock_cache.get.return_value = self.response
+        result = client._get_weather_data(date_range, ["param1"], [(1.0, 1.0)])
+        self.assertEqual(WeatherResponse(**self.response), result)  # pyre-ignore[6]
+        mock_get.assert_called_once()
+        mock_cache.get.assert_called_with(url)
+
     @mock.patch("pv_prediction.data.meteomatics.api_client.requests.get")
     def test_get_weather_data_wrong_response(self, mock_get: mock.MagicMock) -> None:
         mock_response: mock.MagicMock = mock_get.return_value
@@ -0,0 +1,114 @@
+import asyncio
+import datetime as dt
+import unittest
+
+import httpx
+
+from pv_prediction.common import metrics
+from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.async_api_client import AsyncAPIClient
+from pv_prediction.data.meteomatics.schemata import WeatherResponse
+
+
+class TestAsyncAPIClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.requested_urls: list[str] = []
+        self.response = {
+            "version": "3.0",
+            "user": "-_steiner_frederik",
+            "dateGenerated": "2025-06-29T07:53:41Z",
+            "status": "OK",
+            "data": [
+                {
+                    "parameter": "t_2m:C",
+                    "coordinates": [
+                        {
+                            "lat": 30.556,
+                            "lon": 5.693083,
+                            "dates": [
+                                {"date": "2025-06-28T22:00:00Z", "value": 20.1},
+                            ],
+                        }
+                    ],
+                },
+            ],
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requested_urls += [str(request.url)]
+            self.assertEqual(request.headers["Authorization"], "Basic dXNlcjpwdw==")
+            return httpx.Response(200, json=self.response)
+
+        self.client = AsyncAPIClient(
+            MeteomaticsConfig(
+                username="user",
+                password="pw",
+                max_concurrency=2,
+                max_days_per_request=10,
+                max_parameters_per_request=2,
+                max_locations_per_request=1,
+            ),
+            transport=httpx.MockTransport(handler),
+        )
+
+    async def test_get_weather_data_for_range(self) -> None:
+        async with self.client as client:
+            result = await client.get_weather_data_for_range(
+                dt.date(2025, 1, 1),
+                dt.date(2025, 1, 15),
+                ["p1", "p2", "p3"],
+                [(1.0, 2.0), (3.0, 4.0)],
+            )
+        self.assertEqual(len(result), 2 * 2 * 2)
+        self.assertEqual(result[0], WeatherResponse(**self.response))  # pyre-ignore[6]
+        self.assertEqual(
+            sorted(self.requested_urls)[0],
+            "https://api.meteomatics.com/"
+            + "2025-01-01T00:00:00+01:00--2025-01-10T23:00:00+01:00:PT1H/p1,p2/1.0,2.0/json",
+        )
+        self.assertIn(
+            "https://api.meteomatics.com/"
+            + "2025-01-11T00:00:00+01:00--2025-01-16T00:00:00+01:00:PT1H/p3/3.0,4.0/json",
+            self.requested_urls,
+        )
+
+    async def test_get_weather_data_error(self) -> None:
+        client = AsyncAPIClient(
+            MeteomaticsConfig(username="user", password="pw"),
+            transport=httpx.MockTransport(lambda request: httpx.Response(401)),
+        )
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.get_weather_data_for_range(
+                dt.date(2025, 1, 1), dt.date(2025, 1, 1), ["p1"], [(1.0, 2.0)]
+            )
+        await client.aclose()
+
+    async def test_request_metric_excludes_waiting(self) -> None:
+        self.addCleanup(metrics.set_enabled, metrics.is_enabled())
+        metrics.set_enabled(True)
+
+        async def handler(_: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json=self.response)
+
+        def sample(name: str) -> float:
+            return (
+                metrics.REGISTRY.get_sample_value(
+                    f"pv_prediction_stage_seconds_{name}",
+                    {"stage": "meteomatics.request"},
+                )
+                or 0.0
+            )
+
+        count, seconds = sample("count"), sample("sum")
+        async with AsyncAPIClient(
+            MeteomaticsConfig(max_concurrency=1, max_locations_per_request=1),
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            await client.get_weather_data_for_range(
+                dt.date(2025, 1, 1), dt.date(2025, 1, 1), ["p1"], [(1.0, 2.0)] * 3
+            )
+
+        self.assertEqual(sample("count") - count, 3)
+        # Waiting for the single connection slot would add another 0.3 seconds.
+        self.assertLess(sample("sum") - seconds, 0.5)
@@ -0,0 +1,106 @@
+import datetime as dt
+import os
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+from pv_prediction.data.meteomatics.response_cache import CacheStats
+from pv_prediction.data.meteomatics.response_cache import ResponseCache
+
+# pylint: disable=protected-access
+
+NOW: dt.datetime = dt.datetime(2025, 6, 29, 12, tzinfo=dt.timezone.utc)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        # pylint: disable-next=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(pathlib.Path(self.tmp_dir.name))
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_ttl(self) -> None:
+        hour = dt.timedelta(hours=1)
+        self.assertIsNone(self.cache.ttl(NOW - 24 * hour, NOW - hour, NOW))
+        self.assertEqual(
+            self.cache.ttl(NOW - hour, NOW + hour, NOW), dt.timedelta(minutes=10)
+        )
+        self.assertEqual(self.cache.ttl(NOW + 4 * hour, NOW + 5 * hour, NOW), hour)
+        self.assertEqual(
+            self.cache.ttl(NOW + 48 * hour, NOW + 72 * hour, NOW), 6 * hour
+        )
+
+    def test_get_and_put(self) -> None:
+        self.assertIsNone(self.cache.get("url", now=NOW))
+        self.cache.put("url", {"a": 1}, NOW, NOW + dt.timedelta(hours=1), now=NOW)
+        self.cache.put(
+            "historic",
+            {"b": 2},
+            NOW - dt.timedelta(days=2),
+            NOW - dt.timedelta(days=1),
+            now=NOW,
+        )
+        self.assertEqual(self.cache.get("url", now=NOW), {"a": 1})
+
+        later = NOW + dt.timedelta(days=365)
+        self.assertIsNone(self.cache.get("url", now=later))
+        self.assertEqual(self.cache.get("historic", now=later), {"b": 2})
+        self.assertEqual(self.cache.stats, CacheStats(hits=2, misses=2, expirations=1))
+
+    def test_put_does_not_touch_temporary_files_of_other_writers(self) -> None:
+        other_tmp_path = self.cache._path("url").with_suffix(".tmp")
+        other_tmp_path.write_text("partial")
+        self.cache.put("url", {"a": 1}, NOW, NOW + dt.timedelta(hours=1), now=NOW)
+
+        self.assertEqual(other_tmp_path.read_text(), "partial")
+        self.assertEqual(self.cache.get("url", now=NOW), {"a": 1})
+        self.assertEqual(
+            sorted(path.suffix for path in self.cache.directory.iterdir()),
+            [".json", ".tmp"],
+        )
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = ResponseCache(pathlib.Path(self.tmp_dir.name), max_bytes=300)
+        past = NOW - dt.timedelta(days=1)
+        cache.put("first", "x" * 50, past, past, now=NOW)
+        cache.put("second", "x" * 50, past, past, now=NOW)
+        first_path = next(
+            path
+            for path in pathlib.Path(self.tmp_dir.name).glob("*.json")
+            if '"first"' in path.read_text()
+        )
+        os.utime(first_path, (0, 0))
+        cache.put("third", "x" * 50, past, past, now=NOW)
+
+        self.assertIsNone(cache.get("first", now=NOW))
+        self.assertEqual(cache.get("second", now=NOW), "x" * 50)
+        self.assertEqual(cache.get("third", now=NOW), "x" * 50)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_size_is_tracked_without_scanning(self) -> None:
+        past = NOW - dt.timedelta(days=1)
+        self.cache.put("url", "x" * 50, past, past, now=NOW)
+        with mock.patch.object(self.cache, "_scan") as mock_scan:
+            self.cache.put("url", "x" * 10, past, past, now=NOW)
+            self.cache.put("other", "x" * 10, past, past, now=NOW)
+        mock_scan.assert_not_called()
+
+        sizes = [path.stat().st_size for path in self.cache.directory.glob("*.json")]
+        self.assertEqual(self.cache._total_bytes, sum(sizes))
+        self.assertEqual(
+            ResponseCache(self.cache.directory)._total_bytes, self.cache._total_bytes
+        )
+
+    def test_corrupt_entry_is_a_miss(self) -> None:
+        self.cache.put("url", {"a": 1}, NOW, NOW + dt.timedelta(hours=1), now=NOW)
+        path = next(self.cache.directory.glob("*.json"))
+        path.write_text(path.read_text()[:20])
+
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(self.cache.get("url", now=NOW))
+        self.assertFalse(path.exists())
+        self.assertEqual(self.cache._total_bytes, 0)
+        self.assertEqual(self.cache.stats, CacheStats(misses=1))
@@ -1,7 +1,13 @@
+import dataclasses
 import unittest
 from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+from pydantic import ValidationError
 
 from pv_prediction.data.meteomatics.schemata import FlattenedWeather
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
 from pv_prediction.data.meteomatics.schemata import WeatherResponse
 
 # pylint: disable=protected-access
@@ -72,6 +78,104 @@ class TestWeatherResponse(unittest.TestCase):
             result,
         )
 
+    def test_to_dataframe(self) -> None:
+        response = WeatherResponse(
+            version="3.0",
+            user="-_steiner_frederik",
+            dateGenerated="2025-06-29T07:53:41Z",  # pyre-ignore[6]
+            status="OK",
+            data=[
+                {  # pyre-ignore[6]
+                    "parameter": "t_2m:F",
+                    "coordinates": [
+                        {
+                            "lat": 30.556,
+                            "lon": 5.693083,
+                            "dates": [
+                                {"date": "2025-06-28T22:00:00Z", "value": 50},
+                                {"date": "2025-06-29T00:00:00Z", "value": 32},
+                            ],
+                        },
+                        {
+                            "lat": 31.0,
+                            "lon": 6.0,
+                            "dates": [{"date": "2025-06-28T22:00:00Z", "value": 68}],
+                        },
+                    ],
+                },
+                {  # pyre-ignore[6]
+                    "parameter": "sunrise:sql",
+                    "coordinates": [
+                        {
+                            "lat": 30.556,
+                            "lon": 5.693083,
+                            "dates": [
+                                {
+                                    "date": "2025-06-29T00:00:00Z",
+                                    "value": "2025-06-29T03:40:00Z",
+                                },
+                            ],
+                        }
+                    ],
+                },
+            ],
+        )
+        result = response.to_dataframe()
+        self.assertEqual(list(result.columns), list(FlattenedWeather.model_fields))
+        pd.testing.assert_frame_equal(
+            result[["lat", "lon", "date", "t_2m", "sunrise", "uv"]],
+            pd.DataFrame(
+                {
+                    "lat": [30.556, 30.556, 31.0],
+                    "lon": [5.693083, 5.693083, 6.0],
+                    "date": pd.to_datetime(
+                        [
+                            "2025-06-28T22:00:00Z",
+                            "2025-06-29T00:00:00Z",
+                            "2025-06-28T22:00:00Z",
+                        ]
+                    ),
+                    "t_2m": [10.0, 0.0, 20.0],
+                    "sunrise": pd.to_datetime([None, "2025-06-29T03:40:00Z", None]),
+                    "uv": [float("nan")] * 3,
+                }
+            ),
+        )
+        self.assertEqual(response.to_arrow().num_rows, 3)
+
+    def test_to_dataframe_shared_keys(self) -> None:
+        dates = [
+            {"date": "2025-06-28T22:00:00Z", "value": 1},
+            {"date": "2025-06-29T00:00:00Z", "value": 2},
+        ]
+        columns = WeatherColumns.parse(
+            {
+                "version": "3.0",
+                "user": "-_steiner_frederik",
+                "dateGenerated": "2025-06-29T07:53:41Z",
+                "status": "OK",
+                "data": [
+                    {
+                        "parameter": parameter,
+                        "coordinates": [
+                            {"lat": 30.0, "lon": 5.0, "dates": dates},
+                            {"lat": 31.0, "lon": 6.0, "dates": dates},
+                        ],
+                    }
+                    for parameter in ["t_2m:C", "uv:idx", "msl_pressure:Pa"]
+                ],
+            }
+        ).columns
+        self.assertTrue(WeatherResponse._share_keys(columns))
+        moved = dataclasses.replace(columns[1], lat=columns[1].lat + 1)
+        self.assertFalse(WeatherResponse._share_keys([columns[0], moved]))
+
+        result = WeatherResponse.frame_from_columns(columns)
+        with mock.patch.object(WeatherResponse, "_share_keys", return_value=False):
+            expected = WeatherResponse.frame_from_columns(columns)
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(result["msl_pressure"].tolist(), [0.01, 0.02] * 2)
+
     def test_preprocess_params_temperature(self) -> None:
         self.assertEqual(("t_2m", 1), WeatherResponse._preprocess_params("t_2m:C", 1))
         self.assertEqual(("t_2m", 1), WeatherResponse._preprocess_params("t_2m", 1))
@@ -122,3 +226,93 @@ class TestWeatherResponse(unittest.TestCase):
         self.assertEqual(
             ("asdf", dtm), WeatherResponse._preprocess_params("asdf:h", dtm)
         )
+
+
+class TestWeatherColumns(unittest.TestCase):
+    def test_parse(self) -> None:
+        payload = {
+            "version": "3.0",
+            "user": "-_steiner_frederik",
+            "dateGenerated": "2025-06-29T07:53:41Z",
+            "status": "OK",
+            "data": [
+                {
+                    "parameter": "t_2m:K",
+                    "coordinates": [
+                        {
+                            "lat": 30.556,
+                            "lon": 5.693083,
+                            "dates": [
+                                {"date": "2025-06-28T22:00:00Z", "value": 293.15},
+                                {"date": "2025-06-29T00:00:00Z", "value": 283.15},
+                            ],
+                        },
+                        {
+                            "lat": 31,
+                            "lon": 6,
+                            "dates": [
+                                {"date": "2025-06-28T22:00:00Z", "value": 273.15}
+                            ],
+                        },
+                    ],
+                },
+                {
+                    "parameter": "sunset:sql",
+                    "coordinates": [
+                        {
+                            "lat": 30.556,
+                            "lon": 5.693083,
+                            "dates": [
+                                {
+                                    "date": "2025-06-28T22:00:00Z",
+                                    "value": "2025-06-28T19:40:00Z",
+                                },
+                            ],
+                        }
+                    ],
+                },
+                {
+                    "parameter": "uv:idx",
+                    "coordinates": [
+                        {
+                            "lat": 31,
+                            "lon": 6,
+                            "dates": [{"date": "2025-06-28T22:00:00Z", "value": 3}],
+                        }
+                    ],
+                },
+            ],
+        }
+        columns = WeatherColumns.parse(payload)
+        self.assertEqual(columns.status, "OK")
+        self.assertEqual(columns.columns[0].lat.dtype, "float64")
+        self.assertEqual(columns.columns[2].value.dtype, "int64")
+        pd.testing.assert_frame_equal(
+            columns.to_dataframe(),
+            WeatherResponse(**payload).to_dataframe(),  # pyre-ignore[6]
+        )
+
+    def test_parse_invalid_envelope(self) -> None:
+        with self.assertRaises(ValidationError):
+            WeatherColumns.parse({"version": "3.0", "data": [{"coordinates": []}]})
+
+    def test_parse_invalid_coordinates(self) -> None:
+        envelope = {
+            "version": "3.0",
+            "user": "user",
+            "dateGenerated": "2025-06-29T07:53:41Z",
+            "status": "OK",
+        }
+        for coordinates in [
+            [{"lat": 1.0, "lon": 2.0}],
+            [{"lat": 1.0, "lon": 2.0, "dates": [{"date": "x", "value": 1}]}],
+            [{"lat": "x", "lon": 2.0, "dates": []}],
+            [None],
+        ]:
+            with self.subTest(coordinates=coordinates), self.assertRaisesRegex(
+                ValueError, "t_2m:C"
+            ):
+                WeatherColumns.parse(
+                    envelope
+                    | {"data": [{"parameter": "t_2m:C", "coordinates": coordinates}]}
+                )
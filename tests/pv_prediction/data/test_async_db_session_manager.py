@@ -0,0 +1,75 @@
+import datetime as dt
+import pathlib
+import tempfile
+import unittest
+
+import sqlalchemy as sa
+
+from pv_prediction.data.async_db_session_manager import async_url
+from pv_prediction.data.async_db_session_manager import AsyncDBSessionManager
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import PredictionsTable
+
+# pylint:disable=protected-access
+
+
+class TestAsyncUrl(unittest.TestCase):
+    def test_async_url(self) -> None:
+        self.assertEqual(
+            async_url("sqlite:///local_database.db").drivername, "sqlite+aiosqlite"
+        )
+        self.assertEqual(
+            async_url("postgresql+psycopg2://user:pw@host/db").drivername,
+            "postgresql+asyncpg",
+        )
+        with self.assertRaises(NotImplementedError):
+            async_url("mysql://user:pw@host/db")
+
+
+class TestAsyncDBSessionManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        AsyncDBSessionManager.configure(DatabaseConfig(url="sqlite:///:memory:"))
+
+    async def asyncTearDown(self) -> None:
+        await AsyncDBSessionManager.close_sessions()
+
+    async def test_engine_is_created_lazily(self) -> None:
+        self.assertIsNone(AsyncDBSessionManager._engine)
+        engine = await AsyncDBSessionManager.get_engine()
+        self.assertIs(engine, await AsyncDBSessionManager.get_engine())
+        self.assertEqual(engine.url.drivername, "sqlite+aiosqlite")
+
+    async def test_session_commits(self) -> None:
+        async with AsyncDBSessionManager.session() as session:
+            session.add(
+                PredictionsTable(pv_id=1, model_id="id", date=dt.datetime(2024, 7, 9))
+            )
+
+        async with AsyncDBSessionManager.session() as session:
+            predictions = (await session.scalars(sa.select(PredictionsTable))).all()
+        self.assertEqual(len(predictions), 1)
+
+    async def test_session_rolls_back_on_error(self) -> None:
+        with self.assertRaises(RuntimeError):
+            async with AsyncDBSessionManager.session() as session:
+                session.add(
+                    PredictionsTable(
+                        pv_id=1, model_id="id", date=dt.datetime(2024, 7, 9)
+                    )
+                )
+                await session.flush()
+                raise RuntimeError("failed")
+
+        async with AsyncDBSessionManager.session() as session:
+            predictions = (await session.scalars(sa.select(PredictionsTable))).all()
+        self.assertEqual(len(predictions), 0)
+
+    async def test_sqlite_file_uses_wal(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir) / "test.db"
+            AsyncDBSessionManager.configure(DatabaseConfig(url=f"sqlite:///{path}"))
+            engine = await AsyncDBSessionManager.get_engine()
+            async with engine.connect() as connection:
+                journal_mode = await connection.scalar(sa.text("PRAGMA journal_mode"))
+            await AsyncDBSessionManager.close_sessions()
+        self.assertEqual(journal_mode, "wal")
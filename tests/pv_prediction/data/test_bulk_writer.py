@@ -0,0 +1,135 @@
+import datetime as dt
+import unittest
+from unittest import mock
+
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+
+from pv_prediction.data.bulk_writer import BulkWriter
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import EngergyTable
+from pv_prediction.data.db_session_manger import FlattenedWeather
+
+
+class TestBulkWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = sa.create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.writer = BulkWriter(self.engine, batch_size=2)
+
+    def test_upsert_sqlite(self) -> None:
+        weather = pd.DataFrame(
+            {
+                "lat": [1.0, 1.0, 2.0],
+                "lon": [1.0, 1.0, 2.0],
+                "date": pd.to_datetime(
+                    [
+                        "2025-06-28T22:00:00Z",
+                        "2025-06-28T23:00:00Z",
+                        "2025-06-28T22:00:00Z",
+                    ]
+                ),
+                "t_2m": [20.0, float("nan"), 18.0],
+                "uv": [1.0, float("nan"), 3.0],
+                "not_a_column": [1, 2, 3],
+            }
+        )
+        stats = self.writer.upsert(FlattenedWeather, weather)
+        self.assertEqual(stats.rows, 3)
+
+        update = weather.iloc[[1]].assign(t_2m=[15.0])
+        self.writer.upsert(FlattenedWeather, pa.Table.from_pandas(update))
+
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                sa.select(
+                    FlattenedWeather.date, FlattenedWeather.t_2m, FlattenedWeather.uv
+                ).order_by(FlattenedWeather.lat, FlattenedWeather.date)
+            ).all()
+        self.assertEqual(
+            rows,
+            [
+                (dt.datetime(2025, 6, 28, 22), 20.0, 1),
+                (dt.datetime(2025, 6, 28, 23), 15.0, None),
+                (dt.datetime(2025, 6, 28, 22), 18.0, 3),
+            ],
+        )
+
+    def test_upsert_missing_primary_key(self) -> None:
+        with self.assertRaises(ValueError):
+            self.writer.upsert(EngergyTable, pd.DataFrame({"produced": [1.0]}))
+
+    def test_upsert_postgres(self) -> None:
+        engine = mock.MagicMock()
+        engine.dialect.name = "postgresql"
+        engine.dialect.identifier_preparer.quote = lambda name: f'"{name}"'
+        cursor = engine.begin.return_value.__enter__.return_value.connection.cursor()
+        writer = BulkWriter(engine)
+
+        stats = writer.upsert(
+            EngergyTable,
+            pd.DataFrame(
+                {"date": pd.to_datetime(["2025-06-28T22:00:00"]), "produced": [1.0]}
+            ),
+        )
+
+        self.assertEqual(stats.rows, 1)
+        self.assertEqual(
+            cursor.copy_expert.call_args[0][0],
+            'COPY "staging_energy" ("date", "produced") FROM STDIN WITH (FORMAT csv)',
+        )
+        self.assertEqual(
+            cursor.copy_expert.call_args[0][1].getvalue(),
+            "2025-06-28T22:00:00.000000,1.0\n",
+        )
+        cursor.execute.assert_called_with(
+            'INSERT INTO "energy" ("date", "produced") SELECT "date", "produced" '
+            + 'FROM "staging_energy" ON CONFLICT ("date") '
+            + 'DO UPDATE SET "produced" = EXCLUDED."produced"'
+        )
+
+    def test_upsert_unsupported_dialect(self) -> None:
+        engine = mock.MagicMock()
+        engine.dialect.name = "mysql"
+        with self.assertRaises(NotImplementedError):
+            BulkWriter(engine).upsert(
+                EngergyTable, pd.DataFrame({"date": [dt.datetime(2025, 1, 1)]})
+            )
+
+    def test_upsert_postgres_creates_partitions(self) -> None:
+        engine = mock.MagicMock()
+        engine.dialect.name = "postgresql"
+        engine.dialect.identifier_preparer.quote = lambda name: f'"{name}"'
+        connection = engine.begin.return_value.__enter__.return_value
+        connection.dialect.identifier_preparer.quote = lambda name: f'"{name}"'
+        # Neither the partitions nor the default partition exist yet.
+        connection.execute.return_value.scalar.return_value = False
+
+        BulkWriter(engine).upsert(
+            FlattenedWeather,
+            pd.DataFrame(
+                {
+                    "lat": [1.0, 1.0],
+                    "lon": [1.0, 1.0],
+                    "date": pd.to_datetime(
+                        ["2025-06-30T22:00:00", "2025-07-01T00:00:00"]
+                    ),
+                }
+            ),
+        )
+
+        statements = [
+            str(call.args[0])
+            for call in connection.execute.call_args_list
+            if str(call.args[0]).startswith("CREATE")
+        ]
+        self.assertEqual(
+            statements,
+            [
+                'CREATE TABLE IF NOT EXISTS "weather_2025_06" PARTITION OF "weather" '
+                + "FOR VALUES FROM ('2025-06-01') TO ('2025-07-01')",
+                'CREATE TABLE IF NOT EXISTS "weather_2025_07" PARTITION OF "weather" '
+                + "FOR VALUES FROM ('2025-07-01') TO ('2025-08-01')",
+            ],
+        )
@@ -1,52 +1,95 @@
+import datetime as dt
+import pathlib
+import tempfile
+import threading
 import unittest
 
-from sqlalchemy import create_engine
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import sessionmaker
 
+from pv_prediction.data.db_session_manger import DatabaseConfig
 from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.db_session_manger import PredictionsTable
 
 # pylint:disable=protected-access
 
 
 class TestDBSessionManager(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls) -> None:
-        cls.engine = create_engine("sqlite:///:memory:")
-        DBSessionManager.engine = cls.engine
-        DBSessionManager._session_maker = sessionmaker(bind=cls.engine)
-
     def setUp(self) -> None:
+        DBSessionManager.configure(DatabaseConfig(url="sqlite:///:memory:"))
         self.session_manager = DBSessionManager()
 
+    def tearDown(self) -> None:
+        DBSessionManager.configure(DatabaseConfig(url="sqlite:///:memory:"))
+
     def test_singleton_behavior(self) -> None:
         another_session_manager = DBSessionManager()
         self.assertIs(self.session_manager, another_session_manager)
 
+    def test_engine_is_created_lazily(self) -> None:
+        self.assertIsNone(DBSessionManager._engine)
+        engine = DBSessionManager.get_engine()
+        self.assertIs(engine, DBSessionManager.get_engine())
+        self.assertIn("predictions", sa.inspect(engine).get_table_names())
+
     def test_get_session(self) -> None:
         session1 = DBSessionManager.get_session()
         self.assertIsInstance(session1, Session)
 
-        # Retrieve another session
         session2 = DBSessionManager.get_session()
         self.assertIsNot(session1, session2)
+        DBSessionManager.release_session(session1)
+        DBSessionManager.release_session(session2)
 
-    def test_release_session(self) -> None:
-        session = DBSessionManager.get_session()
-        self.assertIsInstance(session, Session)
+    def test_session_commits(self) -> None:
+        with DBSessionManager.session() as session:
+            session.add(
+                PredictionsTable(pv_id=1, model_id="id", date=dt.datetime(2024, 7, 9))
+            )
 
-        DBSessionManager.release_session(session)
+        with DBSessionManager.session() as session:
+            self.assertEqual(session.query(PredictionsTable).count(), 1)
 
-        session2 = DBSessionManager.get_session()
-        self.assertIs(session, session2)
+    def test_session_rolls_back_on_error(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with DBSessionManager.session() as session:
+                session.add(
+                    PredictionsTable(
+                        pv_id=1, model_id="id", date=dt.datetime(2024, 7, 9)
+                    )
+                )
+                session.flush()
+                raise RuntimeError("failed")
 
-    def test_close_sessions(self) -> None:
-        session1 = DBSessionManager.get_session()
-        session2 = DBSessionManager.get_session()
-        self.assertNotEqual(session1, session2)
+        with DBSessionManager.session() as session:
+            self.assertEqual(session.query(PredictionsTable).count(), 0)
+
+    def test_concurrent_get_engine_creates_one_engine(self) -> None:
+        engines = []
+
+        def get_engine() -> None:
+            engines.append(DBSessionManager.get_engine())
+
+        threads = [threading.Thread(target=get_engine) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
-        # Close all sessions
-        DBSessionManager.close_sessions()
+        self.assertEqual(len({id(engine) for engine in engines}), 1)
 
-        # Check that the pool is empty now
-        self.assertEqual(DBSessionManager._session_pool.qsize(), 0)
+    def test_sqlite_file_uses_wal_and_pool(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir) / "test.db"
+            DBSessionManager.configure(
+                DatabaseConfig(url=f"sqlite:///{path}", pool_size=3)
+            )
+            engine = DBSessionManager.get_engine()
+            with engine.connect() as connection:
+                journal_mode = connection.exec_driver_sql(
+                    "PRAGMA journal_mode"
+                ).scalar()
+            self.assertEqual(journal_mode, "wal")
+            self.assertIsInstance(engine.pool, sa.pool.QueuePool)
+            self.assertEqual(engine.pool.size(), 3)
+            DBSessionManager.close_sessions()
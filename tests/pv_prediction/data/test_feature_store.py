@@ -0,0 +1,170 @@
+import datetime as dt
+import unittest
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import EngergyTable
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.feature_store import clear_sky_ghi
+from pv_prediction.data.feature_store import compute_lags
+from pv_prediction.data.feature_store import FEATURES
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.data.feature_store import LAG_FEATURES
+from pv_prediction.data.feature_store import solar_position
+
+START = dt.datetime(2025, 6, 1)
+
+
+class TestSolarGeometry(unittest.TestCase):
+    def test_solar_position(self) -> None:
+        dates = pd.DatetimeIndex(["2025-06-21 11:26", "2025-06-21 23:00"])
+        elevation, azimuth = solar_position(np.full(2, 47.37), np.full(2, 8.54), dates)
+        # Solar noon at the summer solstice in Zurich.
+        self.assertAlmostEqual(elevation[0], 90 - 47.37 + 23.44, delta=0.2)
+        self.assertAlmostEqual(azimuth[0], 180, delta=1)
+        self.assertLess(elevation[1], 0)
+
+        aware = solar_position(
+            np.full(2, 47.37), np.full(2, 8.54), dates.tz_localize("UTC")
+        )
+        np.testing.assert_array_equal(aware, (elevation, azimuth))
+
+    def test_clear_sky_ghi(self) -> None:
+        ghi = clear_sky_ghi(np.array([-10.0, 0.0, 30.0, 90.0]))
+        self.assertEqual(ghi[0], 0)
+        self.assertEqual(ghi[1], 0)
+        self.assertTrue(0 < ghi[2] < ghi[3] < 1098)
+
+    def test_compute_lags(self) -> None:
+        produced = pd.Series(
+            np.arange(400.0), index=pd.date_range(START, periods=400, freq="h")
+        )
+        keys = pd.DataFrame(
+            {
+                "lat": [1.0, 1.0, 1.0, 1.0],
+                "lon": [2.0, 2.0, 2.0, 2.0],
+                "date": [START + dt.timedelta(hours=h) for h in [10, 200, 318, 600]],
+            }
+        )
+        energy_until = START + dt.timedelta(hours=399)
+        lags = compute_lags(keys, produced.drop(produced.index[150]), energy_until)
+
+        self.assertEqual(
+            list(lags.columns), ["lat", "lon", "date", *LAG_FEATURES, "retry_after"]
+        )
+        np.testing.assert_array_equal(
+            lags["produced_lag_168h"], [np.nan, 32.0, np.nan, np.nan]
+        )
+        np.testing.assert_array_equal(
+            lags["produced_mean_24h_lag_168h"], [np.nan, 20.5, np.nan, np.nan]
+        )
+        # Missing energy before the last energy is a gap which is never retried.
+        self.assertTrue(lags["retry_after"].iloc[:3].isna().all())
+        self.assertEqual(lags["retry_after"].iloc[3], START + dt.timedelta(hours=432))
+
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = sa.create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.store = FeatureStore(self.engine)
+        # A week of weather after a week of energy, with a gap at the hours 24 to 35.
+        self._insert(
+            FlattenedWeather,
+            [
+                {"lat": 1.0, "lon": 2.0, "date": START + dt.timedelta(hours=h)}
+                for h in range(168, 336)
+            ],
+        )
+        self._insert_energy(range(24))
+        self._insert_energy(range(36, 168))
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def _insert(self, table: type[Base], rows: list[dict]) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(sa.insert(table), rows)
+
+    def _insert_energy(self, hours: range) -> None:
+        self._insert(
+            EngergyTable,
+            [
+                {"date": START + dt.timedelta(hours=h, minutes=m), "produced": 1.0}
+                for h in hours
+                for m in [0, 30]
+            ],
+        )
+
+    def _features(self) -> pd.DataFrame:
+        return self.store.read(
+            1.0, 2.0, START + dt.timedelta(days=7), START + dt.timedelta(days=14)
+        )
+
+    def test_materialize_is_incremental(self) -> None:
+        self.assertEqual(self.store.materialize().rows, 168)
+        features = self._features()
+        self.assertEqual(len(features), 168)
+        self.assertEqual(features["produced_lag_168h"].count(), 156)
+        self.assertEqual(features["produced_mean_24h_lag_168h"].count(), 110)
+        self.assertEqual(features["produced_lag_168h"].max(), 2.0)
+
+        # Lags missing energy of the gap are not retried.
+        self.assertEqual(self.store.materialize().rows, 0)
+
+        self._insert(
+            FlattenedWeather,
+            [
+                {"lat": 1.0, "lon": 2.0, "date": START + dt.timedelta(hours=h)}
+                for h in range(336, 348)
+            ],
+        )
+        self.assertEqual(self.store.materialize().rows, 12)
+        self.assertEqual(self._features()["produced_lag_168h"].count(), 156)
+        # Only the new rows wait for energy, they are retried once it arrived.
+        self.assertEqual(self.store.materialize().rows, 0)
+        self._insert_energy(range(168, 174))
+        self.assertEqual(self.store.materialize().rows, 6)
+        self.assertEqual(self.store.materialize().rows, 0)
+        self._insert_energy(range(174, 180))
+        self.assertEqual(self.store.materialize().rows, 6)
+        self.assertEqual(self.store.materialize().rows, 0)
+
+    def test_join(self) -> None:
+        self.store.materialize()
+        self._insert_energy(range(168, 180))
+        frame = pd.DataFrame(
+            {
+                "lat": [1.0, 1.0, 5.0, 1.0],
+                "lon": [2.0, 2.0, 5.0, 2.0],
+                "date": pd.to_datetime(
+                    [
+                        "2025-06-08T12:00Z",
+                        "2025-06-08T22:00Z",
+                        "2025-06-15T02:00Z",
+                        "2025-06-16T12:00Z",
+                    ]
+                ),
+                "t_2m": [1.0, 2.0, 3.0, 4.0],
+            }
+        )
+        with self.assertLogs(level="WARNING"):
+            joined = self.store.join(frame)
+
+        self.assertEqual(list(joined.columns), [*frame.columns, *FEATURES])
+        self.assertGreater(joined.loc[0, "sun_elevation"], 60)
+        self.assertTrue(joined["clear_sky_ghi"].notna().all())
+        self.assertEqual(joined.loc[0, "produced_lag_168h"], 2.0)
+        self.assertTrue(np.isnan(joined.loc[0, "produced_mean_24h_lag_168h"]))
+        # Forecast rows which are not materialized get lags computed from the energy.
+        self.assertEqual(joined.loc[2, "produced_lag_168h"], 2.0)
+        self.assertEqual(joined.loc[2, "produced_mean_24h_lag_168h"], 2.0)
+        self.assertTrue(joined[LAG_FEATURES].iloc[3].isna().all())
+
+    def test_join_empty(self) -> None:
+        joined = self.store.join(pd.DataFrame(columns=["lat", "lon", "date"]))
+        self.assertEqual(list(joined.columns), ["lat", "lon", "date", *FEATURES])
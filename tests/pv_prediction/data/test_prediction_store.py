@@ -0,0 +1,164 @@
+import datetime as dt
+import pathlib
+import tempfile
+import unittest
+
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+from pv_prediction.data.async_db_session_manager import AsyncDBSessionManager
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.prediction_store import check_predictions_table
+from pv_prediction.data.prediction_store import migrate_predictions_table
+from pv_prediction.data.prediction_store import prediction_rows
+from pv_prediction.data.prediction_store import PredictionStore
+from pv_prediction.model.schemata import Prediction
+from pv_prediction.model.schemata import PredictionResponse
+
+START = dt.datetime(2025, 6, 1, tzinfo=dt.timezone.utc)
+
+
+def _response(
+    pv_id: str, model_id: str, hours: range, value: float = 1.0
+) -> PredictionResponse:
+    return PredictionResponse(
+        pv_id=pv_id,
+        prediction_time=START,
+        model_id=model_id,
+        predictions=[
+            Prediction(date=START + dt.timedelta(hours=h), energy_produced=value + h)
+            for h in hours
+        ],
+    )
+
+
+class TestPredictionStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        config = DatabaseConfig(url=f"sqlite:///{pathlib.Path(tmp_dir.name)}/db")
+        DBSessionManager.configure(config)
+        AsyncDBSessionManager.configure(config)
+        self.store = PredictionStore()
+
+    async def asyncTearDown(self) -> None:
+        await AsyncDBSessionManager.close_sessions()
+        DBSessionManager.configure(DatabaseConfig())
+
+    def test_prediction_rows(self) -> None:
+        rows = prediction_rows([_response("1", "a", range(2))])
+        self.assertEqual(rows["pv_id"].tolist(), [1, 1])
+        self.assertEqual(rows["energy_produced"].tolist(), [1.0, 2.0])
+        self.assertEqual(len(prediction_rows([])), 0)
+        with self.assertRaisesRegex(ValueError, "'site-a'"):
+            prediction_rows(
+                [_response("1", "a", range(2)), _response("site-a", "a", range(2))]
+            )
+
+    async def test_write_rejects_non_integer_pv_ids(self) -> None:
+        with self.assertRaises(ValueError):
+            self.store.write(
+                [_response("1", "a", range(2)), _response("x", "a", range(2))]
+            )
+        self.assertIsNone(
+            await self.store.read(1, "a", START, START + dt.timedelta(hours=2))
+        )
+
+    async def test_read_window_of_model(self) -> None:
+        self.store.write(
+            [
+                _response("1", "a", range(6)),
+                _response("1", "b", range(6), value=10.0),
+                _response("2", "a", range(6), value=20.0),
+            ]
+        )
+        # Predictions of the same model are replaced.
+        self.store.write([_response("1", "a", range(2, 3), value=5.0)])
+
+        prediction = await self.store.read(
+            1,
+            "a",
+            START + dt.timedelta(hours=1),
+            (START + dt.timedelta(hours=4)).astimezone(
+                dt.timezone(dt.timedelta(hours=2))
+            ),
+        )
+
+        self.assertEqual(
+            prediction,
+            PredictionResponse(
+                pv_id="1",
+                prediction_time=START,
+                model_id="a",
+                predictions=[
+                    Prediction(
+                        date=START + dt.timedelta(hours=h), energy_produced=value
+                    )
+                    for h, value in [(1, 2.0), (2, 7.0), (3, 4.0)]
+                ],
+            ),
+        )
+        self.assertIsNone(
+            await self.store.read(1, "c", START, START + dt.timedelta(hours=4))
+        )
+
+
+class TestMigratePredictionsTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = sa.create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(self.engine.dispose)
+
+    def _create_legacy_table(self, with_model_id: bool) -> None:
+        model_id = "model_id TEXT, " if with_model_id else ""
+        with self.engine.begin() as connection:
+            connection.execute(
+                sa.text(
+                    f"CREATE TABLE predictions (pv_id INTEGER, {model_id}"
+                    + "date DATETIME, prediction_time DATETIME, energy_produced FLOAT, "
+                    + "PRIMARY KEY (pv_id, date))"
+                )
+            )
+            if with_model_id:
+                connection.execute(
+                    sa.text(
+                        "INSERT INTO predictions VALUES "
+                        + "(1, 'a', '2025-06-01 00:00:00', NULL, 1.0), "
+                        + "(1, NULL, '2025-06-01 01:00:00', NULL, 2.0)"
+                    )
+                )
+
+    def _tables(self) -> list[str]:
+        return sa.inspect(self.engine).get_table_names()
+
+    def test_migrate_copies_rows_of_models(self) -> None:
+        self._create_legacy_table(with_model_id=True)
+        with self.assertRaises(ValueError):
+            check_predictions_table(self.engine)
+
+        with self.assertLogs(level="INFO"):
+            migrate_predictions_table(self.engine)
+
+        check_predictions_table(self.engine)
+        self.assertEqual(self._tables(), ["predictions"])
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                sa.text("SELECT pv_id, model_id, energy_produced FROM predictions")
+            ).all()
+        self.assertEqual([tuple(row) for row in rows], [(1, "a", 1.0)])
+
+    def test_migrate_without_model_id(self) -> None:
+        self._create_legacy_table(with_model_id=False)
+        with self.assertLogs(level="WARNING"):
+            migrate_predictions_table(self.engine, keep_legacy=True)
+
+        check_predictions_table(self.engine)
+        self.assertEqual(sorted(self._tables()), ["predictions", "predictions_legacy"])
+
+    def test_migrate_is_idempotent(self) -> None:
+        check_predictions_table(self.engine)
+        with self.assertLogs(level="INFO"):
+            migrate_predictions_table(self.engine)
+        with self.assertLogs(level="INFO") as logs:
+            migrate_predictions_table(self.engine)
+        self.assertIn("up to date", logs.output[0])
@@ -0,0 +1,118 @@
+import datetime as dt
+import unittest
+from unittest import mock
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from pv_prediction.data.db_session_manger import EngergyTable
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.weather_storage import create_monthly_partitions
+from pv_prediction.data.weather_storage import migrate_weather_table
+from pv_prediction.data.weather_storage import month_starts
+from pv_prediction.data.weather_storage import partition_column
+
+
+class TestWeatherStorage(unittest.TestCase):
+    def test_partition_column(self) -> None:
+        self.assertEqual(partition_column(FlattenedWeather.__table__), "date")
+        self.assertIsNone(partition_column(EngergyTable.__table__))
+
+    def test_postgres_ddl_is_partitioned(self) -> None:
+        ddl = str(
+            sa.schema.CreateTable(FlattenedWeather.__table__).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+        self.assertIn("PARTITION BY RANGE (date)", ddl)
+
+    def test_postgres_creates_default_partition(self) -> None:
+        statements: list[str] = []
+        engine = sa.create_mock_engine(
+            "postgresql://",
+            lambda sql, *_, **__: statements.append(
+                str(sql.compile(dialect=engine.dialect))
+            ),
+        )
+        FlattenedWeather.__table__.create(engine)
+        self.assertIn(
+            "CREATE TABLE IF NOT EXISTS weather_default PARTITION OF weather DEFAULT",
+            statements,
+        )
+
+    def test_partition_takes_over_rows_of_default_partition(self) -> None:
+        connection = mock.MagicMock()
+        connection.dialect.identifier_preparer.quote = lambda name: f'"{name}"'
+        scalars = {
+            "to_regclass": [False, True],
+            "EXISTS": [True],
+        }
+
+        def execute(statement: sa.TextClause, *_: object) -> mock.MagicMock:
+            result = mock.MagicMock()
+            for prefix, values in scalars.items():
+                if prefix in str(statement):
+                    result.scalar.return_value = values.pop(0)
+            return result
+
+        connection.execute.side_effect = execute
+        names = create_monthly_partitions(
+            connection,
+            FlattenedWeather.__table__,
+            dt.datetime(2025, 6, 2),
+            dt.datetime(2025, 6, 3),
+        )
+
+        self.assertEqual(names, ["weather_2025_06"])
+        statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+        self.assertEqual(
+            statements[3:],
+            [
+                'CREATE TABLE "weather_2025_06" (LIKE "weather" INCLUDING DEFAULTS)',
+                'WITH moved AS (DELETE FROM "weather_default" WHERE "date" >= :start '
+                + 'AND "date" < :end RETURNING *) INSERT INTO "weather_2025_06" '
+                + "SELECT * FROM moved",
+                'ALTER TABLE "weather" ATTACH PARTITION "weather_2025_06" '
+                + "FOR VALUES FROM ('2025-06-01') TO ('2025-07-01')",
+            ],
+        )
+
+    def test_month_starts(self) -> None:
+        self.assertEqual(
+            month_starts(dt.datetime(2024, 11, 15, 3), dt.datetime(2025, 2, 1)),
+            [
+                dt.date(2024, 11, 1),
+                dt.date(2024, 12, 1),
+                dt.date(2025, 1, 1),
+                dt.date(2025, 2, 1),
+            ],
+        )
+
+    def test_migrate_creates_missing_indexes(self) -> None:
+        engine = sa.create_engine("sqlite:///:memory:")
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE weather (lat FLOAT, lon FLOAT, date DATETIME, "
+                + "t_2m FLOAT, PRIMARY KEY (lat, lon, date))"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO weather VALUES (1.0, 1.0, '2025-01-01 00:00:00', 2.0)"
+            )
+
+        migrate_weather_table(engine)
+        migrate_weather_table(engine)
+
+        inspector = sa.inspect(engine)
+        self.assertEqual(
+            [index["name"] for index in inspector.get_indexes("weather")],
+            ["ix_weather_date_lat_lon"],
+        )
+        with engine.connect() as connection:
+            self.assertEqual(
+                connection.exec_driver_sql("SELECT count(*) FROM weather").scalar(), 1
+            )
+
+    def test_migrate_creates_missing_table(self) -> None:
+        engine = sa.create_engine("sqlite:///:memory:")
+        migrate_weather_table(engine)
+        self.assertTrue(sa.inspect(engine).has_table("weather"))
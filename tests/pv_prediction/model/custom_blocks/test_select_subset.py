@@ -1,6 +1,8 @@
 import unittest
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 from pv_prediction.model.custom_blocks.select_subset import SelectSubset
 
@@ -16,3 +18,38 @@ class TestSelectSubset(unittest.TestCase):
         selector = SelectSubset(["COL1", "COL2"])
         out_features = selector.get_feature_names_out()
         self.assertEqual(list(out_features), ["COL1", "COL2"])
+
+    def test_transform_adjacent_columns_is_a_view(self) -> None:
+        test_df = pd.DataFrame(np.arange(12.0).reshape(3, 4), columns=list("abcd"))
+        selector = SelectSubset(["b", "c"]).fit(test_df)
+
+        result_df = selector.transform(test_df)
+        pd.testing.assert_frame_equal(result_df, test_df[["b", "c"]])
+        self.assertTrue(np.shares_memory(result_df.to_numpy(), test_df.to_numpy()))
+
+    def test_transform_array(self) -> None:
+        test_df = pd.DataFrame(np.arange(12.0).reshape(3, 4), columns=list("abcd"))
+        selector = SelectSubset(["d", "a"]).fit(test_df)
+        np.testing.assert_array_equal(
+            selector.transform(test_df.to_numpy()), test_df[["d", "a"]].to_numpy()
+        )
+        with self.assertRaises(ValueError):
+            SelectSubset(["a"]).fit(test_df.to_numpy()).transform(test_df.to_numpy())
+
+    def test_transform_arrow(self) -> None:
+        table = pa.table({"a": [1.0], "b": [2.0], "c": [3.0]})
+        self.assertEqual(
+            SelectSubset(["c", "a"]).transform(table).column_names, ["c", "a"]
+        )
+
+    def test_transform_missing_columns(self) -> None:
+        with self.assertRaises(KeyError):
+            SelectSubset(["COL9"]).transform(pd.DataFrame({"COL1": [1]}))
+
+    def test_schema_is_logged_on_change_only(self) -> None:
+        selector = SelectSubset(["a"])
+        with self.assertLogs(level="DEBUG") as logs:
+            selector.transform(pd.DataFrame({"a": [1], "b": [2]}))
+            selector.transform(pd.DataFrame({"a": [3], "b": [4]}))
+            selector.transform(pd.DataFrame({"b": [5], "a": [6]}))
+        self.assertEqual(len(logs.records), 2)
@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from pv_prediction.model.compiled_predictor import CompiledPredictor
+from pv_prediction.model.pv_pipeline import PVPipeline
+
+
+class TestCompiledPredictor(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(
+            rng.uniform(size=(200, 3)), columns=["t_2m", "uv", "lat"]
+        ).assign(date=pd.Timestamp("2025-01-01"))
+        self.pipeline = PVPipeline.get_pipeline(["uv", "t_2m"])
+        self.pipeline.set_params(estimator__n_estimators=10, estimator__verbose=-1)
+        self.pipeline.fit(self.data, self.data["t_2m"] * 2 + self.data["uv"])
+
+    def test_predict_matches_pipeline(self) -> None:
+        model_info = mock.MagicMock()
+        self.pipeline.set_model_info(model_info)
+        predictor = CompiledPredictor.from_pipeline(self.pipeline)
+
+        self.assertEqual(predictor.feature_names, ["uv", "t_2m"])
+        self.assertIs(predictor.model_info, model_info)
+        expected = self.pipeline.predict(self.data)
+        np.testing.assert_allclose(predictor.predict(self.data), expected)
+        np.testing.assert_allclose(
+            predictor.predict(self.data[["uv", "t_2m"]].to_numpy()), expected
+        )
+
+    def test_uncompilable_pipelines(self) -> None:
+        with self.assertRaises(ValueError):
+            CompiledPredictor.from_pipeline(PVPipeline.get_pipeline(["uv"]))
+        with self.assertRaises(ValueError):
+            CompiledPredictor.from_pipeline(
+                PVPipeline([("estimator", LinearRegression())], ["uv"])
+            )
@@ -2,36 +2,98 @@ import datetime as dt
 import unittest
 from unittest import mock
 
+import numpy as np
 import pandas as pd
 from freezegun import freeze_time
 
+from pv_prediction.data.meteomatics.schemata import WeatherColumns
 from pv_prediction.data.meteomatics.schemata import WeatherResponse
 from pv_prediction.model.inferencing_runner import InferencingRunner
 from pv_prediction.model.inferencing_runner import Prediction
 from pv_prediction.model.inferencing_runner import PredictionResponse
+from pv_prediction.model.prediction_cache import PredictionCache
 
 # pylint: disable=protected-access
 
 
+def _response(lat: float, values: list[float]) -> WeatherResponse:
+    return WeatherResponse(
+        version="3.0",
+        user="user",
+        dateGenerated="2025-06-29T07:53:41Z",  # pyre-ignore[6]
+        status="OK",
+        data=[
+            {  # pyre-ignore[6]
+                "parameter": "t_2m:C",
+                "coordinates": [
+                    {
+                        "lat": lat,
+                        "lon": 5.0,
+                        "dates": [
+                            {"date": f"2025-06-28T2{i}:00:00Z", "value": value}
+                            for i, value in enumerate(values)
+                        ],
+                    }
+                ],
+            }
+        ],
+    )
+
+
 class TestInferencingRunner(unittest.TestCase):
     @mock.patch("pv_prediction.model.inferencing_runner.PVPipeline.load_from_mlflow")
     def test_model(self, mock_load_from_mlflow: mock.MagicMock) -> None:
         runner = InferencingRunner()
         self.assertEqual(runner.model, mock_load_from_mlflow.return_value)
-        mock_load_from_mlflow.assert_called_once_with("pv_model", "production")
+        mock_load_from_mlflow.assert_called_once_with(
+            "pv_model", "production", version=None
+        )
 
     @mock.patch("pv_prediction.model.inferencing_runner.InferencingRunner._lock")
+    @mock.patch(
+        "pv_prediction.model.inferencing_runner.CompiledPredictor.from_pipeline"
+    )
     @mock.patch("pv_prediction.model.inferencing_runner.PVPipeline.load_from_mlflow")
     def test_load_model(
-        self, mock_load_from_mlflow: mock.MagicMock, mock_lock: mock.MagicMock
+        self,
+        mock_load_from_mlflow: mock.MagicMock,
+        mock_from_pipeline: mock.MagicMock,
+        mock_lock: mock.MagicMock,
     ) -> None:
-        mock_lock.__enter__.side_effect = lambda: mock_load_from_mlflow(1)
-        mock_lock.__exit__.side_effect = lambda x, y, z: mock_load_from_mlflow(2)
+        calls = mock.MagicMock()
+        calls.attach_mock(mock_load_from_mlflow, "load_from_mlflow")
+        calls.attach_mock(mock_from_pipeline, "from_pipeline")
+        mock_lock.__enter__.side_effect = calls.enter
+        mock_lock.__exit__.side_effect = lambda x, y, z: calls.exit()
+        mock_from_pipeline.return_value.weather_params = ["t_2m"]
 
-        InferencingRunner().load_model()
-        mock_load_from_mlflow.assert_has_calls(
-            [mock.call(1), mock.call("pv_model", "production"), mock.call(2)]
+        runner = InferencingRunner()
+        runner.load_model()
+        self.assertEqual(
+            calls.mock_calls,
+            [
+                mock.call.enter(),
+                mock.call.load_from_mlflow("pv_model", "production", version=None),
+                mock.call.from_pipeline(mock_load_from_mlflow.return_value),
+                mock.call.from_pipeline().predict(mock.ANY),
+                mock.call.exit(),
+            ],
         )
+        self.assertIs(runner._model, mock_from_pipeline.return_value)
+
+    @mock.patch(
+        "pv_prediction.model.inferencing_runner.CompiledPredictor.from_pipeline",
+        side_effect=ValueError("not compilable"),
+    )
+    @mock.patch("pv_prediction.model.inferencing_runner.PVPipeline.load_from_mlflow")
+    def test_load_model_uncompilable(
+        self, mock_load_from_mlflow: mock.MagicMock, _: mock.MagicMock
+    ) -> None:
+        mock_load_from_mlflow.return_value.weather_params = ["t_2m"]
+        runner = InferencingRunner()
+        with self.assertLogs(level="WARNING"):
+            runner.load_model()
+        self.assertIs(runner._model, mock_load_from_mlflow.return_value)
 
     @freeze_time("2012-01-14 03:21:34", tz_offset=0)
     def test_apply_model(self) -> None:
@@ -79,5 +141,141 @@ class TestInferencingRunner(unittest.TestCase):
         mock_model.predict.assert_called_once()
         pd.testing.assert_frame_equal(
             mock_model.predict.call_args[0][0],
-            pd.DataFrame([res.model_dump() for res in response.flatten_response()]),
+            response.to_dataframe(),
+        )
+
+    def test_apply_model_with_features(self) -> None:
+        mock_store = mock.MagicMock()
+        mock_store.join.side_effect = lambda x: x.assign(sun_elevation=45.0)
+        runner = InferencingRunner(feature_store=mock_store)
+        runner._model = mock.MagicMock()
+        runner._model.model_info.model_uuid = "id"
+        runner._model.predict.side_effect = lambda x: x["sun_elevation"].to_numpy()
+        response = WeatherColumns.parse(
+            {
+                "version": "3.0",
+                "user": "user",
+                "dateGenerated": "2025-06-29T07:53:41Z",
+                "status": "OK",
+                "data": [
+                    {
+                        "parameter": "t_2m:C",
+                        "coordinates": [
+                            {
+                                "lat": 1.0,
+                                "lon": 2.0,
+                                "dates": [
+                                    {"date": "2025-06-28T22:00:00Z", "value": 20.1}
+                                ],
+                            }
+                        ],
+                    }
+                ],
+            }
+        )
+
+        prediction = runner.apply_model(response)
+
+        mock_store.join.assert_called_once()
+        self.assertEqual(prediction.predictions[0].energy_produced, 45.0)
+
+    @freeze_time("2012-01-14 03:21:34", tz_offset=0)
+    def test_apply_model_batch(self) -> None:
+        mock_model = mock.MagicMock()
+        runner = InferencingRunner()
+        runner._model = mock_model
+        mock_model.model_info.model_uuid = "id"
+        mock_model.predict.side_effect = lambda x: x["t_2m"].to_numpy()
+
+        predictions = runner.apply_model_batch(
+            [("a", _response(1.0, [1.0, 2.0])), ("b", _response(2.0, [3.0]))]
+        )
+
+        mock_model.predict.assert_called_once()
+        self.assertEqual([prediction.pv_id for prediction in predictions], ["a", "b"])
+        self.assertEqual(
+            [
+                [p.energy_produced for p in prediction.predictions]
+                for prediction in predictions
+            ],
+            [[1.0, 2.0], [3.0]],
+        )
+        self.assertEqual(
+            predictions[1].predictions[0].date,
+            dt.datetime(2025, 6, 28, 20, tzinfo=dt.timezone.utc),
+        )
+        self.assertEqual(runner.apply_model_batch([]), [])
+
+    def test_apply_model_batch_isolates_failures(self) -> None:
+        mock_model = mock.MagicMock()
+        runner = InferencingRunner()
+        runner._model = mock_model
+        mock_model.model_info.model_uuid = "id"
+
+        def predict(x: pd.DataFrame) -> np.ndarray:
+            if (x["t_2m"] < 0).any():
+                raise ValueError("negative temperature")
+            return x["t_2m"].to_numpy()
+
+        mock_model.predict.side_effect = predict
+        broken = mock.MagicMock()
+        broken.to_dataframe.side_effect = KeyError("date")
+        requests = [
+            ("a", _response(1.0, [1.0, 2.0])),
+            ("b", broken),
+            ("c", _response(1.0, [-1.0])),
+            ("d", _response(1.0, [3.0])),
+        ]
+
+        with self.assertRaises(KeyError):
+            runner.apply_model_batch(requests)
+        with self.assertLogs(level="WARNING"):
+            results = runner.apply_model_batch(requests, return_exceptions=True)
+
+        self.assertIsInstance(results[1], KeyError)
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(
+            [p.energy_produced for p in results[0].predictions], [1.0, 2.0]
         )
+        self.assertEqual([p.energy_produced for p in results[3].predictions], [3.0])
+        # The batch of a, c and d, then each of them on its own.
+        self.assertEqual(mock_model.predict.call_count, 4)
+
+    def test_apply_model_batch_with_cache(self) -> None:
+        mock_model = mock.MagicMock()
+        runner = InferencingRunner(prediction_cache=PredictionCache())
+        runner._model = mock_model
+        mock_model.model_info.model_uuid = "id"
+        mock_model.predict.side_effect = lambda x: x["t_2m"].to_numpy()
+
+        first = runner.apply_model_batch([("a", _response(1.0, [1.0, 2.0]))])
+        predictions = runner.apply_model_batch(
+            [
+                ("b", _response(1.0, [1.0, 2.0])),
+                ("a", _response(1.0, [1.0, 2.0])),
+                ("a", _response(1.0, [3.0])),
+            ]
+        )
+
+        self.assertIs(predictions[1], first[0])
+        self.assertEqual(mock_model.predict.call_count, 2)
+        # Only the installations missing in the cache are predicted.
+        self.assertEqual(
+            mock_model.predict.call_args[0][0]["t_2m"].tolist(), [1.0, 2.0, 3.0]
+        )
+        self.assertEqual(
+            [prediction.pv_id for prediction in predictions], ["b", "a", "a"]
+        )
+        self.assertEqual(predictions[2].predictions[0].energy_produced, 3.0)
+
+    @mock.patch("pv_prediction.model.inferencing_runner.PVPipeline.load_from_mlflow")
+    def test_load_model_invalidates_cache(
+        self, mock_load_from_mlflow: mock.MagicMock
+    ) -> None:
+        mock_load_from_mlflow.return_value.weather_params = ["t_2m"]
+        mock_load_from_mlflow.return_value.model_info.model_uuid = "new"
+        cache = mock.MagicMock()
+        runner = InferencingRunner(prediction_cache=cache)
+        runner.compile_model = False
+        runner.load_model()
+        cache.invalidate.assert_called_once_with("new")
@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from pv_prediction.model.micro_batcher import MicroBatchConfig
+from pv_prediction.model.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.runner = mock.MagicMock()
+        self.runner.apply_model_batch.side_effect = lambda requests, **_: [
+            f"prediction {pv_id}" for pv_id, _ in requests
+        ]
+        self.batcher = MicroBatcher(
+            self.runner, MicroBatchConfig(max_batch_size=3, max_wait_ms=50)
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.batcher.aclose()
+
+    async def test_concurrent_requests_are_batched(self) -> None:
+        predictions = await asyncio.gather(
+            *(self.batcher.predict(str(i), mock.MagicMock()) for i in range(5))
+        )
+
+        self.assertEqual(predictions, [f"prediction {i}" for i in range(5)])
+        self.assertEqual(
+            [
+                [pv_id for pv_id, _ in call.args[0]]
+                for call in self.runner.apply_model_batch.call_args_list
+            ],
+            [["0", "1", "2"], ["3", "4"]],
+        )
+
+    async def test_errors_are_propagated_to_the_batch(self) -> None:
+        self.runner.apply_model_batch.side_effect = ValueError("no model")
+        results = await asyncio.gather(
+            self.batcher.predict("1", mock.MagicMock()),
+            self.batcher.predict("2", mock.MagicMock()),
+            return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+        self.runner.apply_model_batch.side_effect = None
+        self.runner.apply_model_batch.return_value = ["prediction"]
+        self.assertEqual(
+            await self.batcher.predict("1", mock.MagicMock()), "prediction"
+        )
+
+    async def test_failed_request_only_fails_itself(self) -> None:
+        self.runner.apply_model_batch.side_effect = lambda requests, **_: [
+            ValueError(pv_id) if pv_id == "1" else f"prediction {pv_id}"
+            for pv_id, _ in requests
+        ]
+        results = await asyncio.gather(
+            *(self.batcher.predict(str(i), mock.MagicMock()) for i in range(3)),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(results[0], "prediction 0")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], "prediction 2")
+        self.assertTrue(
+            self.runner.apply_model_batch.call_args.kwargs["return_exceptions"]
+        )
@@ -0,0 +1,77 @@
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+from pv_prediction.model.model_artifact_cache import directory_checksum
+from pv_prediction.model.model_artifact_cache import ModelArtifactCache
+from pv_prediction.model.model_artifact_cache import ModelCacheConfig
+
+
+def _fake_download(artifact_uri: str, dst_path: str) -> str:
+    path = pathlib.Path(dst_path) / "model"
+    path.mkdir()
+    (path / "MLmodel").write_text(artifact_uri.split("/")[1])
+    (path / "model.pkl").write_bytes(b"weights")
+    return str(path)
+
+
+@mock.patch(
+    "pv_prediction.model.model_artifact_cache.mlflow.artifacts.download_artifacts",
+    side_effect=_fake_download,
+)
+class TestModelArtifactCache(unittest.TestCase):
+    def setUp(self) -> None:
+        # pylint: disable-next=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.client = mock.MagicMock()
+        self.client.get_model_version_by_alias.return_value.version = "3"
+        self.cache = ModelArtifactCache(
+            pathlib.Path(self.tmp_dir.name), client=self.client
+        )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_downloads_once(self, mock_download: mock.MagicMock) -> None:
+        path = self.cache.get("pv_model", "production")
+        self.assertEqual(path, self.cache.get("pv_model", "production"))
+
+        mock_download.assert_called_once_with(
+            artifact_uri="models:/pv_model/3", dst_path=mock.ANY
+        )
+        self.assertEqual(path.name, directory_checksum(path))
+        self.assertEqual((path / "model.pkl").read_bytes(), b"weights")
+
+    def test_unreachable_registry_uses_last_version(
+        self, mock_download: mock.MagicMock
+    ) -> None:
+        path = self.cache.get("pv_model", "production")
+        self.client.get_model_version_by_alias.side_effect = ConnectionError()
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(self.cache.get("pv_model", "production"), path)
+        with self.assertRaises(ConnectionError):
+            self.cache.get("pv_model", "staging")
+        mock_download.assert_called_once()
+
+    def test_corrupt_artifacts_are_downloaded_again(
+        self, mock_download: mock.MagicMock
+    ) -> None:
+        path = self.cache.get("pv_model", "production")
+        (path / "model.pkl").write_bytes(b"truncated")
+
+        with self.assertLogs(level="WARNING"):
+            repaired = self.cache.get("pv_model", "production")
+        self.assertEqual(repaired, path)
+        self.assertEqual((path / "model.pkl").read_bytes(), b"weights")
+        self.assertEqual(mock_download.call_count, 2)
+
+    def test_from_config(self, _: mock.MagicMock) -> None:
+        self.assertIsNone(
+            ModelArtifactCache.from_config(ModelCacheConfig(cache_dir=""))
+        )
+        cache = ModelArtifactCache.from_config(
+            ModelCacheConfig(cache_dir=self.tmp_dir.name, lock_timeout=1)
+        )
+        self.assertEqual(cache.directory, pathlib.Path(self.tmp_dir.name))
@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest import mock
+
+from pv_prediction.model.model_reloader import ModelReloadConfig
+from pv_prediction.model.model_reloader import ModelReloader
+
+
+class TestModelReloader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.runner = mock.MagicMock()
+        self.runner.model_name = "pv_model"
+        self.runner.model_alias = "production"
+        self.client = mock.MagicMock()
+        self.reloader = ModelReloader(
+            self.runner, ModelReloadConfig(interval_seconds=3600), self.client
+        )
+
+    def test_check_loads_new_versions_only(self) -> None:
+        self.client.get_model_version_by_alias.return_value.version = "1"
+        self.assertTrue(self.reloader.check())
+        self.assertFalse(self.reloader.check())
+
+        self.client.get_model_version_by_alias.return_value.version = "2"
+        self.assertTrue(self.reloader.check())
+
+        self.client.get_model_version_by_alias.assert_called_with(
+            "pv_model", "production"
+        )
+        self.assertEqual(
+            self.runner.load_model.call_args_list,
+            [mock.call(version="1"), mock.call(version="2")],
+        )
+        self.assertEqual(self.reloader.loaded_version, "2")
+
+    def test_failed_load_is_retried(self) -> None:
+        self.client.get_model_version_by_alias.return_value.version = "1"
+        self.runner.load_model.side_effect = [ValueError("broken"), None]
+
+        with self.assertLogs(level="ERROR"):
+            self.reloader._check_safely()  # pylint: disable=protected-access
+        self.assertIsNone(self.reloader.loaded_version)
+
+        self.assertTrue(self.reloader.check())
+        self.assertEqual(self.reloader.loaded_version, "1")
+
+    def test_load_without_registry(self) -> None:
+        self.client.get_model_version_by_alias.side_effect = ConnectionError()
+        with self.assertLogs(level="ERROR"):
+            self.reloader.load()
+        self.runner.load_model.assert_called_once_with()
+        self.assertIsNone(self.reloader.loaded_version)
+
+        self.client.get_model_version_by_alias.side_effect = None
+        self.client.get_model_version_by_alias.return_value.version = "1"
+        self.reloader.load()
+        self.runner.load_model.assert_called_with(version="1")
+        self.assertEqual(self.reloader.loaded_version, "1")
+
+    def test_start_checks_immediately(self) -> None:
+        checked = threading.Event()
+        with mock.patch.object(self.reloader, "check", side_effect=checked.set):
+            self.reloader.start()
+            self.assertTrue(checked.wait(timeout=5))
+            self.reloader.shutdown()
@@ -0,0 +1,128 @@
+import concurrent.futures
+import datetime as dt
+import pathlib
+import tempfile
+import unittest
+from typing import Any
+
+import pandas as pd
+
+from pv_prediction.model.prediction_cache import PredictionCache
+from pv_prediction.model.prediction_cache import PredictionCacheConfig
+from pv_prediction.model.prediction_cache import weather_fingerprints
+from pv_prediction.model.schemata import Prediction
+from pv_prediction.model.schemata import PredictionResponse
+
+# pylint: disable=protected-access
+
+NOW = dt.datetime(2025, 6, 1, tzinfo=dt.timezone.utc)
+
+
+def _response(pv_id: str, model_id: str = "model") -> PredictionResponse:
+    return PredictionResponse(
+        pv_id=pv_id,
+        prediction_time=NOW,
+        model_id=model_id,
+        predictions=[Prediction(date=NOW, energy_produced=1.5)],
+    )
+
+
+class TestWeatherFingerprints(unittest.TestCase):
+    def test_weather_fingerprints(self) -> None:
+        frame = pd.DataFrame(
+            {"date": [NOW] * 5, "t_2m": [1.0, 2.0, 1.0, 2.0, 1.0]},
+            index=[4, 3, 2, 1, 0],
+        )
+        fingerprints = weather_fingerprints(frame, [0, 2, 4, 5])
+        first, second, third = fingerprints[0], fingerprints[1], fingerprints[2]
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertEqual(weather_fingerprints(frame.iloc[:2], [0, 2]), [first])
+        self.assertNotEqual(
+            weather_fingerprints(frame.rename(columns={"t_2m": "uv"}), [0, 2]),
+            [first],
+        )
+        self.assertNotEqual(
+            weather_fingerprints(frame.assign(t_2m=3.0), [0, 2]), [first]
+        )
+
+
+class TestPredictionCache(unittest.TestCase):
+    def test_lru_eviction(self) -> None:
+        cache = PredictionCache(max_entries=2)
+        cache.put("x", _response("a"))
+        cache.put("x", _response("b"))
+        self.assertIsNotNone(cache.get("model", "a", "x"))
+        cache.put("x", _response("c"))
+
+        self.assertIsNone(cache.get("model", "b", "x"))
+        self.assertEqual(cache.get("model", "c", "x"), _response("c"))
+        self.assertIsNone(cache.get("other", "c", "x"))
+        self.assertEqual(
+            (cache.stats.hits, cache.stats.misses, cache.stats.evictions), (2, 2, 1)
+        )
+
+    def test_invalidate(self) -> None:
+        cache = PredictionCache()
+        cache.put("x", _response("a", "old"))
+        cache.put("x", _response("a", "new"))
+        with self.assertLogs(level="INFO"):
+            cache.invalidate("new")
+
+        self.assertIsNone(cache.get("old", "a", "x"))
+        self.assertIsNotNone(cache.get("new", "a", "x"))
+
+    def _sqlite_cache(self, path: pathlib.Path, **kwargs: Any) -> PredictionCache:
+        cache = PredictionCache(sqlite_path=path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_sqlite_is_shared(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "cache" / "predictions.db"
+            self._sqlite_cache(path).put("x", _response("a", "old"))
+            self._sqlite_cache(path).put("x", _response("a", "new"))
+
+            cache = self._sqlite_cache(path, max_entries=0)
+            self.assertEqual(cache.get("old", "a", "x"), _response("a", "old"))
+            with self.assertLogs(level="INFO"):
+                cache.invalidate("new")
+            self.assertIsNone(cache.get("old", "a", "x"))
+            self.assertEqual(cache.get("new", "a", "x"), _response("a", "new"))
+
+            cache.close()
+            self.assertIsNone(cache.get("new", "a", "x"))
+
+    def test_sqlite_keeps_the_latest_entries(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "predictions.db"
+            cache = self._sqlite_cache(path, max_entries=0, sqlite_max_entries=2)
+            cache.put("x", _response("a"))
+            cache.put("x", _response("b"))
+            cache.put("x", _response("a"))
+            cache.put("x", _response("c"))
+
+            self.assertIsNone(cache.get("model", "b", "x"))
+            self.assertIsNotNone(cache.get("model", "a", "x"))
+            self.assertIsNotNone(cache.get("model", "c", "x"))
+
+    def test_sqlite_connection_per_thread(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = self._sqlite_cache(
+                pathlib.Path(directory) / "predictions.db", max_entries=0
+            )
+            cache.put("x", _response("a"))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                self.assertEqual(
+                    executor.submit(cache.get, "model", "a", "x").result(),
+                    _response("a"),
+                )
+            self.assertEqual(len(cache._connections), 2)
+
+    def test_from_config(self) -> None:
+        self.assertIsNone(
+            PredictionCache.from_config(PredictionCacheConfig(max_entries=0))
+        )
+        cache = PredictionCache.from_config(PredictionCacheConfig(max_entries=5))
+        self.assertEqual(cache.max_entries, 5)  # pyre-ignore[16]
@@ -38,3 +38,30 @@ class TestPVPipeline(unittest.TestCase):
         mock_get_model_info.assert_called_once_with("models:/name@alias")
         mock_set_model_info.assert_called_once_with(mock_get_model_info.return_value)
         self.assertEqual(model, mock_load_model.return_value)
+
+        PVPipeline.load_from_mlflow("name", "alias", version="3")
+        mock_load_model.assert_called_with("models:/name/3")
+        mock_get_model_info.assert_called_with("models:/name/3")
+
+    @mock.patch("pv_prediction.model.pv_pipeline.load_model_info")
+    @mock.patch("pv_prediction.model.pv_pipeline.mlflow.sklearn.load_model")
+    @mock.patch("pv_prediction.model.pv_pipeline.ModelArtifactCache.from_config")
+    def test_load_from_mlflow_cached(
+        self,
+        mock_from_config: mock.MagicMock,
+        mock_load_model: mock.MagicMock,
+        mock_load_model_info: mock.MagicMock,
+    ) -> None:
+        mock_from_config.return_value.get.return_value = "/cache/objects/abc"
+        model = PVPipeline.load_from_mlflow("name", "alias")
+        mock_from_config.return_value.get.assert_called_once_with("name", "alias")
+        mock_load_model.assert_called_once_with("/cache/objects/abc")
+        mock_load_model.return_value.set_model_info.assert_called_once_with(
+            mock_load_model_info.return_value
+        )
+        self.assertEqual(model, mock_load_model.return_value)
+
+        mock_from_config.return_value.get_version.return_value = "/cache/objects/def"
+        PVPipeline.load_from_mlflow("name", "alias", version="3")
+        mock_from_config.return_value.get_version.assert_called_once_with("name", "3")
+        mock_load_model.assert_called_with("/cache/objects/def")
@@ -0,0 +1,226 @@
+import datetime as dt
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import EngergyTable
+from pv_prediction.data.db_session_manger import FlattenedWeather
+from pv_prediction.data.feature_store import FEATURES
+from pv_prediction.data.feature_store import FeatureStore
+from pv_prediction.model.pv_pipeline import PVPipeline
+from pv_prediction.model.training import load_training_data
+from pv_prediction.model.training import retrain
+from pv_prediction.model.training import search
+from pv_prediction.model.training import train
+from pv_prediction.model.training import TrainingConfig
+from pv_prediction.model.training import WEATHER_PARAMS
+
+START = dt.datetime(2025, 6, 1)
+
+
+def _create_engine() -> sa.Engine:
+    engine = sa.create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    hours = [START + dt.timedelta(hours=i) for i in range(48)]
+    quarters = [START + dt.timedelta(minutes=15 * i) for i in range(4 * 47)]
+    with engine.begin() as connection:
+        connection.execute(
+            sa.insert(FlattenedWeather),
+            [
+                {"lat": lat, "lon": 2.0, "date": date, "uv": i % 24, "t_2m": lat}
+                for lat in [1.0, 3.0]
+                for i, date in enumerate(hours)
+            ],
+        )
+        connection.execute(
+            sa.insert(EngergyTable),
+            [
+                {"date": date, "produced": (i // 4 % 24) / 4}
+                for i, date in enumerate(quarters)
+            ],
+        )
+    return engine
+
+
+class TestTraining(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = _create_engine()
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def test_load_training_data(self) -> None:
+        x, y = load_training_data(
+            self.engine, 1.0, 2.0, START, START + dt.timedelta(days=3)
+        )
+        self.assertEqual(list(x.columns), WEATHER_PARAMS)
+        self.assertEqual(len(x), 47)
+        self.assertTrue(x.index.is_monotonic_increasing)
+        self.assertTrue((x["t_2m"] == 1.0).all())
+        pd.testing.assert_series_equal(y, x["uv"], check_names=False, check_dtype=False)
+
+    def test_load_training_data_with_features(self) -> None:
+        # The energy of the week before, whose lags are materialized.
+        with self.engine.begin() as connection:
+            connection.execute(
+                sa.insert(EngergyTable),
+                [
+                    {"date": START - dt.timedelta(hours=h), "produced": 1.0}
+                    for h in range(1, 193)
+                ],
+            )
+        FeatureStore(self.engine).materialize()
+        x, _ = load_training_data(
+            self.engine,
+            1.0,
+            2.0,
+            START,
+            START + dt.timedelta(days=3),
+            with_features=True,
+        )
+        self.assertEqual(list(x.columns), WEATHER_PARAMS + FEATURES)
+        self.assertEqual(x["produced_lag_168h"].count(), 47)
+        self.assertEqual(x["produced_mean_24h_lag_168h"].count(), 47)
+        self.assertTrue((x["sun_elevation"].diff().abs() > 0).iloc[1:].all())
+
+    def test_estimator_threads(self) -> None:
+        with mock.patch("pv_prediction.model.training.os.cpu_count", return_value=8):
+            self.assertEqual(TrainingConfig(n_jobs=3).estimator_threads, 2)
+            self.assertEqual(TrainingConfig(n_jobs=16).estimator_threads, 1)
+            self.assertEqual(TrainingConfig(n_jobs=-1).estimator_threads, 1)
+            self.assertEqual(TrainingConfig(n_jobs=-5).estimator_threads, 2)
+            self.assertEqual(TrainingConfig(n_jobs=-8).estimator_threads, 8)
+
+    def test_search(self) -> None:
+        rng = np.random.default_rng(0)
+        x = pd.DataFrame(rng.random((200, 2)), columns=["uv", "t_2m"])
+        y = 3 * x["uv"]
+        config = TrainingConfig(n_splits=2, n_iter=2, n_jobs=1, cache_dir="")
+
+        pipeline, metrics = search(x, y, config)
+
+        self.assertEqual(pipeline.weather_params, ["uv", "t_2m"])
+        self.assertEqual(pipeline.predict(x).shape, (200,))
+        self.assertEqual(
+            set(metrics), {"cv_rmse", "cv_rmse_std", "search_seconds", "refit_seconds"}
+        )
+
+    @mock.patch("pv_prediction.model.training.mlflow")
+    @mock.patch("pv_prediction.model.training.search")
+    def test_train(
+        self, mock_search: mock.MagicMock, mock_mlflow: mock.MagicMock
+    ) -> None:
+        pipeline = mock.MagicMock()
+        mock_search.return_value = (pipeline, {"cv_rmse": 1.0})
+        config = TrainingConfig(n_splits=2, n_iter=1, n_jobs=1)
+
+        result = train(
+            self.engine, 1.0, 2.0, START, START + dt.timedelta(days=2), config=config
+        )
+
+        self.assertEqual(result, pipeline)
+        self.assertEqual(len(mock_search.call_args.args[0]), 47)
+        mock_mlflow.start_run.assert_called_once()
+        self.assertEqual(mock_mlflow.log_params.call_args.args[0]["n_samples"], 47)
+        mock_mlflow.log_metrics.assert_called_once_with(
+            {"cv_rmse": 1.0, "load_seconds": mock.ANY}
+        )
+        pipeline.log_model.assert_called_once()
+
+    def test_train_without_data(self) -> None:
+        with self.assertRaises(ValueError):
+            train(self.engine, 5.0, 5.0, START, START + dt.timedelta(days=2))
+
+
+@mock.patch("pv_prediction.model.training.MlflowClient")
+@mock.patch("pv_prediction.model.training.mlflow")
+@mock.patch("pv_prediction.model.pv_pipeline.mlflow.sklearn.log_model")
+@mock.patch("pv_prediction.model.training.root_mean_squared_error")
+@mock.patch("pv_prediction.model.training.PVPipeline.load_from_mlflow")
+class TestRetrain(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = _create_engine()
+        self.end = START + dt.timedelta(days=2)
+        x, y = load_training_data(self.engine, 1.0, 2.0, START, self.end)
+        self.production = PVPipeline.get_pipeline(["uv", "t_2m"])
+        self.production.set_params(
+            estimator__n_estimators=5, estimator__min_child_samples=2
+        )
+        self.production.fit(x, y)
+        self.production.set_model_info(mock.MagicMock())
+        self.config = TrainingConfig(holdout_days=0.5, incremental_n_estimators=3)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def test_retrain_registers_candidate(  # pylint: disable=too-many-positional-arguments
+        self,
+        mock_load: mock.MagicMock,
+        mock_rmse: mock.MagicMock,
+        mock_log_model: mock.MagicMock,
+        mock_mlflow: mock.MagicMock,
+        mock_client: mock.MagicMock,
+    ) -> None:
+        mock_load.return_value = self.production
+        mock_rmse.side_effect = [1.0, 1.0]
+
+        candidate = retrain(
+            self.engine, 1.0, 2.0, START, self.end, config=self.config, promote=True
+        )
+
+        mock_load.assert_called_once_with("pv_model", "production")
+        booster = candidate.named_steps["estimator"].booster_
+        self.assertEqual(booster.num_trees(), 8)
+        self.assertEqual(len(mock_rmse.call_args.args[0]), 11)
+        mock_mlflow.log_metrics.assert_called_once()
+        mock_log_model.assert_called_once_with(
+            candidate, registered_model_name="pv_model"
+        )
+        mock_client.return_value.set_registered_model_alias.assert_called_once_with(
+            "pv_model",
+            "production",
+            mock_log_model.return_value.registered_model_version,
+        )
+
+    def test_retrain_rejects_worse_candidate(  # pylint: disable=too-many-positional-arguments
+        self,
+        mock_load: mock.MagicMock,
+        mock_rmse: mock.MagicMock,
+        mock_log_model: mock.MagicMock,
+        _: mock.MagicMock,
+        mock_client: mock.MagicMock,
+    ) -> None:
+        mock_load.return_value = self.production
+        mock_rmse.side_effect = [2.0, 1.0]
+
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(
+                retrain(
+                    self.engine,
+                    1.0,
+                    2.0,
+                    START,
+                    self.end,
+                    config=self.config,
+                    promote=True,
+                )
+            )
+        mock_log_model.assert_not_called()
+        mock_client.assert_not_called()
+
+    def test_retrain_without_holdout(self, mock_load: mock.MagicMock, *_) -> None:
+        mock_load.return_value = self.production
+        with self.assertRaises(ValueError):
+            retrain(
+                self.engine,
+                1.0,
+                2.0,
+                START,
+                self.end,
+                config=TrainingConfig(holdout_days=0),
+            )
@@ -0,0 +1,200 @@
+import unittest
+from typing import Any
+from unittest import mock
+
+import httpx
+import sqlalchemy as sa
+from sqlalchemy.pool import StaticPool
+
+from pv_prediction.common import metrics
+from pv_prediction.data.db_session_manger import Base
+from pv_prediction.data.db_session_manger import PredictionsTable
+from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.async_api_client import AsyncAPIClient
+from pv_prediction.forecast_scheduler import ForecastConfig
+from pv_prediction.forecast_scheduler import ForecastPipeline
+from pv_prediction.forecast_scheduler import ForecastScheduler
+from pv_prediction.forecast_scheduler import parse_sites
+from pv_prediction.forecast_scheduler import Site
+from pv_prediction.model.inferencing_runner import InferencingRunner
+
+# pylint: disable=protected-access
+
+
+def _payload(lat: float, lon: float, parameters: list[str]) -> dict[str, Any]:
+    return {
+        "version": "3.0",
+        "user": "user",
+        "dateGenerated": "2025-06-29T07:53:41Z",
+        "status": "OK",
+        "data": [
+            {
+                "parameter": parameter,
+                "coordinates": [
+                    {
+                        "lat": lat,
+                        "lon": lon,
+                        "dates": [
+                            {"date": f"2025-06-28T2{i}:00:00Z", "value": lat + i}
+                            for i in range(3)
+                        ],
+                    }
+                ],
+            }
+            for parameter in parameters
+        ],
+    }
+
+
+class TestForecastScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = sa.create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(self.engine)
+        self.runner = InferencingRunner()
+        self.runner._model = mock.MagicMock()
+        self.runner._model.model_info.model_uuid = "id"
+        self.runner._model.predict.side_effect = lambda x: x["t_2m"].to_numpy()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            _, _, parameters, locations, _ = request.url.path.split("/")
+            lat, lon = map(float, locations.split(","))
+            if lat == 9.0:
+                return httpx.Response(500)
+            return httpx.Response(200, json=_payload(lat, lon, parameters.split(",")))
+
+        self.config = ForecastConfig(
+            sites=[Site(1, 1.0, 2.0), Site(2, 9.0, 2.0), Site(3, 3.0, 4.0)],
+            parameters=["t_2m:C", "uv:idx", "precip_1h:mm"],
+            horizon_days=1,
+            predict_batch_size=2,
+        )
+        self.pipeline = ForecastPipeline(
+            self.runner,
+            self.config,
+            engine=self.engine,
+            client_factory=lambda: AsyncAPIClient(
+                MeteomaticsConfig(max_parameters_per_request=2),
+                transport=httpx.MockTransport(handler),
+            ),
+        )
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def test_parse_sites(self) -> None:
+        self.assertEqual(
+            parse_sites("1:47.3:8.5, 2:46.9:7.4,"),
+            [Site(1, 47.3, 8.5), Site(2, 46.9, 7.4)],
+        )
+        self.assertEqual(parse_sites(""), [])
+
+    def test_run(self) -> None:
+        with self.assertLogs(level="INFO") as logs:
+            stats = self.pipeline.run()
+
+        self.assertEqual((stats.sites, stats.failed), (3, 1))
+        self.assertTrue(any("site 2 failed" in line for line in logs.output))
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                sa.select(
+                    PredictionsTable.pv_id,
+                    PredictionsTable.model_id,
+                    PredictionsTable.energy_produced,
+                ).order_by(PredictionsTable.pv_id, PredictionsTable.date)
+            ).all()
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [(1, "id", 1.0), (1, "id", 2.0), (1, "id", 3.0)]
+            + [(3, "id", 3.0), (3, "id", 4.0), (3, "id", 5.0)],
+        )
+
+        # A second run overwrites the predictions of the first one.
+        with self.assertLogs(level="INFO"):
+            self.pipeline.run()
+        with self.engine.connect() as connection:
+            self.assertEqual(
+                len(connection.execute(sa.select(PredictionsTable.pv_id)).all()), 6
+            )
+
+    def test_run_metrics(self) -> None:
+        self.addCleanup(metrics.set_enabled, metrics.is_enabled())
+        metrics.set_enabled(True)
+        stages = ["forecast.fetch", "forecast.predict", "forecast.persist"]
+
+        def sample(name: str, stage: str) -> float:
+            return metrics.REGISTRY.get_sample_value(name, {"stage": stage}) or 0.0
+
+        before = {
+            stage: sample("pv_prediction_stage_seconds_count", stage)
+            for stage in [*stages, "forecast.run"]
+        }
+        failed = sample("pv_prediction_stage_rows_sum", "forecast.failed")
+        with self.assertLogs(level="INFO"):
+            stats = self.pipeline.run()
+
+        for stage, count in before.items():
+            self.assertEqual(
+                sample("pv_prediction_stage_seconds_count", stage), count + 1
+            )
+        self.assertGreater(
+            sample("pv_prediction_stage_seconds_sum", "forecast.run"), 0.0
+        )
+        self.assertEqual(
+            sample("pv_prediction_stage_rows_sum", "forecast.failed"),
+            failed + stats.failed,
+        )
+
+    def test_failed_predictions_are_skipped(self) -> None:
+        self.runner._model.predict.side_effect = ValueError("broken")
+        with self.assertLogs(level="ERROR"):
+            stats = self.pipeline.run()
+        self.assertEqual(stats.failed, 3)
+
+    def test_unexpected_fetch_errors_are_skipped(self) -> None:
+        fetch = AsyncAPIClient.get_weather_columns_for_range
+
+        async def get_weather_columns_for_range(
+            client: AsyncAPIClient, *args: Any, **kwargs: Any
+        ) -> Any:
+            responses = await fetch(client, *args, **kwargs)
+            # No responses at all, which fails to merge the parameter groups.
+            return [] if args[3] == [(3.0, 4.0)] else responses
+
+        with mock.patch.object(
+            AsyncAPIClient,
+            "get_weather_columns_for_range",
+            get_weather_columns_for_range,
+        ), self.assertLogs(level="ERROR") as logs:
+            stats = self.pipeline.run()
+
+        self.assertEqual(stats.failed, 2)
+        self.assertTrue(any("site 3 failed" in line for line in logs.output))
+        with self.engine.connect() as connection:
+            self.assertEqual(
+                len(connection.execute(sa.select(PredictionsTable.pv_id)).all()), 3
+            )
+
+    def test_horizon_must_fit_into_one_request(self) -> None:
+        self.config.horizon_days = 11
+        with self.assertRaises(ValueError):
+            self.pipeline.run()
+
+    def test_horizon_must_not_exceed_lags(self) -> None:
+        self.runner.feature_store = mock.MagicMock()
+        self.config.horizon_days = 8
+        with self.assertRaises(ValueError):
+            self.pipeline.run()
+
+    def test_scheduler(self) -> None:
+        scheduler = ForecastScheduler(self.pipeline)
+        job = scheduler._scheduler.get_jobs()[0]
+        self.assertEqual(job.max_instances, 1)
+        self.assertIn("minute='5'", str(job.trigger))
+
+        with self.assertLogs(level="INFO"):
+            stats = scheduler.run()
+        self.assertIs(scheduler.last_stats, stats)
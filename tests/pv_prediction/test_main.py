@@ -0,0 +1,354 @@
+import asyncio
+import datetime as dt
+import pathlib
+import tempfile
+import time
+import unittest
+from typing import Any
+from typing import AsyncIterator
+from unittest import mock
+
+import httpx
+import orjson
+from fastapi.testclient import TestClient
+
+from pv_prediction.common import metrics
+from pv_prediction.data.async_db_session_manager import AsyncDBSessionManager
+from pv_prediction.data.db_session_manger import DatabaseConfig
+from pv_prediction.data.db_session_manger import DBSessionManager
+from pv_prediction.data.meteomatics.api_client import MeteomaticsConfig
+from pv_prediction.data.meteomatics.async_api_client import AsyncAPIClient
+from pv_prediction.forecast_scheduler import ForecastConfig
+from pv_prediction.forecast_scheduler import ForecastPipeline
+from pv_prediction.forecast_scheduler import Site
+from pv_prediction.main import _lines
+from pv_prediction.main import create_app
+from pv_prediction.main import ServiceConfig
+from pv_prediction.model.inferencing_runner import InferencingRunner
+
+# pylint: disable=protected-access
+
+
+def _weather(values: list[float], start: str = "2025-06-28T20") -> dict[str, Any]:
+    first = dt.datetime.fromisoformat(start).replace(tzinfo=dt.timezone.utc)
+    return {
+        "version": "3.0",
+        "user": "user",
+        "dateGenerated": "2025-06-29T07:53:41Z",
+        "status": "OK",
+        "data": [
+            {
+                "parameter": "t_2m:C",
+                "coordinates": [
+                    {
+                        "lat": 1.0,
+                        "lon": 2.0,
+                        "dates": [
+                            {
+                                "date": (first + dt.timedelta(hours=i)).isoformat(),
+                                "value": value,
+                            }
+                            for i, value in enumerate(values)
+                        ],
+                    }
+                ],
+            }
+        ],
+    }
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self) -> None:
+        self.runner = InferencingRunner()
+        self.model = mock.MagicMock()
+        self.model.model_info.model_uuid = "id"
+        self.model.predict.side_effect = lambda x: x["t_2m"].to_numpy()
+        patcher = mock.patch.object(self.runner, "load_model", side_effect=self._load)
+        self.mock_load_model = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _load(self) -> None:
+        self.runner._model = self.model
+
+    def _client(self, **kwargs: Any) -> TestClient:
+        config = ServiceConfig(reload_model=False, **kwargs)
+        return TestClient(create_app(config, self.runner))
+
+    def test_model_is_loaded_on_startup(self) -> None:
+        with self._client() as client:
+            self.mock_load_model.assert_called_once()
+            self.assertEqual(
+                client.get("/health").json(), {"status": "ok", "model_id": "id"}
+            )
+
+    @mock.patch("pv_prediction.main.ModelReloader")
+    def test_reloader(self, mock_reloader: mock.MagicMock) -> None:
+        with TestClient(create_app(ServiceConfig(reload_model=True), self.runner)):
+            mock_reloader.return_value.load.assert_called_once()
+            mock_reloader.return_value.start.assert_called_once()
+        mock_reloader.return_value.shutdown.assert_called_once()
+
+    @mock.patch("pv_prediction.model.model_reloader.MlflowClient")
+    def test_startup_without_registry(self, mock_client: mock.MagicMock) -> None:
+        mock_client.return_value.get_model_version_by_alias.side_effect = (
+            ConnectionError("registry down")
+        )
+        config = ServiceConfig(reload_model=True)
+        with mock.patch(
+            "pv_prediction.model.model_reloader.ModelReloader.start"
+        ), self.assertLogs(level="ERROR"), TestClient(
+            create_app(config, self.runner)
+        ) as client:
+            self.mock_load_model.assert_called_once_with()
+            self.assertEqual(client.get("/health").status_code, 200)
+
+    def test_predict(self) -> None:
+        for micro_batching in [False, True]:
+            with self.subTest(micro_batching=micro_batching), self._client(
+                micro_batching=micro_batching
+            ) as client:
+                response = client.post(
+                    "/predict/7", content=orjson.dumps(_weather([1.0, 2.0]))
+                )
+
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                self.assertEqual(body["pv_id"], "7")
+                self.assertEqual(body["model_id"], "id")
+                self.assertEqual(
+                    body["predictions"],
+                    [
+                        {"date": "2025-06-28T20:00:00+00:00", "energy_produced": 1.0},
+                        {"date": "2025-06-28T21:00:00+00:00", "energy_produced": 2.0},
+                    ],
+                )
+
+    def test_predict_invalid_weather(self) -> None:
+        with self._client() as client:
+            self.assertEqual(client.post("/predict/7", content=b"{").status_code, 422)
+            self.assertEqual(
+                client.post("/predict/7", content=b'{"data": []}').status_code, 422
+            )
+            without_dates = _weather([1.0])
+            del without_dates["data"][0]["coordinates"][0]["dates"]
+            invalid_date = _weather([1.0])
+            invalid_date["data"][0]["coordinates"][0]["dates"][0]["date"] = "x"
+            for weather in [without_dates, invalid_date]:
+                response = client.post("/predict/7", content=orjson.dumps(weather))
+                self.assertEqual(response.status_code, 422)
+                self.assertIn("t_2m:C", response.json()["detail"])
+
+    def test_predict_batch_streams_ndjson(self) -> None:
+        lines = [
+            orjson.dumps({"pv_id": pv_id, "weather": _weather([value])})
+            for pv_id, value in [("a", 1.0), ("b", 2.0), ("c", 3.0)]
+        ]
+        body = b"\n".join([lines[0], b"not json", lines[1], b"", lines[2]])
+        with self._client(stream_batch_size=2) as client:
+            response = client.post("/predict", content=body)
+
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        results = [orjson.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(
+            [(result["pv_id"], "error" in result) for result in results],
+            [(None, True), ("a", False), ("b", False), ("c", False)],
+        )
+        self.assertEqual(results[3]["predictions"][0]["energy_produced"], 3.0)
+        self.assertEqual(self.model.predict.call_count, 2)
+
+    def test_predict_batch_invalid_date(self) -> None:
+        invalid = _weather([2.0])
+        invalid["data"][0]["coordinates"][0]["dates"][0]["date"] = "not-a-date"
+        body = b"\n".join(
+            orjson.dumps({"pv_id": pv_id, "weather": weather})
+            for pv_id, weather in [
+                ("a", _weather([1.0])),
+                ("b", invalid),
+                ("c", _weather([3.0])),
+            ]
+        )
+
+        with self._client(stream_batch_size=1) as client:
+            response = client.post("/predict", content=body)
+
+        results = [orjson.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(
+            [(result["pv_id"], "error" in result) for result in results],
+            [("a", False), (None, True), ("c", False)],
+        )
+        self.assertIn("not-a-date", results[1]["error"])
+
+    def test_lines(self) -> None:
+        async def chunks() -> AsyncIterator[bytes]:
+            for chunk in [b"a", b"b\nc", b"d\n\ne\nf", b"g"]:
+                yield chunk
+
+        async def lines() -> list[bytes]:
+            return [line async for line in _lines(chunks())]
+
+        self.assertEqual(asyncio.run(lines()), [b"ab", b"cd", b"", b"e", b"fg"])
+
+    def test_predict_batch_errors(self) -> None:
+        self.model.predict.side_effect = ValueError("broken")
+        body = orjson.dumps({"pv_id": "a", "weather": _weather([1.0])})
+
+        with self._client() as client, self.assertLogs(level="ERROR"):
+            response = client.post("/predict", content=body)
+
+        self.assertEqual(
+            orjson.loads(response.text),
+            {"pv_id": "a", "error": "ValueError('broken')"},
+        )
+
+    def test_predict_batch_fails_only_broken_installations(self) -> None:
+        def predict(x: Any) -> Any:
+            if (x["t_2m"] < 0).any():
+                raise ValueError("broken")
+            return x["t_2m"].to_numpy()
+
+        self.model.predict.side_effect = predict
+        body = b"\n".join(
+            orjson.dumps({"pv_id": pv_id, "weather": _weather([value])})
+            for pv_id, value in [("a", 1.0), ("b", -1.0), ("c", 3.0)]
+        )
+
+        with self._client() as client, self.assertLogs(level="WARNING"):
+            response = client.post("/predict", content=body)
+
+        results = [orjson.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(
+            [(result["pv_id"], "error" in result) for result in results],
+            [("a", False), ("b", True), ("c", False)],
+        )
+
+    def test_metrics(self) -> None:
+        with self._client() as client:
+            self.assertEqual(client.get("/metrics").status_code, 404)
+
+        self.addCleanup(metrics.set_enabled, metrics.is_enabled())
+        metrics.set_enabled(True)
+        with self._client() as client:
+            client.post("/predict/7", content=orjson.dumps(_weather([1.0, 2.0])))
+            response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        for line in [
+            'pv_prediction_stage_seconds_count{stage="http.POST /predict/{pv_id}"}',
+            'pv_prediction_stage_seconds_count{stage="inference.dataframe"}',
+            'pv_prediction_stage_rows_sum{stage="inference.dataframe"}',
+        ]:
+            self.assertIn(line, response.text)
+
+    def test_metrics_time_streamed_responses(self) -> None:
+        def predict(x: Any) -> Any:
+            time.sleep(0.1)
+            return x["t_2m"].to_numpy()
+
+        self.model.predict.side_effect = predict
+        self.addCleanup(metrics.set_enabled, metrics.is_enabled())
+        metrics.set_enabled(True)
+        stage = {"stage": "http.POST /predict"}
+        before = metrics.REGISTRY.get_sample_value(
+            "pv_prediction_stage_seconds_sum", stage
+        )
+        with self._client() as client:
+            client.post(
+                "/predict",
+                content=orjson.dumps({"pv_id": "a", "weather": _weather([1.0])}),
+            )
+
+        seconds = metrics.REGISTRY.get_sample_value(
+            "pv_prediction_stage_seconds_sum", stage
+        ) - (before or 0.0)
+        self.assertGreaterEqual(seconds, 0.1)
+
+
+class TestForecast(unittest.TestCase):
+    def setUp(self) -> None:
+        self.runner = InferencingRunner()
+        self.runner._model = mock.MagicMock()
+        self.runner._model.model_info.model_uuid = "id"
+        self.runner._model.predict.side_effect = lambda x: x["t_2m"].to_numpy()
+        patcher = mock.patch.object(self.runner, "load_model")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmp_dir.cleanup)
+        config = DatabaseConfig(url=f"sqlite:///{pathlib.Path(tmp_dir.name)}/db")
+        DBSessionManager.configure(config)
+        AsyncDBSessionManager.configure(config)
+        self.addCleanup(DBSessionManager.configure, DatabaseConfig())
+
+        self.requests = 0
+        # The weather covers the hours around now, so the forecast window is
+        # covered even if the hour changes during the test.
+        now = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=1)
+        weather = _weather([1.0, 2.0, 3.0, 4.0, 5.0, 6.0], now.strftime("%Y-%m-%dT%H"))
+
+        def handler(_: httpx.Request) -> httpx.Response:
+            self.requests += 1
+            return httpx.Response(200, json=weather)
+
+        self.pipeline = ForecastPipeline(
+            self.runner,
+            ForecastConfig(sites=[Site(1, 1.0, 2.0)], horizon_days=1),
+            client_factory=lambda: AsyncAPIClient(
+                MeteomaticsConfig(), transport=httpx.MockTransport(handler)
+            ),
+        )
+
+    def _client(self) -> TestClient:
+        config = ServiceConfig(
+            reload_model=False, materialized_predictions=True, forecast_hours=3
+        )
+        return TestClient(create_app(config, self.runner, self.pipeline))
+
+    def test_forecast_is_materialized_on_miss(self) -> None:
+        with self._client() as client, self.assertLogs(level="INFO"):
+            first = client.get("/forecast/1")
+            second = client.get("/forecast/1")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(
+            [p["energy_produced"] for p in first.json()["predictions"]],
+            [2.0, 3.0, 4.0],
+        )
+        self.assertEqual(first.json()["model_id"], "id")
+
+    def test_concurrent_misses_share_a_live_forecast(self) -> None:
+        config = ServiceConfig(
+            reload_model=False, materialized_predictions=True, forecast_hours=3
+        )
+        app = create_app(config, self.runner, self.pipeline)
+
+        async def get_concurrently() -> list[httpx.Response]:
+            try:
+                async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app), base_url="http://test"
+                ) as client:
+                    return await asyncio.gather(
+                        *(client.get("/forecast/1") for _ in range(3))
+                    )
+            finally:
+                await AsyncDBSessionManager.close_sessions()
+
+        with self.assertLogs(level="INFO") as logs:
+            responses = asyncio.run(get_concurrently())
+
+        self.assertEqual([response.status_code for response in responses], [200] * 3)
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(
+            sum("Forecasting site 1 live" in line for line in logs.output), 1
+        )
+
+    def test_forecast_errors(self) -> None:
+        with self._client() as client:
+            self.assertEqual(client.get("/forecast/2").status_code, 404)
+            self.assertEqual(client.get("/forecast/x").status_code, 422)
+
+        config = ServiceConfig(reload_model=False)
+        with TestClient(create_app(config, self.runner)) as client:
+            self.assertEqual(client.get("/forecast/1").status_code, 404)